@@ -3,6 +3,7 @@
 This package provides access to various Language Model providers.
 """
 
-from .llm_factory import LLMFactory
+from .llm_factory import LLMFactory, LLMClientPool, llm_pool
+from .llm_router import MockChatModel, RoutingChatModel, get_router_stats
 
-__all__ = ['LLMFactory']
\ No newline at end of file
+__all__ = ['LLMFactory', 'LLMClientPool', 'llm_pool', 'MockChatModel', 'RoutingChatModel', 'get_router_stats']
\ No newline at end of file
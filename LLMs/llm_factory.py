@@ -6,15 +6,153 @@ including OpenAI, Google Gemini, and Groq.
 
 from dotenv import load_dotenv
 import os
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Hashable, Optional, Tuple
+
+from utils.metrics import METRICS_ENABLED
 
 # Load environment variables from .env file
 load_dotenv()
 os.environ["OPENAI_API_KEY"]=os.getenv("OPENAI_API_KEY")
 os.environ["GOOGLE_API_KEY"]=os.getenv("GEMINI_API_KEY")
 os.environ["GROQ_API_KEY"]=os.getenv("GROQ_API_KEY")
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_groq import ChatGroq
+
+# Provider SDKs are imported by the builder that needs them; importing all three costs
+# seconds of startup for a process that typically only ever talks to one provider.
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from langchain_groq import ChatGroq
+    from .llm_router import RoutingChatModel
+
+def _freeze(value: Any) -> Hashable:
+    """Turn a kwargs value into something hashable so it can be part of a pool key."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+class LLMClientPool:
+    """A thread-safe, process-wide pool of LLM clients.
+    
+    Clients are keyed by (provider, temperature, model kwargs) so requests with the same
+    configuration share one client, and with it the provider SDK's HTTP connection pool
+    and keep-alive connections. Entries idle for longer than ``idle_ttl`` seconds are
+    evicted, and the pool never holds more than ``max_size`` clients.
+    """
+    
+    def __init__(self, max_size: int = 32, idle_ttl: float = 900.0):
+        """Initialize the pool.
+        
+        Args:
+            max_size: Maximum number of clients kept; least recently used are evicted first.
+            idle_ttl: Seconds an entry may go unused before it is evicted.
+        """
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self._clients: "OrderedDict[Tuple, Tuple[Any, float]]" = OrderedDict()
+        self._key_locks: Dict[Tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._construction_seconds = 0.0
+    
+    @staticmethod
+    def make_key(prefix: str, temperature: Optional[float] = None, **kwargs) -> Tuple:
+        """Build the pool key for a provider/temperature/kwargs combination."""
+        return (prefix.lower(), temperature, _freeze(kwargs))
+    
+    def get(self, prefix: str = "openai", **kwargs):
+        """Return a pooled client, building it with ``LLMFactory.get_llm`` on a miss.
+        
+        Args:
+            prefix: The provider prefix ('openai', 'gemini', 'deepseek').
+            **kwargs: Keyword arguments for the LLM constructor (e.g. temperature).
+            
+        Returns:
+            BaseChatModel: A shared LLM instance.
+        """
+        temperature = kwargs.get("temperature")
+        key = self.make_key(prefix, temperature, **{k: v for k, v in kwargs.items() if k != "temperature"})
+        
+        with self._lock:
+            self._evict_idle_locked()
+            entry = self._clients.get(key)
+            if entry is not None:
+                self._clients[key] = (entry[0], time.monotonic())
+                self._clients.move_to_end(key)
+                self._hits += 1
+                return entry[0]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        
+        # Build outside the pool lock so a slow constructor doesn't block other keys,
+        # while the per-key lock stops concurrent misses from building duplicates.
+        with key_lock:
+            with self._lock:
+                entry = self._clients.get(key)
+                if entry is not None:
+                    self._clients[key] = (entry[0], time.monotonic())
+                    self._clients.move_to_end(key)
+                    self._hits += 1
+                    return entry[0]
+                self._misses += 1
+            
+            start = time.perf_counter()
+            client = LLMFactory.get_llm(prefix, **kwargs)
+            elapsed = time.perf_counter() - start
+            
+            with self._lock:
+                self._construction_seconds += elapsed
+                self._clients[key] = (client, time.monotonic())
+                self._clients.move_to_end(key)
+                while len(self._clients) > self.max_size:
+                    evicted_key, _ = self._clients.popitem(last=False)
+                    self._key_locks.pop(evicted_key, None)
+                    self._evictions += 1
+            return client
+    
+    def _evict_idle_locked(self) -> None:
+        """Drop entries that have been idle longer than ``idle_ttl``. Caller holds the lock."""
+        if self.idle_ttl is None:
+            return
+        cutoff = time.monotonic() - self.idle_ttl
+        stale = [key for key, (_, last_used) in self._clients.items() if last_used < cutoff]
+        for key in stale:
+            del self._clients[key]
+            self._key_locks.pop(key, None)
+            self._evictions += 1
+    
+    def clear(self) -> None:
+        """Drop every pooled client."""
+        with self._lock:
+            self._clients.clear()
+            self._key_locks.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss, eviction and construction-time counters."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._clients),
+                "max_size": self.max_size,
+                "idle_ttl": self.idle_ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "construction_seconds_total": self._construction_seconds,
+                "construction_seconds_avg": self._construction_seconds / self._misses if self._misses else 0.0,
+            }
+
 
 class LLMFactory:
     """A factory class for creating LLM instances.
@@ -29,7 +167,8 @@ class LLMFactory:
         
         Args:
             prefix: The provider prefix. Currently supported: 'openai' (uses gpt-4o), 'gemini' (uses gemini-1.5-flash),
-                   'deepseek' (uses deepseek-r1-distill-llama-70b).
+                   'deepseek' (uses deepseek-r1-distill-llama-70b), 'auto' (routes between the providers in
+                   LLM_ROUTER_PROVIDERS by measured latency, with failover) and 'mock' (offline test model).
             **kwargs: Additional keyword arguments to pass to the LLM constructor.
             
         Returns:
@@ -40,17 +179,43 @@ class LLMFactory:
         """
         prefix = prefix.lower()
         
+        # Every concrete provider reports call latency and token usage to /metrics
+        if METRICS_ENABLED and prefix in ('openai', 'gemini', 'deepseek', 'mock'):
+            from .llm_metrics import get_llm_metrics_handler
+            kwargs['callbacks'] = list(kwargs.get('callbacks') or []) + [get_llm_metrics_handler(prefix)]
+        
         if prefix == 'openai':
             return LLMFactory._get_openai_llm(**kwargs)
         elif prefix == 'gemini':
             return LLMFactory._get_gemini_llm(**kwargs)
         elif prefix == 'deepseek':
             return LLMFactory._get_deepseek_llm(**kwargs)
+        elif prefix == 'auto':
+            return LLMFactory._get_routing_llm(**kwargs)
+        elif prefix == 'mock':
+            from .llm_router import MockChatModel
+            return MockChatModel(**kwargs)
         else:
-            raise ValueError(f"Unsupported LLM provider: {prefix}. Supported providers: 'openai', 'gemini', 'deepseek'.")
+            raise ValueError(f"Unsupported LLM provider: {prefix}. Supported providers: 'openai', 'gemini', 'deepseek', 'auto', 'mock'.")
+    
+    @staticmethod
+    def get_pooled_llm(prefix: str = "openai", **kwargs):
+        """Get a shared LLM instance from the process-wide client pool.
+        
+        Unlike ``get_llm``, repeated calls with the same provider and kwargs return the
+        same client, so connections are reused across requests.
+        
+        Args:
+            prefix: The provider prefix ('openai', 'gemini', 'deepseek').
+            **kwargs: Additional keyword arguments to pass to the LLM constructor.
+            
+        Returns:
+            BaseChatModel: A pooled LLM instance from the specified provider.
+        """
+        return llm_pool.get(prefix, **kwargs)
     
     @staticmethod
-    def _get_openai_llm(**kwargs) -> ChatOpenAI:
+    def _get_openai_llm(**kwargs) -> "ChatOpenAI":
         """Get an OpenAI LLM instance.
         
         Args:
@@ -71,11 +236,12 @@ class LLMFactory:
             
         # Always use GPT-4o model, ignoring any model specified in kwargs
         kwargs['model'] = 'gpt-4o'
-            
+        
+        from langchain_openai import ChatOpenAI
         return ChatOpenAI(**kwargs)
     
     @staticmethod
-    def _get_gemini_llm(**kwargs) -> ChatGoogleGenerativeAI:
+    def _get_gemini_llm(**kwargs) -> "ChatGoogleGenerativeAI":
         """Get a Google Gemini LLM instance.
         
         This method creates a ChatGoogleGenerativeAI instance using the gemini-1.5-flash model.
@@ -102,11 +268,12 @@ class LLMFactory:
         # Ensure we're using the correct environment variable
         if not kwargs.get('google_api_key'):
             kwargs['google_api_key'] = os.getenv("GEMINI_API_KEY")
-            
+        
+        from langchain_google_genai import ChatGoogleGenerativeAI
         return ChatGoogleGenerativeAI(**kwargs)
     
     @staticmethod
-    def _get_deepseek_llm(**kwargs) -> ChatGroq:
+    def _get_deepseek_llm(**kwargs) -> "ChatGroq":
         """Get a Deepseek LLM instance via Groq API.
         
         This method creates and returns a ChatGroq instance configured with the
@@ -130,5 +297,53 @@ class LLMFactory:
             
         # Always use deepseek-r1-distill-llama-70b model, ignoring any model specified in kwargs
         kwargs['model'] = 'deepseek-r1-distill-llama-70b'
+        
+        from langchain_groq import ChatGroq
+        return ChatGroq(**kwargs)
+    
+    @staticmethod
+    def _get_routing_llm(**kwargs) -> "RoutingChatModel":
+        """Get a router over the providers listed in LLM_ROUTER_PROVIDERS.
+        
+        Each provider comes from the client pool, built with LLM_ROUTER_TIMEOUT as its
+        request timeout. Providers whose API key is missing are skipped.
+        
+        Args:
+            **kwargs: Keyword arguments passed to every provider's constructor.
             
-        return ChatGroq(**kwargs)
\ No newline at end of file
+        Returns:
+            RoutingChatModel: A router that prefers the fastest healthy provider.
+            
+        Raises:
+            ValueError: If none of the configured providers can be created.
+        """
+        names = [name.strip().lower() for name in os.getenv("LLM_ROUTER_PROVIDERS", "openai,gemini,deepseek").split(",") if name.strip()]
+        timeout = float(os.getenv("LLM_ROUTER_TIMEOUT", "60"))
+        # The clients get the router's timeout as their request timeout, so a call the router
+        # abandons on the synchronous path does not keep running on a router thread
+        provider_kwargs = {"timeout": timeout, **kwargs}
+        providers = {}
+        for name in names:
+            if name == 'auto':
+                continue
+            try:
+                providers[name] = llm_pool.get(name, **provider_kwargs)
+            except ValueError as e:
+                print(f"Warning: LLM router skipping {name}: {str(e)}")
+        if not providers:
+            raise ValueError(f"No LLM provider available for routing. Checked: {', '.join(names)}.")
+        
+        from .llm_router import RoutingChatModel
+        hedge_ms = os.getenv("LLM_ROUTER_HEDGE_MS")
+        return RoutingChatModel(
+            providers=providers,
+            timeout=timeout,
+            hedge_after=float(hedge_ms) / 1000 if hedge_ms else None
+        )
+
+
+# Process-wide pool shared by every request handler
+llm_pool = LLMClientPool(
+    max_size=int(os.getenv("LLM_POOL_MAX_SIZE", "32")),
+    idle_ttl=float(os.getenv("LLM_POOL_IDLE_TTL", "900")),
+)
@@ -0,0 +1,82 @@
+"""LangChain callback that records LLM call latency, time to first token and token usage.
+
+``LLMFactory`` attaches one handler per provider to every model it builds, so all calls
+(direct, agent executor, tool calling, routing) are measured without touching call sites.
+"""
+
+import time
+from typing import Any, Dict, List
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from utils.metrics import LLM_CALL_SECONDS, LLM_TOKENS, TIME_TO_FIRST_TOKEN_SECONDS, inc, observe
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """Callback handler feeding the LLM stage metrics for one provider."""
+
+    # Timing must not wait for a thread pool hop on async runs
+    run_inline = True
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        # run_id -> (start time, first token seen)
+        self._runs: Dict[UUID, List[Any]] = {}
+
+    def _start(self, run_id: UUID) -> None:
+        self._runs[run_id] = [time.perf_counter(), False]
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.get(run_id)
+        if run is not None and not run[1]:
+            run[1] = True
+            observe(TIME_TO_FIRST_TOKEN_SECONDS, time.perf_counter() - run[0], provider=self.provider)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            observe(LLM_CALL_SECONDS, time.perf_counter() - run[0], provider=self.provider, status="ok")
+        tokens_in, tokens_out = _token_usage(response)
+        inc(LLM_TOKENS, tokens_in, provider=self.provider, direction="in")
+        inc(LLM_TOKENS, tokens_out, provider=self.provider, direction="out")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            observe(LLM_CALL_SECONDS, time.perf_counter() - run[0], provider=self.provider, status="error")
+
+
+def _token_usage(response: LLMResult) -> tuple:
+    """Return (input tokens, output tokens) from a result, 0 where the provider reports none."""
+    tokens_in = tokens_out = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                tokens_in += usage.get("input_tokens", 0)
+                tokens_out += usage.get("output_tokens", 0)
+    if not (tokens_in or tokens_out):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        tokens_in = usage.get("prompt_tokens", 0)
+        tokens_out = usage.get("completion_tokens", 0)
+    return tokens_in, tokens_out
+
+
+# One handler per provider, shared by every model the factory builds
+_handlers: Dict[str, LLMMetricsHandler] = {}
+
+
+def get_llm_metrics_handler(provider: str) -> LLMMetricsHandler:
+    """Return the shared metrics handler for a provider."""
+    handler = _handlers.get(provider)
+    if handler is None:
+        handler = _handlers.setdefault(provider, LLMMetricsHandler(provider))
+    return handler
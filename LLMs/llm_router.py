@@ -0,0 +1,429 @@
+"""Latency-aware routing across LLM providers.
+
+``RoutingChatModel`` is a chat model that forwards each call to one of several provider
+models. It keeps a rolling window of latencies and errors per provider and tries them
+fastest-healthy-first, so a slow provider stops receiving traffic. Timeouts, rate
+limits (429) and server errors fail over to the next provider; a provider that keeps
+failing is skipped for a cooldown period. Non-streaming calls can optionally be hedged:
+if the first provider has not answered after ``hedge_after`` seconds, the same request
+is sent to the next provider and whichever answers first wins.
+
+``MockChatModel`` simulates provider latency and failures so routing can be exercised
+locally without API keys.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from utils.metrics import LLM_FAILOVERS, inc
+
+# Status codes and exception names that mean "try another provider"
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+RETRYABLE_ERROR_NAMES = ("Timeout", "RateLimit", "ResourceExhausted", "ServiceUnavailable",
+                         "InternalServerError", "APIConnection", "ConnectError", "Overloaded")
+
+# Threads used for timeouts and hedged requests on the synchronous path
+_router_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-router")
+
+# Process-wide provider statistics, so every router (and every pooled copy) learns together
+shared_provider_stats: Dict[str, "ProviderStats"] = {}
+
+
+class RateLimitError(Exception):
+    """Raised by MockChatModel to simulate an HTTP 429."""
+
+    status_code = 429
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Whether an error should make the router fail over to another provider."""
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, FutureTimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status in RETRYABLE_STATUS_CODES:
+        return True
+    return any(name in type(error).__name__ for name in RETRYABLE_ERROR_NAMES)
+
+
+def _record_failover(name: str, error: BaseException) -> None:
+    """Count a provider failure that makes the router try another provider."""
+    inc(LLM_FAILOVERS, provider=name, reason=type(error).__name__)
+    print(f"LLM provider {name} failed ({type(error).__name__}); failing over")
+
+
+class ProviderStats:
+    """Rolling latency and error statistics for one provider."""
+
+    def __init__(self, window: int = 100, failure_threshold: int = 3, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._samples: "deque[Tuple[float, bool]]" = deque(maxlen=window)
+        self._consecutive_failures = 0
+        self._cooldown_until = 0.0
+        self._requests = 0
+        self._failovers = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool) -> None:
+        with self._lock:
+            self._requests += 1
+            self._samples.append((latency, ok))
+            if ok:
+                self._consecutive_failures = 0
+            else:
+                self._consecutive_failures += 1
+                self._failovers += 1
+                if self._consecutive_failures >= self.failure_threshold:
+                    self._cooldown_until = time.monotonic() + self.cooldown
+
+    def available(self) -> bool:
+        return time.monotonic() >= self._cooldown_until
+
+    def _percentile_locked(self, q: float) -> Optional[float]:
+        latencies = sorted(latency for latency, ok in self._samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def score(self, prior: float) -> float:
+        """Expected cost of a request: median latency, inflated by the recent error rate."""
+        with self._lock:
+            if not self._samples:
+                return prior
+            p50 = self._percentile_locked(0.5)
+            errors = sum(1 for _, ok in self._samples if not ok) / len(self._samples)
+            return (prior if p50 is None else p50) * (1 + 4 * errors)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            errors = sum(1 for _, ok in self._samples if not ok)
+            return {
+                "requests": self._requests,
+                "window": len(self._samples),
+                "p50_seconds": self._percentile_locked(0.5),
+                "p95_seconds": self._percentile_locked(0.95),
+                "error_rate": errors / len(self._samples) if self._samples else 0.0,
+                "failures": self._failovers,
+                "available": time.monotonic() >= self._cooldown_until,
+            }
+
+
+class RoutingChatModel(BaseChatModel):
+    """Chat model that routes each call to the fastest healthy provider, with failover."""
+
+    providers: Dict[str, Any]
+    timeout: Optional[float] = 60.0
+    hedge_after: Optional[float] = None
+    unknown_latency: float = 1.0
+    provider_stats: Dict[str, Any] = {}
+
+    def __init__(self, **kwargs: Any):
+        """Initialize the router.
+
+        Args:
+            providers: Ordered mapping of provider name to chat model (or tool-bound runnable).
+            timeout: Seconds before a provider call is abandoned and the next one is tried.
+            hedge_after: Seconds after which a non-streaming call is also sent to the next
+                provider (None disables hedging).
+            unknown_latency: Latency assumed for providers without samples yet, so they are
+                tried when the measured providers are slower than this.
+            provider_stats: ProviderStats per provider name. Defaults to the process-wide
+                ``shared_provider_stats``.
+        """
+        if not kwargs.get("providers"):
+            raise ValueError("RoutingChatModel needs at least one provider")
+        # Fill in the stats before validation copies the dict, so the ProviderStats
+        # objects themselves stay shared
+        stats = kwargs.setdefault("provider_stats", shared_provider_stats)
+        for name in kwargs["providers"]:
+            stats.setdefault(name, ProviderStats())
+        super().__init__(**kwargs)
+
+    @property
+    def _llm_type(self) -> str:
+        return "routing"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "RoutingChatModel":
+        """Bind tools on every provider; the returned router shares this router's statistics."""
+        return RoutingChatModel(
+            providers={name: model.bind_tools(tools, **kwargs) for name, model in self.providers.items()},
+            timeout=self.timeout,
+            hedge_after=self.hedge_after,
+            unknown_latency=self.unknown_latency,
+            provider_stats=self.provider_stats
+        )
+
+    def route(self) -> List[str]:
+        """Provider names in the order they should be tried."""
+        names = list(self.providers)
+        return sorted(names, key=lambda name: (
+            not self.provider_stats[name].available(),
+            self.provider_stats[name].score(self.unknown_latency),
+            names.index(name)
+        ))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-provider latency percentiles, error rates and the current routing order."""
+        return {
+            "order": self.route(),
+            "providers": {name: self.provider_stats[name].snapshot() for name in self.providers},
+        }
+
+    # -- calls ------------------------------------------------------------
+
+    def _call(self, name: str, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs: Any) -> BaseMessage:
+        """Invoke one provider, recording its latency and outcome."""
+        start = time.perf_counter()
+        try:
+            result = self.providers[name].invoke(messages, stop=stop, **kwargs)
+        except BaseException:
+            self.provider_stats[name].record(time.perf_counter() - start, ok=False)
+            raise
+        self.provider_stats[name].record(time.perf_counter() - start, ok=True)
+        return result
+
+    async def _acall(self, name: str, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs: Any) -> BaseMessage:
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(self.providers[name].ainvoke(messages, stop=stop, **kwargs), self.timeout)
+        except asyncio.CancelledError:
+            # Lost a hedge race; not the provider's fault
+            raise
+        except BaseException:
+            self.provider_stats[name].record(time.perf_counter() - start, ok=False)
+            raise
+        self.provider_stats[name].record(time.perf_counter() - start, ok=True)
+        return result
+
+    @staticmethod
+    def _result(message: BaseMessage, provider: str) -> ChatResult:
+        if not isinstance(message, AIMessage):
+            message = AIMessage(content=getattr(message, "content", str(message)))
+        return ChatResult(generations=[ChatGeneration(message=message)], llm_output={"provider": provider})
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        order = self.route()
+        pending: Dict[Any, str] = {}
+        last_error: Optional[BaseException] = None
+        index = 0
+
+        def launch() -> None:
+            nonlocal index
+            name = order[index]
+            index += 1
+            pending[_router_executor.submit(self._call, name, messages, stop, **kwargs)] = name
+
+        launch()
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        while pending:
+            wait_for = self.hedge_after if self.hedge_after and index < len(order) else None
+            if deadline is not None:
+                remaining = max(0.0, deadline - time.monotonic())
+                wait_for = remaining if wait_for is None else min(wait_for, remaining)
+            done, _ = wait(list(pending), timeout=wait_for, return_when=FIRST_COMPLETED)
+            if not done:
+                if deadline is not None and time.monotonic() >= deadline:
+                    # The current attempts timed out; abandon them and fail over. Providers
+                    # built by LLMFactory carry the same request timeout, so an abandoned call
+                    # ends (and frees its executor thread) about when the router gives up on it.
+                    last_error = TimeoutError(f"LLM call exceeded {self.timeout}s")
+                    for name in pending.values():
+                        _record_failover(name, last_error)
+                    pending.clear()
+                    if index < len(order):
+                        launch()
+                        deadline = time.monotonic() + self.timeout
+                    continue
+                # Hedge: the request is slow, also send it to the next provider
+                launch()
+                continue
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    return self._result(future.result(), name)
+                except Exception as e:
+                    if not is_retryable_error(e):
+                        raise
+                    last_error = e
+                    _record_failover(name, e)
+            if not pending and index < len(order):
+                launch()
+                # The next provider gets its own timeout, not what is left of the failed one's
+                deadline = time.monotonic() + self.timeout if self.timeout else None
+        raise last_error or RuntimeError("No LLM provider available")
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        order = self.route()
+        pending: Dict[asyncio.Task, str] = {}
+        last_error: Optional[BaseException] = None
+        index = 0
+
+        def launch() -> None:
+            nonlocal index
+            name = order[index]
+            index += 1
+            pending[asyncio.ensure_future(self._acall(name, messages, stop, **kwargs))] = name
+
+        launch()
+        try:
+            while pending:
+                hedge = self.hedge_after if self.hedge_after and index < len(order) else None
+                done, _ = await asyncio.wait(list(pending), timeout=hedge, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    launch()
+                    continue
+                for task in done:
+                    name = pending.pop(task)
+                    try:
+                        return self._result(task.result(), name)
+                    except Exception as e:
+                        if not is_retryable_error(e):
+                            raise
+                        last_error = e
+                        _record_failover(name, e)
+                if not pending and index < len(order):
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise last_error or RuntimeError("No LLM provider available")
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        last_error: Optional[BaseException] = None
+        for name in self.route():
+            start = time.perf_counter()
+            started = False
+            try:
+                for chunk in self.providers[name].stream(messages, stop=stop, **kwargs):
+                    if not started:
+                        started = True
+                        # Time to first token is what a streaming caller waits on
+                        self.provider_stats[name].record(time.perf_counter() - start, ok=True)
+                    if run_manager and isinstance(chunk.content, str):
+                        run_manager.on_llm_new_token(chunk.content)
+                    yield ChatGenerationChunk(message=chunk if isinstance(chunk, AIMessageChunk) else AIMessageChunk(content=chunk.content))
+                return
+            except Exception as e:
+                # Once tokens were sent the stream cannot move to another provider
+                if started or not is_retryable_error(e):
+                    raise
+                self.provider_stats[name].record(time.perf_counter() - start, ok=False)
+                last_error = e
+                _record_failover(name, e)
+        raise last_error or RuntimeError("No LLM provider available")
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        last_error: Optional[BaseException] = None
+        for name in self.route():
+            start = time.perf_counter()
+            started = False
+            try:
+                async for chunk in self.providers[name].astream(messages, stop=stop, **kwargs):
+                    if not started:
+                        started = True
+                        self.provider_stats[name].record(time.perf_counter() - start, ok=True)
+                    if run_manager and isinstance(chunk.content, str):
+                        await run_manager.on_llm_new_token(chunk.content)
+                    yield ChatGenerationChunk(message=chunk if isinstance(chunk, AIMessageChunk) else AIMessageChunk(content=chunk.content))
+                return
+            except Exception as e:
+                if started or not is_retryable_error(e):
+                    raise
+                self.provider_stats[name].record(time.perf_counter() - start, ok=False)
+                last_error = e
+                _record_failover(name, e)
+        raise last_error or RuntimeError("No LLM provider available")
+
+
+def get_router_stats() -> Dict[str, Any]:
+    """Return latency percentiles and error rates of every provider seen by a router."""
+    return {name: stats.snapshot() for name, stats in list(shared_provider_stats.items())}
+
+
+class MockChatModel(BaseChatModel):
+    """Offline chat model with configurable latency and failures, for testing routing."""
+
+    name: str = "mock"
+    latency: float = 0.05
+    jitter: float = 0.0
+    failure_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    # Request timeout, like the real clients' (None waits for the simulated latency)
+    timeout: Optional[float] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "mock"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        """Accept tools like a real provider. The mock never calls them; it answers directly."""
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        last = messages[-1].content if messages else ""
+        return f"[{self.name}] {last}"
+
+    def _message(self, messages: List[BaseMessage]) -> AIMessage:
+        reply = self._reply(messages)
+        # Word counts stand in for tokens so usage metrics can be exercised offline
+        tokens_in = sum(len(str(message.content).split()) for message in messages)
+        tokens_out = len(reply.split())
+        return AIMessage(content=reply, usage_metadata={
+            "input_tokens": tokens_in, "output_tokens": tokens_out, "total_tokens": tokens_in + tokens_out})
+
+    def _delay_and_maybe_fail(self) -> float:
+        roll = random.random()
+        if roll < self.rate_limit_rate:
+            raise RateLimitError(f"{self.name}: rate limited")
+        if roll < self.rate_limit_rate + self.failure_rate:
+            raise ConnectionError(f"{self.name}: simulated failure")
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def _check_timeout(self, delay: float) -> None:
+        if self.timeout is not None and delay > self.timeout:
+            raise TimeoutError(f"{self.name}: request timed out after {self.timeout}s")
+
+    def _wait(self, delay: float) -> None:
+        time.sleep(delay if self.timeout is None else min(delay, self.timeout))
+        self._check_timeout(delay)
+
+    async def _await(self, delay: float) -> None:
+        await asyncio.sleep(delay if self.timeout is None else min(delay, self.timeout))
+        self._check_timeout(delay)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        self._wait(self._delay_and_maybe_fail())
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        await self._await(self._delay_and_maybe_fail())
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        self._wait(self._delay_and_maybe_fail())
+        for word in self._reply(messages).split(" "):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await self._await(self._delay_and_maybe_fail())
+        for word in self._reply(messages).split(" "):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+
+from LLMs.llm_factory import LLMClientPool, LLMFactory
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    """Replace the provider builder with a slow stub that records what it built."""
+    calls = []
+
+    def build(prefix="openai", **kwargs):
+        calls.append((prefix, kwargs))
+        time.sleep(0.05)
+        return object()
+
+    monkeypatch.setattr(LLMFactory, "get_llm", staticmethod(build))
+    return calls
+
+
+def test_same_configuration_shares_one_client(builds):
+    pool = LLMClientPool()
+
+    first = pool.get("openai", temperature=0.2, max_tokens=100)
+    second = pool.get("OpenAI", max_tokens=100, temperature=0.2)
+
+    assert first is second
+    assert len(builds) == 1
+    assert pool.stats()["hits"] == 1 and pool.stats()["misses"] == 1
+
+
+def test_different_configurations_get_different_clients(builds):
+    pool = LLMClientPool()
+
+    clients = {id(pool.get("openai", temperature=0.2)), id(pool.get("openai", temperature=0.7)),
+               id(pool.get("gemini", temperature=0.2)), id(pool.get("openai", temperature=0.2, stop=["x"]))}
+
+    assert len(clients) == 4
+
+
+def test_make_key_freezes_unhashable_kwargs():
+    key = LLMClientPool.make_key("openai", 0.2, model_kwargs={"top_p": 0.9}, stop=["a", "b"])
+
+    assert hash(key) == hash(LLMClientPool.make_key("openai", 0.2, stop=["a", "b"], model_kwargs={"top_p": 0.9}))
+
+
+def test_concurrent_misses_build_once_per_key(builds):
+    pool = LLMClientPool()
+    results = []
+
+    def get(temperature):
+        results.append((temperature, pool.get("openai", temperature=temperature)))
+
+    threads = [threading.Thread(target=get, args=(temperature,)) for temperature in (0.1, 0.2) * 4]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(kwargs["temperature"] for _, kwargs in builds) == [0.1, 0.2]
+    for temperature in (0.1, 0.2):
+        assert len({id(client) for t, client in results if t == temperature}) == 1
+
+
+def test_slow_build_does_not_block_other_keys(monkeypatch):
+    release = threading.Event()
+
+    def build(prefix="openai", **kwargs):
+        if kwargs.get("temperature") == 0.1:
+            release.wait(5)
+        return object()
+
+    monkeypatch.setattr(LLMFactory, "get_llm", staticmethod(build))
+    pool = LLMClientPool()
+    slow = threading.Thread(target=pool.get, args=("openai",), kwargs={"temperature": 0.1})
+    slow.start()
+    try:
+        start = time.perf_counter()
+        pool.get("openai", temperature=0.2)
+        assert time.perf_counter() - start < 1
+    finally:
+        release.set()
+        slow.join()
+
+
+def test_idle_clients_are_evicted(builds):
+    pool = LLMClientPool(idle_ttl=0.05)
+    first = pool.get("openai", temperature=0.2)
+    time.sleep(0.1)
+
+    assert pool.get("openai", temperature=0.2) is not first
+    assert pool.stats()["evictions"] == 1
+
+
+def test_least_recently_used_client_is_evicted_at_max_size(builds):
+    pool = LLMClientPool(max_size=2)
+    a = pool.get("openai", temperature=0.1)
+    pool.get("openai", temperature=0.2)
+    pool.get("openai", temperature=0.1)
+    pool.get("openai", temperature=0.3)
+
+    assert pool.stats()["size"] == 2
+    assert pool.get("openai", temperature=0.1) is a
+    assert len(builds) == 3
+
+
+def test_mock_provider_builds_offline():
+    pool = LLMClientPool()
+
+    llm = pool.get("mock", latency=0)
+
+    assert llm.invoke("hi").content == "[mock] hi"
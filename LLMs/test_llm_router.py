@@ -0,0 +1,140 @@
+import asyncio
+from typing import Any, List, Optional
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.outputs import ChatResult
+from langchain_core.tools import tool
+
+from LLMs.llm_router import MockChatModel, RoutingChatModel, is_retryable_error, RateLimitError
+from utils.metrics import LLM_FAILOVERS
+
+
+class BrokenChatModel(BaseChatModel):
+    """Fails every call with an error that is not worth retrying elsewhere."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "broken"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        raise ValueError("invalid request")
+
+
+def _router(**providers) -> RoutingChatModel:
+    # Fresh statistics per test, so one test's failures do not reorder another's providers
+    return RoutingChatModel(providers=providers, timeout=1.0, provider_stats={})
+
+
+def _failovers(provider: str, reason: str) -> float:
+    return LLM_FAILOVERS.labels(provider=provider, reason=reason).value
+
+
+MESSAGES = [HumanMessage(content="hello")]
+
+
+def test_retryable_errors():
+    assert is_retryable_error(TimeoutError())
+    assert is_retryable_error(RateLimitError())
+    assert is_retryable_error(ConnectionError())
+    assert not is_retryable_error(ValueError())
+
+
+def test_failing_provider_fails_over():
+    router = _router(down=MockChatModel(name="down", latency=0, failure_rate=1.0),
+                     up=MockChatModel(name="up", latency=0))
+    before = _failovers("down", "ConnectionError")
+
+    result = router.invoke(MESSAGES)
+
+    assert result.content == "[up] hello"
+    assert _failovers("down", "ConnectionError") == before + 1
+    assert router.stats()["providers"]["down"]["failures"] == 1
+
+
+def test_rate_limited_provider_fails_over():
+    router = _router(limited=MockChatModel(name="limited", latency=0, rate_limit_rate=1.0),
+                     up=MockChatModel(name="up", latency=0))
+
+    assert router.invoke(MESSAGES).content == "[up] hello"
+
+
+def test_slow_provider_times_out():
+    router = _router(slow=MockChatModel(name="slow", latency=5.0),
+                     fast=MockChatModel(name="fast", latency=0))
+    # The first LangChain call in a process is slow; keep it out of the timed call
+    MockChatModel(latency=0).invoke(MESSAGES)
+    router.timeout = 0.3
+    before = _failovers("slow", "TimeoutError")
+
+    assert router.invoke(MESSAGES).content == "[fast] hello"
+    assert _failovers("slow", "TimeoutError") == before + 1
+
+
+def test_next_provider_gets_its_own_timeout():
+    router = _router(slow=MockChatModel(name="slow", latency=5.0),
+                     steady=MockChatModel(name="steady", latency=0.2))
+    MockChatModel(latency=0).invoke(MESSAGES)
+    router.timeout = 0.3
+
+    assert router.invoke(MESSAGES).content == "[steady] hello"
+
+
+def test_non_retryable_error_propagates():
+    router = _router(broken=BrokenChatModel(), up=MockChatModel(name="up", latency=0))
+
+    with pytest.raises(ValueError, match="invalid request"):
+        router.invoke(MESSAGES)
+
+
+def test_all_providers_failing_raises_the_last_error():
+    router = _router(a=MockChatModel(name="a", latency=0, failure_rate=1.0),
+                     b=MockChatModel(name="b", latency=0, rate_limit_rate=1.0))
+
+    with pytest.raises(RateLimitError):
+        router.invoke(MESSAGES)
+
+
+def test_async_path_fails_over():
+    router = _router(down=MockChatModel(name="down", latency=0, failure_rate=1.0),
+                     up=MockChatModel(name="up", latency=0))
+
+    result = asyncio.run(router.ainvoke(MESSAGES))
+
+    assert result.content == "[up] hello"
+
+
+def test_unhealthy_provider_moves_to_the_back():
+    router = _router(down=MockChatModel(name="down", latency=0, failure_rate=1.0),
+                     up=MockChatModel(name="up", latency=0))
+    for _ in range(3):
+        router.invoke(MESSAGES)
+
+    assert router.route() == ["up", "down"]
+
+
+def test_routers_with_their_own_stats_do_not_share_them():
+    first = _router(down=MockChatModel(name="down", latency=0, failure_rate=1.0),
+                    up=MockChatModel(name="up", latency=0))
+    second = _router(down=MockChatModel(name="down", latency=0),
+                     up=MockChatModel(name="up", latency=0))
+    first.invoke(MESSAGES)
+
+    assert second.stats()["providers"]["down"]["requests"] == 0
+
+
+def test_bind_tools_keeps_routing_and_stats():
+    @tool
+    def lookup(query: str) -> str:
+        """Look something up."""
+        return query
+
+    router = _router(down=MockChatModel(name="down", latency=0, failure_rate=1.0),
+                     up=MockChatModel(name="up", latency=0))
+    bound = router.bind_tools([lookup])
+
+    assert bound.invoke(MESSAGES).content == "[up] hello"
+    assert bound.provider_stats["down"] is router.provider_stats["down"]
+    assert router.stats()["providers"]["down"]["failures"] == 1
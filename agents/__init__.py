@@ -3,6 +3,6 @@
 This package provides various agent implementations for different tasks.
 """
 
-from agents.orchestra_agent import OrchestraAgent
+from agents.orchestra_agent import OrchestraAgent, TravelAgentRegistry, travel_agent_registry
 
-__all__ = ["OrchestraAgent"]
\ No newline at end of file
+__all__ = ["OrchestraAgent", "TravelAgentRegistry", "travel_agent_registry"]
\ No newline at end of file
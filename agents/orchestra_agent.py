@@ -3,12 +3,22 @@
 A minimal implementation that maintains core functionality while being as simple as possible.
 """
 
+import asyncio
+import json
 import os
 import sys
-from typing import Dict, List, Any, Optional, Union
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Iterator, List, Any, Optional, Tuple, Union
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage, ToolMessage
 from langchain_core.tools import BaseTool
-from langchain.agents import AgentExecutor, create_react_agent
+from langchain_core.prompts import PromptTemplate
+
+# langchain.agents pulls in most of langchain; it is imported when the first ReAct
+# executor is built instead of at startup
+if TYPE_CHECKING:
+    from langchain.agents import AgentExecutor
 
 # Import LLM factory
 from LLMs.llm_factory import LLMFactory
@@ -22,86 +32,612 @@ from tools.city_facts_tool import CityFactsTool
 # Import output parser
 from outputParser.trip_output_parser import FunctionCall
 
+# Sync-to-async bridge used by the streaming path
+from utils.async_bridge import background_loop
+
+# Stage latency metrics exported at /metrics
+from utils.metrics import AGENT_QUERY_SECONDS, timed
+
+# ReAct prompt used by the travel agent
+TRAVEL_AGENT_PROMPT = """You are a travel assistant. Help plan trips and provide information about destinations.
+        
+        You have access to the following tools:
+        
+        {tools}
+        
+        Use the following format:
+        
+        Question: the input question you must answer
+        Thought: you should always think about what to do
+        Action: the action to take, should be one of [{tool_names}]
+        Action Input: the input to the action
+        Observation: the result of the action
+        ... (this Thought/Action/Action Input/Observation can repeat N times)
+        Thought: I now know the final answer
+        Final Answer: the final answer to the original input question
+        
+        Begin!
+        
+        Question: {input}
+        Thought:{agent_scratchpad}"""
+
+
+# System prompt for the parallel tool-calling travel agent
+PARALLEL_TOOLS_PROMPT = (
+    "You are a travel assistant. Help plan trips and provide information about destinations. "
+    "When a question needs several independent facts (for example weather, local time and city "
+    "facts), request all of those tool calls together in a single step rather than one at a time."
+)
+
+# Tool-calling rounds allowed before the parallel agent must answer
+MAX_TOOL_ROUNDS = 4
+
+
+def _with_system_instructions(messages: List[BaseMessage], instructions: str) -> List[BaseMessage]:
+    """Fold ``instructions`` and the leading system messages into one system message.
+    
+    The session's own system prompt stays first, followed by the instructions and then
+    any further system messages (such as the rolling summary), so the model receives a
+    single set of system instructions.
+    """
+    leading = 0
+    while leading < len(messages) and isinstance(messages[leading], SystemMessage):
+        leading += 1
+    contents = [message.content for message in messages[:leading]]
+    contents.insert(1 if contents else 0, instructions)
+    return [SystemMessage(content="\n\n".join(contents))] + list(messages[leading:])
+
+# Maximum tool calls run at once for a single request
+TOOL_CONCURRENCY = int(os.getenv("AGENT_TOOL_CONCURRENCY", "8"))
+
+# Bounded thread pool shared by every agent for running sync tool calls concurrently
+_tool_executor = ThreadPoolExecutor(max_workers=TOOL_CONCURRENCY, thread_name_prefix="agent-tool")
+
+
+class TravelAgentRegistry:
+    """Process-wide registry of prebuilt travel agents and shared tool instances.
+    
+    Building the ReAct agent and its executor is done once per (provider, temperature,
+    tool set, verbose) key. Tools are stateless, so a single instance of each is shared
+    by every executor. Only conversation history is created per request.
+    """
+    
+    TOOL_CLASSES = {
+        "weather": WeatherTool,
+        "time": TimeTool,
+        "city_facts": CityFactsTool,
+    }
+    
+    def __init__(self, max_size: int = 32):
+        """Initialize the registry.
+        
+        Args:
+            max_size: Maximum number of executors kept; least recently used are dropped first.
+        """
+        self.max_size = max_size
+        self._executors: "OrderedDict[Tuple, AgentExecutor]" = OrderedDict()
+        self._tool_llms: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._tools: Dict[str, BaseTool] = {}
+        self._prompt: Optional[PromptTemplate] = None
+        self._lock = threading.RLock()
+    
+    def get_tools(self, tool_names: Optional[Tuple[str, ...]] = None) -> List[BaseTool]:
+        """Return shared tool instances, creating each on first use.
+        
+        Args:
+            tool_names: Names of the tools to return. Defaults to all travel tools.
+        """
+        tool_names = tool_names or tuple(self.TOOL_CLASSES)
+        with self._lock:
+            tools = []
+            for name in tool_names:
+                if name not in self._tools:
+                    self._tools[name] = self.TOOL_CLASSES[name]()
+                tools.append(self._tools[name])
+            return tools
+    
+    def get_prompt(self) -> PromptTemplate:
+        """Return the compiled ReAct prompt template."""
+        with self._lock:
+            if self._prompt is None:
+                self._prompt = PromptTemplate.from_template(TRAVEL_AGENT_PROMPT)
+            return self._prompt
+    
+    def get_executor(self, llm_prefix: str, temperature: float, llm, tools: List[BaseTool], verbose: bool = False) -> "AgentExecutor":
+        """Return the shared executor for this provider and tool set, building it on a miss.
+        
+        Args:
+            llm_prefix: LLM provider name, part of the registry key.
+            temperature: LLM temperature, part of the registry key.
+            llm: The LLM used if the executor has to be built.
+            tools: Tools the executor may call.
+            verbose: Whether the executor prints its trace to stdout.
+        """
+        key = (llm_prefix.lower(), temperature, tuple(tool.name for tool in tools), verbose)
+        with self._lock:
+            executor = self._executors.get(key)
+            if executor is not None:
+                self._executors.move_to_end(key)
+                return executor
+            
+            from langchain.agents import AgentExecutor, create_react_agent
+            agent = create_react_agent(llm=llm, tools=tools, prompt=self.get_prompt())
+            executor = AgentExecutor(
+                agent=agent,
+                tools=tools,
+                verbose=verbose,
+                handle_parsing_errors=True
+            )
+            self._executors[key] = executor
+            while len(self._executors) > self.max_size:
+                self._executors.popitem(last=False)
+            return executor
+    
+    def get_tool_calling_llm(self, llm_prefix: str, temperature: float, llm, tools: List[BaseTool]):
+        """Return the LLM with the tools bound for native tool calling, binding it on a miss."""
+        key = (llm_prefix.lower(), temperature, tuple(tool.name for tool in tools))
+        with self._lock:
+            bound = self._tool_llms.get(key)
+            if bound is None:
+                bound = llm.bind_tools(tools)
+                self._tool_llms[key] = bound
+                while len(self._tool_llms) > self.max_size:
+                    self._tool_llms.popitem(last=False)
+            else:
+                self._tool_llms.move_to_end(key)
+            return bound
+    
+    def clear(self) -> None:
+        """Drop all prebuilt executors and tools."""
+        with self._lock:
+            self._executors.clear()
+            self._tool_llms.clear()
+            self._tools.clear()
+
+
+# Registry shared by every OrchestraAgent in the process
+travel_agent_registry = TravelAgentRegistry()
+
+
+class _FinalAnswerSplitter:
+    """Split streamed ReAct tokens into 'thinking' and 'response' pieces.
+    
+    Text before the "Final Answer:" marker is the agent's reasoning; text after it is the
+    answer for the user. The marker may arrive split across tokens, so a tail shorter than
+    the marker is held back until it can be classified.
+    """
+    
+    MARKER = "Final Answer:"
+    
+    def __init__(self):
+        self._pending = ""
+        self._in_answer = False
+        self._answer_started = False
+    
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        """Consume a token and return the (event type, text) pieces ready to emit."""
+        if self._in_answer:
+            if not self._answer_started:
+                text = text.lstrip()
+                self._answer_started = bool(text)
+            return [("response", text)] if text else []
+        
+        self._pending += text
+        pieces = []
+        if self.MARKER in self._pending:
+            thinking, answer = self._pending.split(self.MARKER, 1)
+            self._pending = ""
+            self._in_answer = True
+            if thinking:
+                pieces.append(("thinking", thinking))
+            answer = answer.lstrip()
+            if answer:
+                self._answer_started = True
+                pieces.append(("response", answer))
+            return pieces
+        
+        # Hold back any tail that could be the start of the marker
+        hold = 0
+        for size in range(min(len(self.MARKER) - 1, len(self._pending)), 0, -1):
+            if self.MARKER.startswith(self._pending[-size:]):
+                hold = size
+                break
+        ready = self._pending[:len(self._pending) - hold]
+        self._pending = self._pending[len(self._pending) - hold:]
+        if ready:
+            pieces.append(("thinking", ready))
+        return pieces
+    
+    def flush(self) -> List[Tuple[str, str]]:
+        """Return whatever is still held back at the end of an LLM call."""
+        pending, self._pending = self._pending, ""
+        if not pending:
+            return []
+        return [("response" if self._in_answer else "thinking", pending)]
+
+
+class ConversationContext:
+    """Token-budgeted view of a conversation for building LLM prompts.
+    
+    Keeps a sliding window of the newest messages that fits ``max_prompt_tokens``. Messages
+    that fall out of the window are folded into a running summary in batches of
+    ``summary_batch`` messages, so one summarization call covers several turns.
+    
+    Non-system messages are numbered from the start of the conversation, so the summary
+    covers a count of messages rather than a position in the current history; this holds
+    when a session store trims old messages, and when a message is repeated word for word.
+    Converted messages and their token counts are cached by that number, and the token
+    counts are saved with the session state, so a resumed session only counts the
+    messages added since the last save.
+    
+    Token counts are a fast estimate (about four characters per token) unless a
+    ``token_counter`` callable is supplied.
+    """
+    
+    SUMMARY_PROMPT = (
+        "Update the running summary of a conversation with the new messages below. "
+        "Keep names, places, dates, preferences and decisions; drop pleasantries. "
+        "Reply with the updated summary only.\n\n"
+        "Current summary:\n{summary}\n\nNew messages:\n{transcript}"
+    )
+    
+    # Tokens added per message for role markers and separators
+    MESSAGE_OVERHEAD_TOKENS = 4
+    
+    def __init__(self, max_prompt_tokens: int = 6000, summarize: bool = True, summary_batch: int = 6, token_counter=None):
+        """Initialize the context.
+        
+        Args:
+            max_prompt_tokens: Token budget for the messages sent to the LLM.
+            summarize: Whether evicted messages are folded into a running summary. When False
+                they are simply dropped from the prompt.
+            summary_batch: Number of evicted messages collected before a summarization call.
+            token_counter: Optional callable returning the token count of a string.
+        """
+        self.max_prompt_tokens = max_prompt_tokens
+        self.summarize = summarize
+        self.summary_batch = summary_batch
+        self.token_counter = token_counter
+        self.summary = ""
+        # Non-system messages, counted from the start of the conversation, folded into the summary
+        self.summarized_count = 0
+        # Non-system messages trimmed from the front of the history by the session store
+        self.trimmed_count = 0
+        # Sequence number (or ('system', index)) -> (role, content, converted message, token count)
+        self._cache: Dict[Any, Tuple[str, str, Optional[BaseMessage], int]] = {}
+        # Token counts restored from the session state, by sequence number
+        self._saved_tokens: Dict[int, int] = {}
+        # (converted message, token count), aligned with the history of the last call
+        self._entries: List[Tuple[Optional[BaseMessage], int]] = []
+        self.last_stats: Dict[str, Any] = {}
+    
+    def count_tokens(self, text: str) -> int:
+        """Count (or estimate) the tokens in a string."""
+        if self.token_counter is not None:
+            return self.token_counter(text)
+        return len(text) // 4 + 1
+    
+    @staticmethod
+    def _to_message(message: Dict[str, Any]) -> Optional[BaseMessage]:
+        if message["role"] == "system":
+            return SystemMessage(content=message["content"])
+        elif message["role"] == "user":
+            return HumanMessage(content=message["content"])
+        elif message["role"] == "assistant":
+            return AIMessage(content=message["content"])
+        return None
+    
+    def _sync(self, history: List[Dict[str, Any]]) -> int:
+        """Convert and count messages not seen before. Returns how many were counted."""
+        cache: Dict[Any, Tuple[str, str, Optional[BaseMessage], int]] = {}
+        self._entries = []
+        counted = 0
+        seq = self.trimmed_count
+        for index, message in enumerate(history):
+            if message["role"] == "system":
+                key: Any = ("system", index)
+            else:
+                key = seq
+                seq += 1
+            entry = self._cache.get(key)
+            if entry is None or entry[0] != message["role"] or entry[1] != message["content"]:
+                tokens = self._saved_tokens.get(key) if entry is None and isinstance(key, int) else None
+                if tokens is None:
+                    tokens = self.count_tokens(message["content"]) + self.MESSAGE_OVERHEAD_TOKENS
+                    counted += 1
+                entry = (message["role"], message["content"], self._to_message(message), tokens)
+            cache[key] = entry
+            self._entries.append((entry[2], entry[3]))
+        # Drop entries for messages no longer in the history
+        self._cache = cache
+        self._saved_tokens = {}
+        return counted
+    
+    def _plan(self, history: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Split the history into system messages, the window and evicted-but-unsummarized messages."""
+        converted = self._sync(history)
+        system = [i for i, m in enumerate(history) if m["role"] == "system" and self._entries[i][0] is not None]
+        others = [i for i, m in enumerate(history) if m["role"] != "system" and self._entries[i][0] is not None]
+        
+        # The first messages of the conversation are already in the summary
+        summarized = self._summarized_in(history, others)
+        
+        budget = self.max_prompt_tokens - sum(self._entries[i][1] for i in system)
+        if self.summary:
+            budget -= self.count_tokens(self.summary) + self.MESSAGE_OVERHEAD_TOKENS
+        
+        # Newest messages first until the budget runs out; the latest message is always kept
+        window_start = len(others)
+        used = 0
+        while window_start > 0:
+            tokens = self._entries[others[window_start - 1]][1]
+            if used + tokens > budget and window_start < len(others):
+                break
+            used += tokens
+            window_start -= 1
+        window_start = max(window_start, summarized)
+        
+        return {
+            "converted": converted,
+            "system": system,
+            "others": others,
+            "pending": others[summarized:window_start],
+            "window": others[window_start:],
+        }
+    
+    def _sequence_numbers(self, history: List[Dict[str, Any]], positions: List[int]) -> List[int]:
+        """Conversation-wide sequence numbers of the given history positions."""
+        numbers = []
+        seq = self.trimmed_count
+        wanted = set(positions)
+        for index, message in enumerate(history):
+            if message["role"] == "system":
+                continue
+            if index in wanted:
+                numbers.append(seq)
+            seq += 1
+        return numbers
+    
+    def _summarized_in(self, history: List[Dict[str, Any]], others: List[int]) -> int:
+        """How many of ``others`` (history positions, oldest first) are covered by the summary."""
+        return sum(1 for seq in self._sequence_numbers(history, others) if seq < self.summarized_count)
+    
+    def _summary_request(self, history: List[Dict[str, Any]], pending: List[int]) -> List[BaseMessage]:
+        transcript = "\n".join(f"{history[i]['role']}: {history[i]['content']}" for i in pending)
+        prompt = self.SUMMARY_PROMPT.format(summary=self.summary or "(empty)", transcript=transcript)
+        return [HumanMessage(content=prompt)]
+    
+    def _should_summarize(self, pending: List[int]) -> bool:
+        return self.summarize and len(pending) >= self.summary_batch
+    
+    def _finish(self, history: List[Dict[str, Any]], plan: Dict[str, Any], summarized_now: int) -> List[BaseMessage]:
+        """Assemble the prompt messages and record this request's counters."""
+        messages = [self._entries[i][0] for i in plan["system"]]
+        if self.summary:
+            messages.append(SystemMessage(content=f"Summary of the earlier conversation: {self.summary}"))
+        messages.extend(self._entries[i][0] for i in plan["window"])
+        
+        history_tokens = sum(entry[1] for entry in self._entries if entry[0] is not None)
+        prompt_tokens = sum(self._entries[i][1] for i in plan["system"] + plan["window"])
+        if self.summary:
+            prompt_tokens += self.count_tokens(self.summary) + self.MESSAGE_OVERHEAD_TOKENS
+        
+        self.last_stats = {
+            "history_tokens": history_tokens,
+            "prompt_tokens": prompt_tokens,
+            "prompt_tokens_saved": max(0, history_tokens - prompt_tokens),
+            "window_messages": len(plan["window"]),
+            "summarized_messages": summarized_now,
+            "dropped_messages": len(plan["pending"]),
+            "converted_messages": plan["converted"],
+            "cached_messages": len(self._entries) - plan["converted"],
+        }
+        return messages
+    
+    def _apply_summary(self, history: List[Dict[str, Any]], plan: Dict[str, Any], summary: str) -> Dict[str, Any]:
+        """Store the new summary and re-plan the window around its size."""
+        self.summary = summary.strip()
+        self.summarized_count = self._sequence_numbers(history, plan["pending"][-1:])[0] + 1
+        replanned = self._plan(history)
+        replanned["converted"] = plan["converted"]
+        return replanned
+    
+    def build_messages(self, history: List[Dict[str, Any]], llm=None) -> List[BaseMessage]:
+        """Build the prompt messages for a history, summarizing evicted turns with ``llm`` if due."""
+        plan = self._plan(history)
+        summarized_now = 0
+        if llm is not None and self._should_summarize(plan["pending"]):
+            response = llm.invoke(self._summary_request(history, plan["pending"]))
+            summarized_now = len(plan["pending"])
+            plan = self._apply_summary(history, plan, response.content)
+        return self._finish(history, plan, summarized_now)
+    
+    async def abuild_messages(self, history: List[Dict[str, Any]], llm=None) -> List[BaseMessage]:
+        """Async version of ``build_messages``."""
+        plan = self._plan(history)
+        summarized_now = 0
+        if llm is not None and self._should_summarize(plan["pending"]):
+            response = await llm.ainvoke(self._summary_request(history, plan["pending"]))
+            summarized_now = len(plan["pending"])
+            plan = self._apply_summary(history, plan, response.content)
+        return self._finish(history, plan, summarized_now)
+    
+    def reset(self) -> None:
+        """Forget the summary, the message numbering and the converted-message cache."""
+        self.summary = ""
+        self.summarized_count = 0
+        self.trimmed_count = 0
+        self._cache = {}
+        self._saved_tokens = {}
+        self._entries = []
+    
+    def get_state(self, history: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Return the state to persist alongside a session holding ``history``.
+        
+        Besides the summary this records how many non-system messages the conversation has
+        had and how many of them are summarized, plus the cached token counts of the
+        non-system messages in ``history``.
+        """
+        token_counts = []
+        seq = self.trimmed_count
+        for index, message in enumerate(history):
+            if message["role"] == "system":
+                continue
+            entry = self._cache.get(seq)
+            # None for messages not counted yet (e.g. the reply added after the prompt was built)
+            token_counts.append(entry[3] if entry is not None and entry[1] == message["content"] else None)
+            seq += 1
+        return {
+            "summary": self.summary,
+            "summarized_count": self.summarized_count,
+            "message_count": seq,
+            "token_counts": token_counts,
+        }
+    
+    def load_state(self, state: Optional[Dict[str, Any]], history: List[Dict[str, Any]]) -> None:
+        """Restore state saved by ``get_state`` for a session whose stored history is ``history``.
+        
+        Messages the store trimmed since the save are worked out from the saved message
+        count, so the numbering (and with it the summarized messages) stays in place.
+        """
+        state = state or {}
+        self.reset()
+        self.summary = state.get("summary", "")
+        self.summarized_count = int(state.get("summarized_count", 0))
+        present = sum(1 for message in history if message["role"] != "system")
+        message_count = int(state.get("message_count", present))
+        self.trimmed_count = max(0, message_count - present)
+        token_counts = state.get("token_counts") or []
+        first = message_count - len(token_counts)
+        self._saved_tokens = {first + offset: tokens for offset, tokens in enumerate(token_counts) if tokens is not None}
+
+
 class OrchestraAgent:
     """A simplified agent that processes queries using LLMs and tools.
     
     Supports basic conversation and travel planning functionality.
     """
     
-    def __init__(self, llm_prefix: str = "deepseek", system_prompt: Optional[str] = None, temperature: float = 0.7, use_tools: bool = True):
+    def __init__(self, llm_prefix: str = "deepseek", system_prompt: Optional[str] = None, temperature: float = 0.7, use_tools: bool = True, verbose: bool = True, conversation_history: Optional[List[Dict[str, Any]]] = None, max_prompt_tokens: Optional[int] = None, tool_mode: str = "react", response_cache=None):
         """Initialize the OrchestraAgent.
         
         Args:
-            llm_prefix: LLM provider to use ('openai', 'gemini', 'deepseek').
+            llm_prefix: LLM provider to use ('openai', 'gemini', 'deepseek', or 'auto' to route between them).
             system_prompt: Optional system prompt.
             temperature: Temperature for the LLM.
             use_tools: Whether to use tools.
+            verbose: Whether the travel agent prints its reasoning trace to stdout.
+                Servers should pass False, since stdout tracing serializes under concurrency.
+            conversation_history: Optional prior history to resume (e.g. from a session store).
+                When given, it already holds the system prompt and ``system_prompt`` is ignored.
+            max_prompt_tokens: Token budget for the history sent to the LLM. Defaults to the
+                AGENT_MAX_PROMPT_TOKENS environment variable (6000).
+            tool_mode: How travel mode uses tools. 'react' runs the ReAct agent, one tool per
+                LLM round-trip. 'parallel' uses native tool calling so the model can request
+                several tools in one step; they run concurrently before the next LLM turn.
+            response_cache: Optional ``memory.semantic_cache.SemanticResponseCache``. When set,
+                the first question of a chat conversation is answered from the cache if the
+                same or a near-identical question was answered before.
+                
+        Raises:
+            ValueError: If the tool mode is not supported.
         """
-        self.llm = LLMFactory.get_llm(llm_prefix, temperature=temperature)
+        if tool_mode not in ("react", "parallel"):
+            raise ValueError(f"Unsupported tool mode: {tool_mode}. Supported modes: 'react', 'parallel'.")
+        self.tool_mode = tool_mode
+        self.llm_prefix = llm_prefix
+        self.temperature = temperature
+        self.verbose = verbose
+        # Reuse a pooled client so connections survive across requests
+        self.llm = LLMFactory.get_pooled_llm(llm_prefix, temperature=temperature)
         self.conversation_history: List[Dict[str, Any]] = []
+        self.session_store = None
+        self.session_id: Optional[str] = None
+        self._persisted_count = 0
+        self.response_cache = response_cache
+        # Details of the cache hit that answered the last chat query, if any
+        self.last_cache_hit: Optional[Dict[str, Any]] = None
+        
+        # Windowed, summarized view of the history used to build prompts
+        if max_prompt_tokens is None:
+            max_prompt_tokens = int(os.getenv("AGENT_MAX_PROMPT_TOKENS", "6000"))
+        self.context = ConversationContext(
+            max_prompt_tokens=max_prompt_tokens,
+            summarize=os.getenv("AGENT_SUMMARIZE_HISTORY", "true").lower() == "true"
+        )
         
         # Initialize tools
         self.tools: List[BaseTool] = []
         if use_tools:
-            self.tools = [
-                WeatherTool(),
-                TimeTool(),
-                CityFactsTool()
-            ]
+            self.tools = travel_agent_registry.get_tools()
+        self._tools_by_name = {tool.name: tool for tool in self.tools}
         
         # Set default system prompt
         if system_prompt is None:
             system_prompt = "You are a helpful assistant. Answer questions concisely and accurately."
         
-        # Add system message to conversation history
-        self.conversation_history.append({"role": "system", "content": system_prompt})
+        # Resume a stored conversation, or start one with the system message
+        if conversation_history:
+            self.conversation_history = [dict(message) for message in conversation_history]
+        else:
+            self.conversation_history.append({"role": "system", "content": system_prompt})
         
         # Create travel agent if tools are enabled
         if use_tools:
             self._initialize_travel_agent()
     
-    def _initialize_travel_agent(self):
-        """Initialize the travel agent with tools."""
-        # Create a proper ReAct prompt with required variables
-        travel_prompt = """You are a travel assistant. Help plan trips and provide information about destinations.
-        
-        You have access to the following tools:
-        
-        {tools}
-        
-        Use the following format:
-        
-        Question: the input question you must answer
-        Thought: you should always think about what to do
-        Action: the action to take, should be one of [{tool_names}]
-        Action Input: the input to the action
-        Observation: the result of the action
-        ... (this Thought/Action/Action Input/Observation can repeat N times)
-        Thought: I now know the final answer
-        Final Answer: the final answer to the original input question
-        
-        Begin!
+    @classmethod
+    def from_session(cls, session_store, session_id: Optional[str] = None, **kwargs) -> "OrchestraAgent":
+        """Create an agent bound to a server-side session.
         
-        Question: {input}
-        Thought:{agent_scratchpad}"""
-        
-        from langchain_core.prompts import PromptTemplate
-        prompt = PromptTemplate.from_template(travel_prompt)
-        
-        # Create the travel agent
-        self.travel_agent = create_react_agent(
+        Args:
+            session_store: A ``memory.session_store.SessionStore``.
+            session_id: Existing session to resume, or None to start a new session.
+            **kwargs: Arguments for the OrchestraAgent constructor.
+            
+        Returns:
+            OrchestraAgent: An agent whose history is loaded from the session.
+            
+        Raises:
+            SessionNotFoundError: If ``session_id`` is unknown or expired.
+        """
+        history = session_store.get_history(session_id) if session_id else None
+        agent = cls(conversation_history=history, **kwargs)
+        if session_id is None:
+            session_id = session_store.create_session(agent.conversation_history)
+        else:
+            agent.context.load_state(session_store.get_state(session_id), agent.conversation_history)
+        agent.session_store = session_store
+        agent.session_id = session_id
+        agent._persisted_count = len(agent.conversation_history)
+        return agent
+    
+    def save_session(self) -> None:
+        """Append the messages added since the last save to the bound session, if any."""
+        if self.session_store is None:
+            return
+        new_messages = self.conversation_history[self._persisted_count:]
+        if new_messages:
+            self.session_store.append(self.session_id, new_messages)
+        self.session_store.set_state(self.session_id, self.context.get_state(self.conversation_history))
+        self._persisted_count = len(self.conversation_history)
+    
+    def _initialize_travel_agent(self):
+        """Attach the shared, prebuilt travel agent executor for this provider and tool set."""
+        self.travel_agent_executor = travel_agent_registry.get_executor(
+            llm_prefix=self.llm_prefix,
+            temperature=self.temperature,
             llm=self.llm,
             tools=self.tools,
-            prompt=prompt
-        )
-        
-        # Create the agent executor
-        self.travel_agent_executor = AgentExecutor(
-            agent=self.travel_agent,
-            tools=self.tools,
-            verbose=True,
-            handle_parsing_errors=True
+            verbose=self.verbose
         )
+        self.travel_agent = self.travel_agent_executor.agent
+    
+    def query_mode(self, use_travel_agent: bool = False) -> str:
+        """Name of the path a query takes ('chat', 'travel' or 'parallel'), used as a metrics label."""
+        if use_travel_agent and self.tools and self.tool_mode == "parallel":
+            return "parallel"
+        return "travel" if use_travel_agent and hasattr(self, 'travel_agent_executor') else "chat"
     
     def process_query(self, query: str, use_travel_agent: bool = False) -> Union[str, Dict[str, Any]]:
         """Process a user query and return a response.
@@ -113,48 +649,326 @@ class OrchestraAgent:
         Returns:
             String response or dictionary with structured data.
         """
+        with timed(AGENT_QUERY_SECONDS, provider=self.llm_prefix.lower(), mode=self.query_mode(use_travel_agent), streaming="false"):
+            return self._process_query(query, use_travel_agent)
+    
+    def _process_query(self, query: str, use_travel_agent: bool) -> Union[str, Dict[str, Any]]:
         # Add user message to history
         self.conversation_history.append({"role": "user", "content": query})
         
-        if use_travel_agent and hasattr(self, 'travel_agent_executor'):
+        if use_travel_agent and self.tools and self.tool_mode == "parallel":
+            return self._run_parallel_tools()
+        elif use_travel_agent and hasattr(self, 'travel_agent_executor'):
             # Use travel agent
             response = self.travel_agent_executor.invoke({"input": query})
-            raw_response = response.get("output", "I couldn't process that request.")
-            
-            try:
-                # Parse the response
-                parsed_response = self._parse_travel_agent_response(raw_response)
-                self.conversation_history.append({"role": "assistant", "content": parsed_response["response"]})
-                return parsed_response
-            except Exception as e:
-                # Return raw response on error
-                print(f"Error parsing response: {str(e)}")
-                self.conversation_history.append({"role": "assistant", "content": raw_response})
-                return raw_response
+            return self._record_travel_response(response)
         else:
             # Use standard conversation
+            scope = self._cache_scope()
+            if scope is not None:
+                cached = self._use_cache_hit(self.response_cache.lookup(scope[0], query, scope[1]))
+                if cached is not None:
+                    return cached
             messages = self._convert_history_to_messages()
             response = self.llm.invoke(messages)
             response_content = response.content
             self.conversation_history.append({"role": "assistant", "content": response_content})
+            if scope is not None:
+                self.response_cache.store(scope[0], query, response_content, scope[1])
+            return response_content
+    
+    async def aprocess_query(self, query: str, use_travel_agent: bool = False) -> Union[str, Dict[str, Any]]:
+        """Process a user query asynchronously and return a response.
+        
+        Uses ``ainvoke`` on the LLM and the travel agent executor so the event loop
+        is never blocked while waiting on the provider or on tools.
+        
+        Args:
+            query: The user's query.
+            use_travel_agent: Whether to use travel agent mode.
+            
+        Returns:
+            String response or dictionary with structured data.
+        """
+        with timed(AGENT_QUERY_SECONDS, provider=self.llm_prefix.lower(), mode=self.query_mode(use_travel_agent), streaming="false"):
+            return await self._aprocess_query(query, use_travel_agent)
+    
+    async def _aprocess_query(self, query: str, use_travel_agent: bool) -> Union[str, Dict[str, Any]]:
+        self.conversation_history.append({"role": "user", "content": query})
+        
+        if use_travel_agent and self.tools and self.tool_mode == "parallel":
+            async for event in self._astream_parallel_tools():
+                if event["type"] == "result":
+                    return event["content"]
+        elif use_travel_agent and hasattr(self, 'travel_agent_executor'):
+            response = await self.travel_agent_executor.ainvoke({"input": query})
+            return self._record_travel_response(response)
+        else:
+            scope = self._cache_scope()
+            if scope is not None:
+                hit = await asyncio.to_thread(self.response_cache.lookup, scope[0], query, scope[1])
+                cached = self._use_cache_hit(hit)
+                if cached is not None:
+                    return cached
+            messages = await self._aconvert_history_to_messages()
+            response = await self.llm.ainvoke(messages)
+            response_content = response.content
+            self.conversation_history.append({"role": "assistant", "content": response_content})
+            if scope is not None:
+                await asyncio.to_thread(self.response_cache.store, scope[0], query, response_content, scope[1])
             return response_content
     
+    async def astream_query(self, query: str, use_travel_agent: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a response as events while it is generated.
+        
+        Standard conversation yields 'response' token events straight from ``llm.astream``.
+        Travel agent mode uses ``astream_events`` on the executor and yields 'thinking'
+        tokens, 'tool_start'/'tool_end' events as tools run, and 'response' tokens once the
+        model starts its final answer. A 'complete' event ends the stream.
+        
+        Args:
+            query: The user's query.
+            use_travel_agent: Whether to use travel agent mode.
+            
+        Yields:
+            Event dictionaries with 'type' and optional 'content' keys.
+        """
+        self.conversation_history.append({"role": "user", "content": query})
+        
+        if use_travel_agent and self.tools and self.tool_mode == "parallel":
+            async for event in self._astream_parallel_tools():
+                if event["type"] != "result":
+                    yield event
+        elif use_travel_agent and hasattr(self, 'travel_agent_executor'):
+            splitter = _FinalAnswerSplitter()
+            response_text = ""
+            final_output = None
+            
+            async for event in self.travel_agent_executor.astream_events({"input": query}, version="v2"):
+                kind = event["event"]
+                pieces: List[Tuple[str, str]] = []
+                
+                if kind in ("on_chat_model_start", "on_llm_start"):
+                    # Each ReAct step is a new LLM call; only the last holds the answer
+                    splitter = _FinalAnswerSplitter()
+                elif kind in ("on_chat_model_stream", "on_llm_stream"):
+                    chunk = event["data"].get("chunk")
+                    text = chunk if isinstance(chunk, str) else getattr(chunk, "content", None) or getattr(chunk, "text", "")
+                    if isinstance(text, str) and text:
+                        pieces = splitter.feed(text)
+                elif kind in ("on_chat_model_end", "on_llm_end"):
+                    pieces = splitter.flush()
+                elif kind == "on_tool_start":
+                    yield {"type": "tool_start", "content": {"name": event["name"], "input": event["data"].get("input")}}
+                elif kind == "on_tool_end":
+                    yield {"type": "tool_end", "content": {"name": event["name"], "output": event["data"].get("output")}}
+                elif kind == "on_chain_end" and event["name"] == "AgentExecutor" and not event.get("parent_ids"):
+                    output = event["data"].get("output")
+                    if isinstance(output, dict):
+                        final_output = output.get("output")
+                
+                for event_type, text in pieces:
+                    if event_type == "response":
+                        response_text += text
+                    yield {"type": event_type, "content": text}
+            
+            # Early stops and parsing-error fallbacks never stream a "Final Answer:" marker
+            if not response_text.strip() and final_output:
+                response_text = final_output
+                yield {"type": "response", "content": final_output}
+            self.conversation_history.append({"role": "assistant", "content": (final_output or response_text).strip()})
+        else:
+            scope = self._cache_scope()
+            cached = None
+            if scope is not None:
+                hit = await asyncio.to_thread(self.response_cache.lookup, scope[0], query, scope[1])
+                cached = self._use_cache_hit(hit)
+            if cached is not None:
+                yield {"type": "response", "content": cached}
+            else:
+                messages = await self._aconvert_history_to_messages()
+                response_content = ""
+                async for chunk in self.llm.astream(messages):
+                    if getattr(chunk, "content", None):
+                        response_content += chunk.content
+                        yield {"type": "response", "content": chunk.content}
+                self.conversation_history.append({"role": "assistant", "content": response_content})
+                if scope is not None:
+                    await asyncio.to_thread(self.response_cache.store, scope[0], query, response_content, scope[1])
+            if scope is not None:
+                yield {"type": "complete", "cache_hit": self.last_cache_hit}
+                return
+        
+        yield {"type": "complete"}
+    
+    def stream_query(self, query: str, use_travel_agent: bool = False) -> Iterator[Dict[str, Any]]:
+        """Synchronous version of ``astream_query`` for WSGI servers.
+        
+        The async stream runs on the process-wide background event loop and each event is
+        handed back as soon as it is produced.
+        """
+        return background_loop.iterate(self.astream_query(query, use_travel_agent=use_travel_agent))
+    
+    def _cache_scope(self) -> Optional[Tuple[str, str]]:
+        """Return (partition, system prompt) when the latest query may use the response cache.
+        
+        Only the opening question of a conversation is cached: later turns depend on the
+        earlier ones, so a matching question is not necessarily asking the same thing.
+        """
+        self.last_cache_hit = None
+        if self.response_cache is None:
+            return None
+        turns = [message for message in self.conversation_history if message["role"] != "system"]
+        if len(turns) != 1:
+            return None
+        system_prompt = "\n".join(message["content"] for message in self.conversation_history if message["role"] == "system")
+        return self.llm_prefix.lower(), system_prompt
+    
+    def _use_cache_hit(self, hit: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Record a response cache hit in the history and return its answer."""
+        if hit is None:
+            return None
+        self.last_cache_hit = {"match": hit["match"], "similarity": hit["similarity"]}
+        self.conversation_history.append({"role": "assistant", "content": hit["response"]})
+        return hit["response"]
+    
+    def _tool_calling_llm(self):
+        return travel_agent_registry.get_tool_calling_llm(self.llm_prefix, self.temperature, self.llm, self.tools)
+    
+    def _tool_message(self, call: Dict[str, Any], result: Any) -> ToolMessage:
+        content = result if isinstance(result, str) else json.dumps(result, default=str)
+        return ToolMessage(content=content, tool_call_id=call["id"], name=call["name"])
+    
+    def _invoke_tool(self, call: Dict[str, Any]) -> ToolMessage:
+        """Run one tool call synchronously; errors become the tool's observation."""
+        tool = self._tools_by_name.get(call["name"])
+        try:
+            result = tool.invoke(call["args"]) if tool else {"error": f"Unknown tool: {call['name']}"}
+        except Exception as e:
+            result = {"error": f"Tool {call['name']} failed: {str(e)}"}
+        return self._tool_message(call, result)
+    
+    async def _ainvoke_tool(self, call: Dict[str, Any], semaphore: asyncio.Semaphore) -> ToolMessage:
+        """Run one tool call asynchronously, bounded by ``semaphore``."""
+        tool = self._tools_by_name.get(call["name"])
+        async with semaphore:
+            try:
+                result = await tool.ainvoke(call["args"]) if tool else {"error": f"Unknown tool: {call['name']}"}
+            except Exception as e:
+                result = {"error": f"Tool {call['name']} failed: {str(e)}"}
+        return self._tool_message(call, result)
+    
+    def _record_parallel_response(self, thinking: str, content: Any, function_calls: List[FunctionCall]) -> Dict[str, Any]:
+        response = content if isinstance(content, str) else str(content)
+        self.conversation_history.append({"role": "assistant", "content": response})
+        return {
+            "thinking": thinking.strip(),
+            "response": response,
+            "function_calls": function_calls
+        }
+    
+    def _run_parallel_tools(self) -> Dict[str, Any]:
+        """Answer the latest query with native tool calling, running each step's tools concurrently.
+        
+        Each LLM turn may request several tool calls; they run together on the shared tool
+        pool and all observations are added before the next turn, so independent lookups
+        cost one round-trip instead of one each.
+        """
+        llm = self._tool_calling_llm()
+        messages = _with_system_instructions(self._convert_history_to_messages(), PARALLEL_TOOLS_PROMPT)
+        thinking = ""
+        function_calls: List[FunctionCall] = []
+        
+        for _ in range(MAX_TOOL_ROUNDS):
+            ai_message = llm.invoke(messages)
+            messages.append(ai_message)
+            if not ai_message.tool_calls:
+                break
+            if isinstance(ai_message.content, str):
+                thinking += ai_message.content
+            function_calls.extend(FunctionCall(name=call["name"], arguments=call["args"]) for call in ai_message.tool_calls)
+            messages.extend(_tool_executor.map(self._invoke_tool, ai_message.tool_calls))
+        else:
+            # Out of tool rounds: answer from the observations gathered so far
+            ai_message = self.llm.invoke(messages)
+        
+        return self._record_parallel_response(thinking, ai_message.content, function_calls)
+    
+    async def _astream_parallel_tools(self) -> AsyncIterator[Dict[str, Any]]:
+        """Async, streaming version of ``_run_parallel_tools``.
+        
+        Yields 'response' tokens, 'tool_start' for every requested call, 'tool_end' as each
+        call finishes, and finally a 'result' event holding the structured response.
+        """
+        llm = self._tool_calling_llm()
+        messages = _with_system_instructions(await self._aconvert_history_to_messages(), PARALLEL_TOOLS_PROMPT)
+        semaphore = asyncio.Semaphore(TOOL_CONCURRENCY)
+        thinking = ""
+        function_calls: List[FunctionCall] = []
+        content: Any = ""
+        
+        for round_index in range(MAX_TOOL_ROUNDS + 1):
+            # The last round runs without tools so the model has to answer
+            round_llm = llm if round_index < MAX_TOOL_ROUNDS else self.llm
+            merged = None
+            async for chunk in round_llm.astream(messages):
+                merged = chunk if merged is None else merged + chunk
+                if isinstance(chunk.content, str) and chunk.content:
+                    yield {"type": "response", "content": chunk.content}
+            if merged is None:
+                break
+            content = merged.content
+            tool_calls = getattr(merged, "tool_calls", None) or []
+            messages.append(AIMessage(content=content, tool_calls=tool_calls))
+            if not tool_calls:
+                break
+            
+            if isinstance(content, str):
+                thinking += content
+            for call in tool_calls:
+                function_calls.append(FunctionCall(name=call["name"], arguments=call["args"]))
+                yield {"type": "tool_start", "content": {"name": call["name"], "input": call["args"]}}
+            tasks = [asyncio.ensure_future(self._ainvoke_tool(call, semaphore)) for call in tool_calls]
+            for finished in asyncio.as_completed(tasks):
+                tool_message = await finished
+                yield {"type": "tool_end", "content": {"name": tool_message.name, "output": tool_message.content}}
+            # Observations go back in the order the model requested them
+            messages.extend(task.result() for task in tasks)
+        
+        yield {"type": "result", "content": self._record_parallel_response(thinking, content, function_calls)}
+    
+    def _record_travel_response(self, response: Dict[str, Any]) -> Union[str, Dict[str, Any]]:
+        """Parse a travel agent executor result and append it to the history."""
+        raw_response = response.get("output", "I couldn't process that request.")
+        
+        try:
+            # Parse the response
+            parsed_response = self._parse_travel_agent_response(raw_response)
+            self.conversation_history.append({"role": "assistant", "content": parsed_response["response"]})
+            return parsed_response
+        except Exception as e:
+            # Return raw response on error
+            print(f"Error parsing response: {str(e)}")
+            self.conversation_history.append({"role": "assistant", "content": raw_response})
+            return raw_response
+    
     def _convert_history_to_messages(self):
-        """Convert history to LangChain messages."""
-        messages = []
-        for message in self.conversation_history:
-            if message["role"] == "system":
-                messages.append(SystemMessage(content=message["content"]))
-            elif message["role"] == "user":
-                messages.append(HumanMessage(content=message["content"]))
-            elif message["role"] == "assistant":
-                messages.append(AIMessage(content=message["content"]))
-        return messages
+        """Convert history to LangChain messages, windowed to the prompt token budget."""
+        return self.context.build_messages(self.conversation_history, self.llm)
+    
+    async def _aconvert_history_to_messages(self):
+        """Async version of ``_convert_history_to_messages``."""
+        return await self.context.abuild_messages(self.conversation_history, self.llm)
+    
+    def get_context_stats(self) -> Dict[str, Any]:
+        """Get prompt size counters (tokens saved, window size, summarization) for the last request."""
+        return dict(self.context.last_stats)
     
     def clear_history(self):
         """Clear history except system prompt."""
         system_prompt = next((msg for msg in self.conversation_history if msg["role"] == "system"), None)
         self.conversation_history = [system_prompt] if system_prompt else []
+        self.context.reset()
     
     def get_conversation_history(self) -> List[Dict[str, Any]]:
         """Get conversation history."""
@@ -0,0 +1,124 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from agents.orchestra_agent import ConversationContext
+from memory.session_store import InMemorySessionStore
+
+
+class StubSummarizer:
+    """Chat model stand-in that records the summary requests it receives."""
+
+    def __init__(self):
+        self.requests = []
+
+    def invoke(self, messages):
+        self.requests.append(messages[0].content)
+        return AIMessage(content=f"summary {len(self.requests)}")
+
+
+def _turns(*texts):
+    history = []
+    for index, text in enumerate(texts):
+        history.append({"role": "user", "content": text})
+        history.append({"role": "assistant", "content": f"reply {index} " + "x" * 60})
+    return history
+
+
+def test_short_history_is_sent_unchanged():
+    context = ConversationContext(max_prompt_tokens=1000)
+    history = [{"role": "system", "content": "Be brief."}] + _turns("hello")
+
+    messages = context.build_messages(history, StubSummarizer())
+
+    assert [type(message) for message in messages] == [SystemMessage, HumanMessage, AIMessage]
+    assert context.last_stats["summarized_messages"] == 0
+    assert context.last_stats["prompt_tokens_saved"] == 0
+
+
+def test_evicted_messages_are_summarized_in_batches():
+    context = ConversationContext(max_prompt_tokens=60, summary_batch=4)
+    summarizer = StubSummarizer()
+    history = [{"role": "system", "content": "Be brief."}] + _turns("one", "two", "three", "four")
+
+    messages = context.build_messages(history, summarizer)
+
+    assert len(summarizer.requests) == 1
+    assert context.summary == "summary 1"
+    assert messages[1].content == "Summary of the earlier conversation: summary 1"
+    assert context.last_stats["summarized_messages"] == context.summarized_count
+    assert context.last_stats["prompt_tokens"] <= context.last_stats["history_tokens"]
+
+
+def test_repeated_message_does_not_hide_unsummarized_turns():
+    context = ConversationContext(max_prompt_tokens=40, summary_batch=2)
+    history = [{"role": "system", "content": "Be brief."}] + _turns("hi", "thanks", "plan a trip", "ok")
+    context.build_messages(history, StubSummarizer())
+    summarized = context.summarized_count
+    assert summarized > 0
+
+    # "thanks" again, after a turn that must stay in the prompt
+    history += [{"role": "user", "content": "My budget is $900"}, {"role": "assistant", "content": "Noted."},
+                {"role": "user", "content": "thanks"}]
+    context.max_prompt_tokens = 100000
+    messages = context.build_messages(history, StubSummarizer())
+
+    assert context.summarized_count == summarized
+    assert any("$900" in message.content for message in messages)
+
+
+def test_trimmed_session_keeps_its_summary_position():
+    store = InMemorySessionStore(max_messages=6)
+    session_id = store.create_session([{"role": "system", "content": "Be brief."}])
+    summarizer = StubSummarizer()
+
+    for turn in range(10):
+        history = store.get_history(session_id)
+        context = ConversationContext(max_prompt_tokens=60, summary_batch=2)
+        context.load_state(store.get_state(session_id), history)
+        saved = len(history)
+        history.append({"role": "user", "content": f"q{turn} " + "x" * 40})
+        context.build_messages(history, summarizer)
+        history.append({"role": "assistant", "content": f"a{turn} " + "y" * 40})
+        store.append(session_id, history[saved:])
+        store.set_state(session_id, context.get_state(history))
+
+    assert context.trimmed_count > 0
+    # Every message reaches the summarizer at most once, even after the store trimmed it
+    summarized = [line.split(":", 1)[1].split()[0] for request in summarizer.requests
+                  for line in request.split("New messages:\n", 1)[1].splitlines()]
+    assert len(summarized) == len(set(summarized))
+
+
+def test_token_counts_are_reused_across_requests():
+    calls = []
+
+    def counter(text):
+        calls.append(text)
+        return len(text.split())
+
+    history = [{"role": "system", "content": "Be brief."}] + _turns("hello", "again")
+    first = ConversationContext(token_counter=counter)
+    first.build_messages(history)
+    state = first.get_state(history)
+
+    calls.clear()
+    history.append({"role": "user", "content": "and once more"})
+    resumed = ConversationContext(token_counter=counter)
+    resumed.load_state(state, history)
+    resumed.build_messages(history)
+
+    # Only the system prompt and the new message are counted again
+    assert calls == ["Be brief.", "and once more"]
+    assert resumed.last_stats["cached_messages"] == 4
+
+
+def test_reset_forgets_summary_and_numbering():
+    context = ConversationContext(max_prompt_tokens=40, summary_batch=2)
+    history = [{"role": "system", "content": "Be brief."}] + _turns("one", "two", "three")
+    context.build_messages(history, StubSummarizer())
+
+    context.reset()
+
+    assert context.summary == ""
+    assert context.summarized_count == 0
+    assert context.get_state(history[:1]) == {
+        "summary": "", "summarized_count": 0, "message_count": 0, "token_counts": []}
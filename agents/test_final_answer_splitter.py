@@ -0,0 +1,42 @@
+from agents.orchestra_agent import _FinalAnswerSplitter
+
+
+def _split(tokens):
+    splitter = _FinalAnswerSplitter()
+    pieces = []
+    for token in tokens:
+        pieces.extend(splitter.feed(token))
+    pieces.extend(splitter.flush())
+    joined = {"thinking": "", "response": ""}
+    for kind, text in pieces:
+        joined[kind] += text
+    return joined
+
+
+def test_marker_in_one_token():
+    assert _split(["Thought: easy.\n", "Final Answer: Paris"]) == {
+        "thinking": "Thought: easy.\n", "response": "Paris"}
+
+
+def test_marker_split_across_tokens():
+    tokens = ["I know", " this.\nFin", "al An", "swer", ":", " ", "It is", " Paris."]
+    assert _split(tokens) == {"thinking": "I know this.\n", "response": "It is Paris."}
+
+
+def test_partial_marker_that_is_not_the_marker_is_released_as_thinking():
+    splitter = _FinalAnswerSplitter()
+    assert splitter.feed("Final") == []
+    assert splitter.feed(" thoughts") == [("thinking", "Final thoughts")]
+
+
+def test_without_marker_everything_is_thinking():
+    assert _split(["Thought: ", "call a tool", "\nAction: weather"]) == {
+        "thinking": "Thought: call a tool\nAction: weather", "response": ""}
+
+
+def test_leading_whitespace_of_the_answer_is_dropped():
+    splitter = _FinalAnswerSplitter()
+    assert splitter.feed("Final Answer:") == []
+    assert splitter.feed("  ") == []
+    assert splitter.feed(" Yes") == [("response", "Yes")]
+    assert splitter.feed(" indeed") == [("response", " indeed")]
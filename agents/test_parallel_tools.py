@@ -0,0 +1,117 @@
+import asyncio
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+
+from agents.orchestra_agent import PARALLEL_TOOLS_PROMPT, OrchestraAgent
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Replies with the scripted messages in order and records every prompt it was sent."""
+
+    replies: List[AIMessage]
+    prompts: List[List[BaseMessage]] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ScriptedChatModel":
+        return self
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        self.prompts.append(list(messages))
+        return ChatResult(generations=[ChatGeneration(message=self.replies[len(self.prompts) - 1])])
+
+
+@tool
+def weather(city: str) -> dict:
+    """Get the weather for a city."""
+    time.sleep(0.2)
+    return {"city": city, "temperature": "21C"}
+
+
+@tool
+def time_of_day(city: str) -> dict:
+    """Get the local time in a city."""
+    time.sleep(0.2)
+    return {"city": city, "time": "09:00"}
+
+
+def _tool_calls(*names):
+    return AIMessage(content="Looking that up.", tool_calls=[
+        {"name": name, "args": {"city": "Paris"}, "id": f"call-{i}"} for i, name in enumerate(names)])
+
+
+def _agent(*replies, **kwargs):
+    model = ScriptedChatModel(replies=list(replies), prompts=[])
+    agent = OrchestraAgent(llm_prefix="mock", tool_mode="parallel", verbose=False, **kwargs)
+    agent.llm = model
+    agent.tools = [weather, time_of_day]
+    agent._tools_by_name = {t.name: t for t in agent.tools}
+    agent._tool_calling_llm = lambda: model
+    return agent, model
+
+
+def test_tool_calls_in_one_step_run_concurrently():
+    agent, model = _agent(_tool_calls("weather", "time_of_day"), AIMessage(content="Sunny, 9am."))
+
+    start = time.perf_counter()
+    result = agent.process_query("Weather and time in Paris?", use_travel_agent=True)
+
+    assert time.perf_counter() - start < 0.35
+    assert result["response"] == "Sunny, 9am."
+    assert [call.name for call in result["function_calls"]] == ["weather", "time_of_day"]
+    observations = [m for m in model.prompts[1] if isinstance(m, ToolMessage)]
+    assert [m.tool_call_id for m in observations] == ["call-0", "call-1"]
+    assert agent.conversation_history[-1] == {"role": "assistant", "content": "Sunny, 9am."}
+
+
+def test_tool_errors_become_observations():
+    agent, model = _agent(_tool_calls("weather", "unknown"), AIMessage(content="Partial answer."))
+
+    assert agent.process_query("Weather in Paris?", use_travel_agent=True)["response"] == "Partial answer."
+    observations = [m.content for m in model.prompts[1] if isinstance(m, ToolMessage)]
+    assert "Unknown tool: unknown" in observations[1]
+
+
+def test_session_system_prompt_stays_first_and_single():
+    agent, model = _agent(AIMessage(content="Bonjour."), system_prompt="Answer in French.")
+
+    agent.process_query("Hello", use_travel_agent=True)
+
+    system = [m for m in model.prompts[0] if isinstance(m, SystemMessage)]
+    assert len(system) == 1 and model.prompts[0][0] is system[0]
+    assert system[0].content.startswith("Answer in French.")
+    assert PARALLEL_TOOLS_PROMPT in system[0].content
+
+
+def test_rolling_summary_is_folded_into_the_system_message():
+    agent, model = _agent(AIMessage(content="Done."), system_prompt="Answer in French.")
+    agent.context.summary = "The user is planning a trip to Lyon."
+
+    agent.process_query("And the weather?", use_travel_agent=True)
+
+    system = [m for m in model.prompts[0] if isinstance(m, SystemMessage)]
+    assert len(system) == 1
+    assert system[0].content.index("Answer in French.") < system[0].content.index(PARALLEL_TOOLS_PROMPT) \
+        < system[0].content.index("trip to Lyon")
+
+
+def test_async_stream_reports_tool_events():
+    agent, _ = _agent(_tool_calls("weather", "time_of_day"), AIMessage(content="Sunny, 9am."))
+
+    async def collect():
+        agent.conversation_history.append({"role": "user", "content": "Weather and time in Paris?"})
+        return [event async for event in agent._astream_parallel_tools()]
+
+    events = asyncio.run(collect())
+
+    kinds = [event["type"] for event in events]
+    assert kinds.count("tool_start") == 2 and kinds.count("tool_end") == 2
+    assert events[-1]["type"] == "result" and events[-1]["content"]["response"] == "Sunny, 9am."
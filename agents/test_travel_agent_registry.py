@@ -0,0 +1,57 @@
+from agents.orchestra_agent import OrchestraAgent, TravelAgentRegistry
+from LLMs.llm_router import MockChatModel
+
+
+def test_tools_are_shared_instances():
+    registry = TravelAgentRegistry()
+
+    first = registry.get_tools()
+    second = registry.get_tools(("time", "weather"))
+
+    assert [tool.name for tool in first] == ["weather", "time", "city_facts"]
+    assert second[0] is first[1] and second[1] is first[0]
+
+
+def test_executor_is_built_once_per_key():
+    registry = TravelAgentRegistry()
+    llm = MockChatModel()
+    tools = registry.get_tools()
+
+    executor = registry.get_executor("mock", 0.2, llm, tools)
+
+    assert registry.get_executor("MOCK", 0.2, MockChatModel(), tools) is executor
+    assert registry.get_executor("mock", 0.7, llm, tools) is not executor
+    assert registry.get_executor("mock", 0.2, llm, tools[:1]) is not executor
+    assert registry.get_executor("mock", 0.2, llm, tools, verbose=True) is not executor
+
+
+def test_least_recently_used_executor_is_dropped():
+    registry = TravelAgentRegistry(max_size=2)
+    llm = MockChatModel()
+    tools = registry.get_tools()
+
+    first = registry.get_executor("mock", 0.1, llm, tools)
+    registry.get_executor("mock", 0.2, llm, tools)
+    registry.get_executor("mock", 0.1, llm, tools)
+    registry.get_executor("mock", 0.3, llm, tools)
+
+    assert registry.get_executor("mock", 0.1, llm, tools) is first
+    assert len(registry._executors) == 2
+
+
+def test_tool_calling_llm_is_bound_once():
+    registry = TravelAgentRegistry()
+    tools = registry.get_tools()
+
+    bound = registry.get_tool_calling_llm("mock", 0.2, MockChatModel(), tools)
+
+    assert registry.get_tool_calling_llm("mock", 0.2, MockChatModel(), tools) is bound
+    assert [tool["function"]["name"] for tool in bound.kwargs["tools"]] == [tool.name for tool in tools]
+
+
+def test_agents_share_the_process_wide_executor():
+    first = OrchestraAgent(llm_prefix="mock", verbose=False)
+    second = OrchestraAgent(llm_prefix="mock", verbose=False)
+
+    assert first.travel_agent_executor is second.travel_agent_executor
+    assert first.conversation_history is not second.conversation_history
@@ -1,19 +1,37 @@
-from flask import Flask, request, jsonify, render_template, Response, stream_template
+from flask import Flask, g, request, jsonify, render_template, Response, stream_template
 from flask_cors import CORS
 from flask_swagger_ui import get_swaggerui_blueprint
-from rags.data_retriever import DataRetriever
+from rags.data_retriever import DataRetriever, SUPPORTED_PROVIDERS
 from dotenv import load_dotenv
 import os
 import json
+import threading
 import time
-from typing import Generator
+from typing import Generator, Optional
 
 # Import VectorDB integration
-from memory.pinecode.vectordb_manager import VectorDBManager
+from memory.pinecode.vectordb_manager import VectorDBManager, get_embedding_batcher_stats
+from memory.pinecode.ingestion import InvalidDocumentError, iter_ndjson_documents
 
 # Import OrchestraAgent
 from agents.orchestra_agent import OrchestraAgent
 
+# Import the shared LLM client pool
+from LLMs.llm_factory import llm_pool
+from LLMs.llm_router import get_router_stats
+
+# Import tool cache metrics
+from tools.weather_tool import get_weather_cache_stats
+
+# Import the conversation session store
+from memory.session_store import get_session_store, SessionNotFoundError
+
+# Import the semantic response cache
+from memory.semantic_cache import get_semantic_cache
+
+# Import the stage metrics exported at /metrics
+from utils.metrics import AGENT_QUERY_SECONDS, METRICS_ENABLED, REQUEST_SECONDS, observe, registry, timed
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -36,12 +54,25 @@ swaggerui_blueprint = get_swaggerui_blueprint(
 # Register Swagger UI blueprint with Flask app
 app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
 
-# List of supported providers
-SUPPORTED_PROVIDERS = {
-    "openai": "OpenAI embedding model (text-embedding-ada-002)",
-    "huggingface": "Hugging Face embedding models (sentence-transformers/all-mpnet-base-v2)",
-    "gemini": "Google Gemini embedding models (embedding-001)"
-}
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    # Streaming responses are timed until their headers are sent; the full stream is
+    # recorded in orchestra_agent_query_seconds
+    if METRICS_ENABLED and 'request_start' in g:
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        observe(REQUEST_SECONDS, time.perf_counter() - g.request_start, endpoint=endpoint, method=request.method)
+    return response
+
+# Upper bound for the client-requested delay between streamed tokens
+MAX_PACE_MS = 1000
+
+# Server-side conversation sessions shared by all agent endpoints
+session_store = get_session_store()
+
 
 @app.route('/')
 def home():
@@ -52,10 +83,13 @@ def home():
             "/embedding/models": "GET - List available embedding models",
             "/embedding/providers": "GET - List available LLM providers",
             "/health": "GET - Health check",
+            "/metrics": "GET - Prometheus metrics",
             "/api/agent/chat": "POST - Chat with Orchestra Agent (non-streaming)",
             "/api/agent/chat/stream": "POST - Chat with Orchestra Agent (streaming)",
             "/api/agent/travel": "POST - Travel planning with Orchestra Agent (non-streaming)",
             "/api/agent/travel/stream": "POST - Travel planning with Orchestra Agent (streaming)",
+            "/api/agent/sessions/<session_id>/history": "GET - Fetch a page of a session's conversation history",
+            "/api/agent/sessions/<session_id>": "DELETE - Delete a conversation session",
             "/vectordb/create": "POST - Create vector database",
             "/vectordb/add": "POST - Add documents to vector database",
             "/vectordb/search": "POST - Search vector database",
@@ -105,9 +139,63 @@ def get_providers():
 def health_check():
     return jsonify({
         "status": "healthy",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "llm_pool": llm_pool.stats(),
+        "sessions": session_store.stats(),
+        "weather_cache": get_weather_cache_stats(),
+        "semantic_cache": get_semantic_cache().stats() if get_semantic_cache() else None,
+        "embedding_batchers": get_embedding_batcher_stats(),
+        "llm_router": get_router_stats()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Stage latency histograms and counters in the Prometheus text format."""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+def get_response_cache(data: dict):
+    """The shared semantic response cache, unless disabled or the request sets 'use_cache' to false."""
+    return get_semantic_cache() if data.get('use_cache', True) else None
+
+def session_payload(agent: OrchestraAgent, data: dict) -> dict:
+    """Session fields for an agent response; the full history only when 'include_history' is set."""
+    payload = {
+        "session_id": agent.session_id,
+        "history_length": len(agent.conversation_history),
+        "context": agent.get_context_stats()
+    }
+    if data.get('include_history'):
+        payload["conversation_history"] = agent.get_conversation_history()
+    return payload
+
+@app.route('/api/agent/sessions/<session_id>/history', methods=['GET'])
+def get_session_history(session_id):
+    """Fetch a page of a session's conversation history."""
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = request.args.get('limit')
+        limit = int(limit) if limit is not None else None
+    except ValueError:
+        return jsonify({"error": "'offset' and 'limit' must be integers"}), 400
+    
+    try:
+        history = session_store.get_history(session_id, offset=offset, limit=limit)
+    except SessionNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    
+    return jsonify({
+        "session_id": session_id,
+        "offset": offset,
+        "messages": history
     })
 
+@app.route('/api/agent/sessions/<session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    """Delete a conversation session."""
+    if not session_store.delete(session_id):
+        return jsonify({"error": f"Unknown or expired session_id: {session_id}"}), 404
+    return jsonify({"session_id": session_id, "deleted": True})
+
 # Orchestra Agent endpoints
 @app.route('/api/agent/chat', methods=['POST'])
 def chat_with_agent():
@@ -123,21 +211,29 @@ def chat_with_agent():
         system_prompt = data.get('system_prompt')
         
         # Initialize agent
-        agent = OrchestraAgent(
+        agent = OrchestraAgent.from_session(
+            session_store,
+            session_id=data.get('session_id'),
             llm_prefix=llm_provider,
             system_prompt=system_prompt,
             temperature=temperature,
-            use_tools=False
+            use_tools=False,
+            verbose=False,
+            response_cache=get_response_cache(data)
         )
         
         # Process query
         response = agent.process_query(message, use_travel_agent=False)
+        agent.save_session()
         
         return jsonify({
             "response": response,
-            "conversation_history": agent.get_conversation_history()
+            "cache_hit": agent.last_cache_hit,
+            **session_payload(agent, data)
         })
         
+    except SessionNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -155,96 +251,62 @@ def travel_with_agent():
         system_prompt = data.get('system_prompt')
         
         # Initialize agent with tools
-        agent = OrchestraAgent(
+        agent = OrchestraAgent.from_session(
+            session_store,
+            session_id=data.get('session_id'),
             llm_prefix=llm_provider,
             system_prompt=system_prompt,
             temperature=temperature,
-            use_tools=True
+            use_tools=True,
+            verbose=False,
+            tool_mode=data.get('tool_mode', 'react')
         )
         
         # Process query with travel agent
         response = agent.process_query(message, use_travel_agent=True)
+        agent.save_session()
         
         return jsonify({
             "response": response,
-            "conversation_history": agent.get_conversation_history(),
+            **session_payload(agent, data),
             "available_tools": [tool.name for tool in agent.get_available_tools()]
         })
         
+    except SessionNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-def generate_streaming_response(agent: OrchestraAgent, message: str, use_travel_agent: bool = False) -> Generator[str, None, None]:
-    """Generate streaming response from Orchestra Agent."""
+def generate_streaming_response(agent: OrchestraAgent, message: str, use_travel_agent: bool = False, pace_ms: int = 0) -> Generator[str, None, None]:
+    """Generate streaming response from Orchestra Agent.
+    
+    Events are forwarded as soon as the agent produces them: 'thinking' and 'response'
+    tokens, 'tool_start'/'tool_end' for tool calls, then 'complete'.
+    
+    Args:
+        agent: The agent to stream from.
+        message: The user's message.
+        use_travel_agent: Whether to use travel agent mode.
+        pace_ms: Optional client-requested delay between response tokens, in milliseconds.
+    """
     try:
-        # Add user message to history
-        agent.conversation_history.append({"role": "user", "content": message})
-        
-        if use_travel_agent and hasattr(agent, 'travel_agent_executor'):
-            # For travel agent, we'll simulate streaming by chunking the response
-            response = agent.travel_agent_executor.invoke({"input": message})
-            raw_response = response.get("output", "I couldn't process that request.")
-            
-            try:
-                parsed_response = agent._parse_travel_agent_response(raw_response)
-                agent.conversation_history.append({"role": "assistant", "content": parsed_response["response"]})
-                
-                # Stream the parsed response
-                yield f"data: {json.dumps({'type': 'thinking', 'content': parsed_response.get('thinking', '')})}\n\n"
-                time.sleep(0.1)
-                
-                # Stream function calls if any
-                for func_call in parsed_response.get('function_calls', []):
-                    yield f"data: {json.dumps({'type': 'function_call', 'content': {'name': func_call.name, 'arguments': func_call.arguments}})}\n\n"
-                    time.sleep(0.1)
-                
-                # Stream the final response in chunks
-                response_text = parsed_response["response"]
-                chunk_size = 20
-                for i in range(0, len(response_text), chunk_size):
-                    chunk = response_text[i:i+chunk_size]
-                    yield f"data: {json.dumps({'type': 'response', 'content': chunk})}\n\n"
-                    time.sleep(0.05)
-                    
-            except Exception as e:
-                agent.conversation_history.append({"role": "assistant", "content": raw_response})
-                # Stream raw response in chunks
-                chunk_size = 20
-                for i in range(0, len(raw_response), chunk_size):
-                    chunk = raw_response[i:i+chunk_size]
-                    yield f"data: {json.dumps({'type': 'response', 'content': chunk})}\n\n"
-                    time.sleep(0.05)
-        else:
-            # For standard conversation, use LLM streaming if available
-            messages = agent._convert_history_to_messages()
-            
-            # Check if LLM supports streaming
-            if hasattr(agent.llm, 'stream'):
-                response_content = ""
-                for chunk in agent.llm.stream(messages):
-                    if hasattr(chunk, 'content') and chunk.content:
-                        response_content += chunk.content
-                        yield f"data: {json.dumps({'type': 'response', 'content': chunk.content})}\n\n"
-                        time.sleep(0.01)
-                agent.conversation_history.append({"role": "assistant", "content": response_content})
-            else:
-                # Fallback: simulate streaming by chunking the response
-                response = agent.llm.invoke(messages)
-                response_content = response.content
-                agent.conversation_history.append({"role": "assistant", "content": response_content})
-                
-                chunk_size = 20
-                for i in range(0, len(response_content), chunk_size):
-                    chunk = response_content[i:i+chunk_size]
-                    yield f"data: {json.dumps({'type': 'response', 'content': chunk})}\n\n"
-                    time.sleep(0.05)
-        
-        # Send completion signal
-        yield f"data: {json.dumps({'type': 'complete'})}\n\n"
+        with timed(AGENT_QUERY_SECONDS, provider=agent.llm_prefix.lower(), mode=agent.query_mode(use_travel_agent), streaming="true"):
+            for event in agent.stream_query(message, use_travel_agent=use_travel_agent):
+                yield f"data: {json.dumps(event, default=str)}\n\n"
+                if pace_ms and event["type"] == "response":
+                    time.sleep(pace_ms / 1000)
+        agent.save_session()
         
     except Exception as e:
         yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
 
+def get_pace_ms(data: dict) -> int:
+    """Read the opt-in 'pace_ms' streaming delay from a request body (0 disables pacing)."""
+    try:
+        return max(0, min(int(data.get('pace_ms', 0) or 0), MAX_PACE_MS))
+    except (TypeError, ValueError):
+        return 0
+
 @app.route('/api/agent/chat/stream', methods=['POST'])
 def stream_chat_with_agent():
     """Streaming chat endpoint for Orchestra Agent."""
@@ -259,24 +321,32 @@ def stream_chat_with_agent():
         system_prompt = data.get('system_prompt')
         
         # Initialize agent
-        agent = OrchestraAgent(
+        agent = OrchestraAgent.from_session(
+            session_store,
+            session_id=data.get('session_id'),
             llm_prefix=llm_provider,
             system_prompt=system_prompt,
             temperature=temperature,
-            use_tools=False
+            use_tools=False,
+            verbose=False,
+            response_cache=get_response_cache(data)
         )
         
         return Response(
-            generate_streaming_response(agent, message, use_travel_agent=False),
+            generate_streaming_response(agent, message, use_travel_agent=False, pace_ms=get_pace_ms(data)),
             mimetype='text/event-stream',
             headers={
                 'Cache-Control': 'no-cache',
                 'Connection': 'keep-alive',
                 'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type'
+                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Expose-Headers': 'X-Session-Id',
+                'X-Session-Id': agent.session_id
             }
         )
         
+    except SessionNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -294,38 +364,194 @@ def stream_travel_with_agent():
         system_prompt = data.get('system_prompt')
         
         # Initialize agent with tools
-        agent = OrchestraAgent(
+        agent = OrchestraAgent.from_session(
+            session_store,
+            session_id=data.get('session_id'),
             llm_prefix=llm_provider,
             system_prompt=system_prompt,
             temperature=temperature,
-            use_tools=True
+            use_tools=True,
+            verbose=False,
+            tool_mode=data.get('tool_mode', 'react')
         )
         
         return Response(
-            generate_streaming_response(agent, message, use_travel_agent=True),
+            generate_streaming_response(agent, message, use_travel_agent=True, pace_ms=get_pace_ms(data)),
             mimetype='text/event-stream',
             headers={
                 'Cache-Control': 'no-cache',
                 'Connection': 'keep-alive',
                 'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type'
+                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Expose-Headers': 'X-Session-Id',
+                'X-Session-Id': agent.session_id
             }
         )
         
+    except SessionNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-# Initialize VectorDBManager
+# VectorDBManager is created on first use: building it loads embedding SDKs and
+# connects to the vector backend, which would otherwise slow down every worker start
 vector_db_manager = None
-try:
-    default_provider = os.environ.get('DEFAULT_EMBEDDING_PROVIDER', 'openai')
-    vector_db_manager = VectorDBManager(provider_name=default_provider)
-    print(f"Initialized VectorDBManager with {default_provider} provider")
-except Exception as e:
-    print(f"Warning: Failed to initialize VectorDBManager: {str(e)}")
-    print("Vector database endpoints will return errors until configuration is fixed.")
-
-# Vector database routes would be registered here if needed
+vector_db_manager_lock = threading.Lock()
+
+def get_vector_db_manager():
+    """Return the shared VectorDBManager, initializing it on first use (None if that fails)."""
+    global vector_db_manager
+    if vector_db_manager is None:
+        with vector_db_manager_lock:
+            if vector_db_manager is None:
+                try:
+                    default_provider = os.environ.get('DEFAULT_EMBEDDING_PROVIDER', 'openai')
+                    vector_db_manager = VectorDBManager(provider_name=default_provider)
+                    print(f"Initialized VectorDBManager with {default_provider} provider")
+                except Exception as e:
+                    print(f"Warning: Failed to initialize VectorDBManager: {str(e)}")
+                    print("Vector database endpoints will return errors until configuration is fixed.")
+    return vector_db_manager
+
+# Vector database routes, served by the shared VectorDBManager
+
+# Content types treated as newline-delimited JSON documents by /vectordb/add
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/jsonl', 'application/x-jsonlines')
+
+# Upper bounds for a single /vectordb/search call
+MAX_SEARCH_QUERIES = 64
+MAX_SEARCH_TOP_K = 100
+
+def vector_db_or_error(index_name: Optional[str] = None):
+    """Return (manager, None), or (None, error response) when the vector database is unusable.
+    
+    Indexes are created, filled, searched and deleted in the manager's configured index only.
+    """
+    manager = get_vector_db_manager()
+    if manager is None:
+        return None, (jsonify({"error": "Vector database is not configured; check the server logs"}), 503)
+    if index_name and index_name != manager.index_name:
+        return None, (jsonify({"error": f"Only the configured index '{manager.index_name}' can be used here"}), 400)
+    return manager, None
+
+@app.route('/vectordb/create', methods=['POST'])
+def create_vector_db():
+    """Create the configured index if it does not exist yet."""
+    data = request.get_json(silent=True) or {}
+    manager, error = vector_db_or_error(data.get('index_name'))
+    if error:
+        return error
+    
+    try:
+        index_name = manager.create_index(manager.index_name, data.get('dimension'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 500
+    
+    return jsonify({
+        "index_name": index_name,
+        "dimension": data.get('dimension') or manager.dimension,
+        "backend": manager.backend.name
+    })
+
+@app.route('/vectordb/add', methods=['POST'])
+def add_to_vector_db():
+    """Add documents, either as a JSON body or as a streamed NDJSON upload.
+    
+    NDJSON bodies (one document per line) are read from the request stream and ingested
+    in batches while the upload is still arriving, so the whole body is never held in
+    memory. Options go in the query string (namespace, batch_size) for NDJSON and in the
+    body for JSON. Document ids default to a hash of the content, so re-sending an upload
+    after a failure overwrites rather than duplicates what was already stored.
+    """
+    if request.mimetype in NDJSON_MIMETYPES:
+        options = request.args
+        documents = iter_ndjson_documents(iter(request.stream.readline, b''), source="request body")
+    else:
+        options = request.get_json(silent=True) or {}
+        documents = options.get('documents')
+        if not isinstance(documents, list) or not documents:
+            return jsonify({"error": "Missing 'documents' array in request body (or send application/x-ndjson)"}), 400
+        if not all(isinstance(document, dict) for document in documents):
+            return jsonify({"error": "Each document must be an object with 'page_content' and optional 'metadata' and 'id'"}), 400
+    
+    manager, error = vector_db_or_error(options.get('index_name'))
+    if error:
+        return error
+    
+    try:
+        batch_size = int(options.get('batch_size', 64))
+    except (TypeError, ValueError):
+        return jsonify({"error": "'batch_size' must be an integer"}), 400
+    if batch_size < 1:
+        return jsonify({"error": "'batch_size' must be positive"}), 400
+    
+    try:
+        stats = manager.ingest(documents, namespace=options.get('namespace', ''), batch_size=batch_size, progress_every=0)
+    except InvalidDocumentError as e:
+        return jsonify({"error": str(e)}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 500
+    
+    return jsonify({"index_name": manager.index_name, **stats})
+
+@app.route('/vectordb/search', methods=['POST'])
+def search_vector_db():
+    """Search with one 'query' or a batch of 'queries', embedded and searched together."""
+    data = request.get_json(silent=True) or {}
+    queries = data.get('queries')
+    single = queries is None
+    if single:
+        queries = [data['query']] if isinstance(data.get('query'), str) and data['query'].strip() else None
+    if not queries or not isinstance(queries, list) or not all(isinstance(query, str) and query.strip() for query in queries):
+        return jsonify({"error": "Provide a non-empty 'query' string or a 'queries' array of strings"}), 400
+    if len(queries) > MAX_SEARCH_QUERIES:
+        return jsonify({"error": f"At most {MAX_SEARCH_QUERIES} queries per request"}), 400
+    
+    try:
+        top_k = int(data.get('top_k', 5))
+    except (TypeError, ValueError):
+        return jsonify({"error": "'top_k' must be an integer"}), 400
+    if not 1 <= top_k <= MAX_SEARCH_TOP_K:
+        return jsonify({"error": f"'top_k' must be between 1 and {MAX_SEARCH_TOP_K}"}), 400
+    
+    manager, error = vector_db_or_error(data.get('index_name'))
+    if error:
+        return error
+    
+    try:
+        results = manager.batch_query(queries, namespace=data.get('namespace', ''), top_k=top_k)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 500
+    
+    payload = [
+        {
+            "query": query,
+            "matches": [
+                {"page_content": doc.page_content, "metadata": doc.metadata, "score": score}
+                for doc, score in matches
+            ]
+        }
+        for query, matches in zip(queries, results)
+    ]
+    return jsonify(payload[0] if single else {"results": payload})
+
+@app.route('/vectordb/delete', methods=['DELETE'])
+def delete_vector_db():
+    """Delete the configured index."""
+    data = request.get_json(silent=True) or {}
+    manager, error = vector_db_or_error(data.get('index_name'))
+    if error:
+        return error
+    
+    index_name = manager.index_name
+    try:
+        deleted = manager.delete_index(index_name)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 500
+    
+    if not deleted:
+        return jsonify({"error": f"Index '{index_name}' does not exist"}), 404
+    return jsonify({"index_name": index_name, "deleted": True})
 
 if __name__ == '__main__':
     # Get configuration from environment variables
@@ -0,0 +1,381 @@
+"""Async (ASGI) serving mode for the AI Agent API.
+
+Exposes the same agent routes as ``app.py`` but runs every LLM and tool call with
+``ainvoke``/``astream`` on a single event loop, so an in-flight request costs a
+coroutine instead of a worker thread.
+
+Run with:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 8080
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import time
+from typing import Any, AsyncGenerator, Dict
+
+from dotenv import load_dotenv
+from pydantic import BaseModel
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Match, Mount, Route
+from starlette.staticfiles import StaticFiles
+
+from rags.data_retriever import DataRetriever, SUPPORTED_PROVIDERS
+from agents.orchestra_agent import OrchestraAgent
+from LLMs.llm_factory import llm_pool
+from LLMs.llm_router import get_router_stats
+from memory.pinecode.vectordb_manager import get_embedding_batcher_stats
+from memory.semantic_cache import get_semantic_cache
+from memory.session_store import get_session_store, SessionNotFoundError
+from tools.async_http import close_async_client
+from tools.weather_tool import get_weather_cache_stats
+from utils.metrics import AGENT_QUERY_SECONDS, METRICS_ENABLED, REQUEST_SECONDS, observe, registry, timed
+
+# Load environment variables from .env file
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Headers sent with every Server-Sent Events response
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'Connection': 'keep-alive',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type',
+    'Access-Control-Expose-Headers': 'X-Session-Id'
+}
+
+# Upper bound for the client-requested delay between streamed tokens
+MAX_PACE_MS = 1000
+
+# Server-side conversation sessions shared by all agent endpoints
+session_store = get_session_store()
+
+
+def _to_jsonable(value: Any) -> Any:
+    """Convert agent responses (which may hold pydantic models) into JSON-safe data."""
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, dict):
+        return {k: _to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(v) for v in value]
+    return value
+
+
+def _sse(event: Dict[str, Any]) -> str:
+    """Format an event dict as a Server-Sent Events data line."""
+    return f"data: {json.dumps(_to_jsonable(event), default=str)}\n\n"
+
+
+def _session_payload(agent: OrchestraAgent, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Session fields for an agent response; the full history only when 'include_history' is set."""
+    payload = {
+        "session_id": agent.session_id,
+        "history_length": len(agent.conversation_history),
+        "context": agent.get_context_stats()
+    }
+    if data.get('include_history'):
+        payload["conversation_history"] = agent.get_conversation_history()
+    return payload
+
+
+async def _read_agent_request(request: Request, use_tools: bool):
+    """Parse an agent request body and build the agent.
+
+    Returns:
+        Tuple of (agent, request body), or (None, JSONResponse) when the body is invalid.
+    """
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not data or 'message' not in data:
+        return None, JSONResponse({"error": "Missing 'message' in request body"}, status_code=400)
+
+    try:
+        # Session stores do blocking I/O (SQLite), so they run off the event loop
+        agent = await asyncio.to_thread(
+            OrchestraAgent.from_session,
+            session_store,
+            session_id=data.get('session_id'),
+            llm_prefix=data.get('llm_provider', 'openai'),
+            system_prompt=data.get('system_prompt'),
+            temperature=data.get('temperature', 0.7),
+            use_tools=use_tools,
+            verbose=False,
+            tool_mode=data.get('tool_mode', 'react') if use_tools else 'react',
+            # Travel answers depend on live tool results, so only chat uses the response cache
+            response_cache=get_semantic_cache() if not use_tools and data.get('use_cache', True) else None
+        )
+    except SessionNotFoundError as e:
+        return None, JSONResponse({"error": str(e)}, status_code=404)
+    return agent, data
+
+
+async def home(request: Request) -> JSONResponse:
+    return JSONResponse({
+        "message": "Welcome to the AI Agent API (async mode)",
+        "endpoints": {
+            "/embedding-model": "GET - Get the embedding model for a provider",
+            "/providers": "GET - List available embedding providers",
+            "/health": "GET - Health check",
+            "/metrics": "GET - Prometheus metrics",
+            "/api/agent/chat": "POST - Chat with Orchestra Agent (non-streaming)",
+            "/api/agent/chat/stream": "POST - Chat with Orchestra Agent (streaming)",
+            "/api/agent/travel": "POST - Travel planning with Orchestra Agent (non-streaming)",
+            "/api/agent/travel/stream": "POST - Travel planning with Orchestra Agent (streaming)",
+            "/api/agent/sessions/{session_id}/history": "GET - Fetch a page of a session's conversation history",
+            "/api/agent/sessions/{session_id}": "DELETE - Delete a conversation session",
+            "/client": "GET - Web interface to interact with the API"
+        }
+    })
+
+
+async def client(request: Request) -> FileResponse:
+    return FileResponse(os.path.join(BASE_DIR, 'templates', 'api_client.html'))
+
+
+async def get_embedding_model(request: Request) -> JSONResponse:
+    provider_name = request.query_params.get('provider', '')
+
+    if not provider_name:
+        return JSONResponse({"error": "Missing 'provider' parameter"}, status_code=400)
+
+    data_retriever = DataRetriever(provider_name)
+    has_api_key = data_retriever.has_valid_api_key()
+    response = {
+        "provider": provider_name,
+        "embedding_model": data_retriever.get_embedding_model(),
+        "api_key_configured": has_api_key
+    }
+
+    if not has_api_key and provider_name.lower() in ["openai", "huggingface", "gemini"]:
+        response["warning"] = f"No API key configured for {provider_name}. Please set the appropriate environment variable."
+
+    return JSONResponse(response)
+
+
+async def get_providers(request: Request) -> JSONResponse:
+    return JSONResponse({"providers": SUPPORTED_PROVIDERS})
+
+
+async def health_check(request: Request) -> JSONResponse:
+    return JSONResponse({
+        "status": "healthy",
+        "version": "1.0.0",
+        "mode": "asgi",
+        "llm_pool": llm_pool.stats(),
+        "sessions": session_store.stats(),
+        "weather_cache": get_weather_cache_stats(),
+        "semantic_cache": get_semantic_cache().stats() if get_semantic_cache() else None,
+        "embedding_batchers": get_embedding_batcher_stats(),
+        "llm_router": get_router_stats()
+    })
+
+
+async def metrics(request: Request) -> PlainTextResponse:
+    """Stage latency histograms and counters in the Prometheus text format."""
+    return PlainTextResponse(registry.render(), media_type='text/plain; version=0.0.4')
+
+
+async def get_session_history(request: Request) -> JSONResponse:
+    """Fetch a page of a session's conversation history."""
+    session_id = request.path_params['session_id']
+    try:
+        offset = int(request.query_params.get('offset', 0))
+        limit = request.query_params.get('limit')
+        limit = int(limit) if limit is not None else None
+    except ValueError:
+        return JSONResponse({"error": "'offset' and 'limit' must be integers"}, status_code=400)
+
+    try:
+        history = await asyncio.to_thread(session_store.get_history, session_id, offset=offset, limit=limit)
+    except SessionNotFoundError as e:
+        return JSONResponse({"error": str(e)}, status_code=404)
+
+    return JSONResponse({"session_id": session_id, "offset": offset, "messages": history})
+
+
+async def delete_session(request: Request) -> JSONResponse:
+    """Delete a conversation session."""
+    session_id = request.path_params['session_id']
+    if not await asyncio.to_thread(session_store.delete, session_id):
+        return JSONResponse({"error": f"Unknown or expired session_id: {session_id}"}, status_code=404)
+    return JSONResponse({"session_id": session_id, "deleted": True})
+
+
+async def chat_with_agent(request: Request) -> JSONResponse:
+    """Non-streaming chat endpoint for Orchestra Agent."""
+    try:
+        agent, data = await _read_agent_request(request, use_tools=False)
+        if agent is None:
+            return data
+
+        response = await agent.aprocess_query(data['message'], use_travel_agent=False)
+        await asyncio.to_thread(agent.save_session)
+
+        return JSONResponse({
+            "response": response,
+            "cache_hit": agent.last_cache_hit,
+            **_session_payload(agent, data)
+        })
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def travel_with_agent(request: Request) -> JSONResponse:
+    """Non-streaming travel planning endpoint for Orchestra Agent."""
+    try:
+        agent, data = await _read_agent_request(request, use_tools=True)
+        if agent is None:
+            return data
+
+        response = await agent.aprocess_query(data['message'], use_travel_agent=True)
+        await asyncio.to_thread(agent.save_session)
+
+        return JSONResponse({
+            "response": _to_jsonable(response),
+            **_session_payload(agent, data),
+            "available_tools": [tool.name for tool in agent.get_available_tools()]
+        })
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def generate_streaming_response(agent: OrchestraAgent, message: str, use_travel_agent: bool = False, pace_ms: int = 0) -> AsyncGenerator[str, None]:
+    """Generate a streaming SSE response from Orchestra Agent without blocking the loop.
+
+    Events are forwarded as soon as the agent produces them; ``pace_ms`` is an optional
+    client-requested delay between response tokens.
+    """
+    try:
+        with timed(AGENT_QUERY_SECONDS, provider=agent.llm_prefix.lower(), mode=agent.query_mode(use_travel_agent), streaming="true"):
+            async for event in agent.astream_query(message, use_travel_agent=use_travel_agent):
+                yield _sse(event)
+                if pace_ms and event["type"] == "response":
+                    await asyncio.sleep(pace_ms / 1000)
+        await asyncio.to_thread(agent.save_session)
+
+    except Exception as e:
+        yield _sse({'type': 'error', 'content': str(e)})
+
+
+def _get_pace_ms(data: Dict[str, Any]) -> int:
+    """Read the opt-in 'pace_ms' streaming delay from a request body (0 disables pacing)."""
+    try:
+        return max(0, min(int(data.get('pace_ms', 0) or 0), MAX_PACE_MS))
+    except (TypeError, ValueError):
+        return 0
+
+
+async def stream_chat_with_agent(request: Request):
+    """Streaming chat endpoint for Orchestra Agent."""
+    try:
+        agent, data = await _read_agent_request(request, use_tools=False)
+        if agent is None:
+            return data
+
+        return StreamingResponse(
+            generate_streaming_response(agent, data['message'], use_travel_agent=False, pace_ms=_get_pace_ms(data)),
+            media_type='text/event-stream',
+            headers={**SSE_HEADERS, 'X-Session-Id': agent.session_id}
+        )
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def stream_travel_with_agent(request: Request):
+    """Streaming travel planning endpoint for Orchestra Agent."""
+    try:
+        agent, data = await _read_agent_request(request, use_tools=True)
+        if agent is None:
+            return data
+
+        return StreamingResponse(
+            generate_streaming_response(agent, data['message'], use_travel_agent=True, pace_ms=_get_pace_ms(data)),
+            media_type='text/event-stream',
+            headers={**SSE_HEADERS, 'X-Session-Id': agent.session_id}
+        )
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+routes = [
+    Route('/', home),
+    Route('/client', client),
+    Route('/embedding-model', get_embedding_model, methods=['GET']),
+    Route('/providers', get_providers, methods=['GET']),
+    Route('/health', health_check, methods=['GET']),
+    Route('/metrics', metrics, methods=['GET']),
+    Route('/api/agent/chat', chat_with_agent, methods=['POST']),
+    Route('/api/agent/chat/stream', stream_chat_with_agent, methods=['POST']),
+    Route('/api/agent/travel', travel_with_agent, methods=['POST']),
+    Route('/api/agent/travel/stream', stream_travel_with_agent, methods=['POST']),
+    Route('/api/agent/sessions/{session_id}/history', get_session_history, methods=['GET']),
+    Route('/api/agent/sessions/{session_id}', delete_session, methods=['DELETE']),
+    Mount('/static', app=StaticFiles(directory=os.path.join(BASE_DIR, 'static')), name='static'),
+]
+
+def _route_template(scope) -> str:
+    """The matching route's path template, so session ids never become metric labels."""
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class RequestTimingMiddleware:
+    """Pure ASGI middleware recording orchestra_request_seconds per route.
+
+    Requests are timed until the response headers are sent, so a streamed response does
+    not count its body; the full stream is recorded in orchestra_agent_query_seconds.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+
+        async def timed_send(message):
+            if message["type"] == "http.response.start":
+                observe(REQUEST_SECONDS, time.perf_counter() - start, endpoint=_route_template(scope), method=scope["method"])
+            await send(message)
+
+        await self.app(scope, receive, timed_send)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: Starlette):
+    yield
+    # Release pooled tool HTTP connections on shutdown
+    await close_async_client()
+
+
+app = Starlette(
+    routes=routes,
+    middleware=[
+        Middleware(RequestTimingMiddleware),
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])
+    ],
+    lifespan=lifespan
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = int(os.environ.get("PORT", 8080))
+    print(f"Starting AI Agent API (async mode) on port {port}")
+    uvicorn.run(app, host='0.0.0.0', port=port)
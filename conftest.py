@@ -0,0 +1,10 @@
+"""Shared pytest setup.
+
+The tests use stub models and make no network calls, but ``LLMs.llm_factory`` copies
+the provider API keys into the environment at import time and fails when they are unset.
+"""
+
+import os
+
+for _name in ("OPENAI_API_KEY", "GEMINI_API_KEY", "GROQ_API_KEY"):
+    os.environ.setdefault(_name, "test-key")
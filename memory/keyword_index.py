@@ -0,0 +1,156 @@
+"""Incremental BM25 keyword index kept next to the vector store.
+
+Dense embeddings are weak at exact tokens such as city names, product SKUs and codes;
+this index scores documents by BM25 over an inverted index in SQLite, so it can be
+fused with vector search (see ``rags.hybrid_retriever``) or used alone when the dense
+search is slow. Documents are added and replaced incrementally by id.
+"""
+
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.schema.document import Document
+
+# Words, keeping joined codes like "sku-4411" or "v2.1" together
+_TOKEN_RE = re.compile(r"\w+(?:[-./]\w+)*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were what when "
+    "where which who will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase terms of ``text``; joined codes are indexed whole and by their parts."""
+    terms = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token not in STOPWORDS:
+            terms.append(token)
+        if not token.isalnum():
+            terms.extend(part for part in re.split(r"[-./]", token) if part and part not in STOPWORDS)
+    return terms
+
+
+class KeywordIndex:
+    """BM25 inverted index partitioned by (index name, namespace)."""
+
+    def __init__(self, db_path: str, k1: float = 1.2, b: float = 0.75):
+        """Initialize the index.
+
+        Args:
+            db_path: Path of the SQLite database file (created if missing).
+            k1: BM25 term-frequency saturation.
+            b: BM25 document-length normalization.
+        """
+        self.db_path = db_path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS keyword_docs ("
+            " index_name TEXT NOT NULL, namespace TEXT NOT NULL, doc_id TEXT NOT NULL, length INTEGER NOT NULL,"
+            " text TEXT NOT NULL, metadata TEXT NOT NULL, PRIMARY KEY (index_name, namespace, doc_id))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS keyword_postings ("
+            " index_name TEXT NOT NULL, namespace TEXT NOT NULL, term TEXT NOT NULL, doc_id TEXT NOT NULL,"
+            " tf INTEGER NOT NULL, PRIMARY KEY (index_name, namespace, term, doc_id))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS keyword_postings_by_doc ON keyword_postings (index_name, namespace, doc_id)")
+
+    def add(self, index_name: str, records: List[Tuple[str, str, Dict[str, Any]]], namespace: str = "") -> None:
+        """Index (id, text, metadata) records, replacing documents with the same id."""
+        if not records:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for doc_id, text, metadata in records:
+                    terms = Counter(tokenize(text))
+                    self._conn.execute(
+                        "DELETE FROM keyword_postings WHERE index_name = ? AND namespace = ? AND doc_id = ?",
+                        (index_name, namespace, doc_id))
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO keyword_docs (index_name, namespace, doc_id, length, text, metadata)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        (index_name, namespace, doc_id, sum(terms.values()), text, json.dumps(metadata, default=str)))
+                    self._conn.executemany(
+                        "INSERT INTO keyword_postings (index_name, namespace, term, doc_id, tf) VALUES (?, ?, ?, ?, ?)",
+                        [(index_name, namespace, term, doc_id, tf) for term, tf in terms.items()])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def search(self, index_name: str, query: str, k: int = 4, namespace: str = "") -> List[Tuple[Document, float]]:
+        """Return the ``k`` best BM25 matches for ``query`` with their scores."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            total, avg_length = self._conn.execute(
+                "SELECT COUNT(*), AVG(length) FROM keyword_docs WHERE index_name = ? AND namespace = ?",
+                (index_name, namespace)).fetchone()
+            if not total:
+                return []
+            avg_length = avg_length or 1.0
+            scores: Dict[str, float] = {}
+            for term in terms:
+                postings = self._conn.execute(
+                    "SELECT p.doc_id, p.tf, d.length FROM keyword_postings p JOIN keyword_docs d"
+                    " ON d.index_name = p.index_name AND d.namespace = p.namespace AND d.doc_id = p.doc_id"
+                    " WHERE p.index_name = ? AND p.namespace = ? AND p.term = ?",
+                    (index_name, namespace, term)).fetchall()
+                if not postings:
+                    continue
+                idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf, length in postings:
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            if not best:
+                return []
+            rows = {
+                row[0]: row[1:] for row in self._conn.execute(
+                    f"SELECT doc_id, text, metadata FROM keyword_docs WHERE index_name = ? AND namespace = ?"
+                    f" AND doc_id IN ({','.join('?' * len(best))})",
+                    [index_name, namespace] + [doc_id for doc_id, _ in best])
+            }
+        return [
+            (Document(page_content=rows[doc_id][0], metadata=json.loads(rows[doc_id][1])), score)
+            for doc_id, score in best if doc_id in rows
+        ]
+
+    def delete_index(self, index_name: str) -> None:
+        """Remove every document of an index."""
+        with self._lock:
+            self._conn.execute("DELETE FROM keyword_postings WHERE index_name = ?", (index_name,))
+            self._conn.execute("DELETE FROM keyword_docs WHERE index_name = ?", (index_name,))
+
+
+# Process-wide index, opened on first use so importing the module creates no files
+_keyword_index: Optional[KeywordIndex] = None
+_keyword_index_lock = threading.Lock()
+
+
+def get_keyword_index() -> Optional[KeywordIndex]:
+    """Return the shared keyword index, or None when HYBRID_KEYWORD_INDEX is false."""
+    global _keyword_index
+    if os.getenv("HYBRID_KEYWORD_INDEX", "true").lower() != "true":
+        return None
+    if _keyword_index is None:
+        with _keyword_index_lock:
+            if _keyword_index is None:
+                _keyword_index = KeywordIndex(os.getenv("KEYWORD_INDEX_PATH", "keyword_index.db"))
+    return _keyword_index
@@ -0,0 +1,290 @@
+"""Bulk, resumable document ingestion for VectorDBManager.
+
+Documents are read lazily (from any iterator or a JSONL file), grouped into fixed-size
+batches, and each batch is embedded and upserted on a bounded worker pool. Progress is
+checkpointed to a small JSON file after every finished batch, so a crashed run can be
+restarted with the same arguments and only the unfinished batches are sent again. The
+checkpoint is removed once a run finishes, so the next run starts from the beginning.
+
+Run from the command line, e.g.:
+    python -m memory.pinecode.ingestion docs.jsonl --namespace manuals --batch-size 64 --backend faiss
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from langchain.schema.document import Document
+
+from memory.vector_backends.base import TEXT_KEY, document_record
+from utils.metrics import PIPELINE_ERRORS, inc
+
+
+class InvalidDocumentError(ValueError):
+    """A line of NDJSON/JSONL input is not a JSON document object."""
+
+
+def iter_ndjson_documents(lines: Iterable[Union[str, bytes]], source: str = "input") -> Iterator[Dict[str, Any]]:
+    """Yield documents from newline-delimited JSON, one object per line.
+
+    ``lines`` may be any iterable of str or bytes lines (a file, a request stream), and is
+    read only as fast as documents are consumed. Each object needs 'page_content' (or
+    'text') and may carry 'metadata' and 'id'. Blank lines are skipped.
+
+    Raises:
+        InvalidDocumentError: On a line that is not a JSON object.
+    """
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            document = json.loads(line)
+        except ValueError as e:
+            raise InvalidDocumentError(f"Invalid JSON on line {line_number} of {source}: {str(e)}")
+        if not isinstance(document, dict):
+            raise InvalidDocumentError(f"Line {line_number} of {source} is not a JSON object")
+        yield document
+
+
+def iter_jsonl_documents(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield documents from a JSONL file; see iter_ndjson_documents()."""
+    with open(path, encoding="utf-8") as f:
+        yield from iter_ndjson_documents(f, source=path)
+
+
+def _estimate_tokens(texts: List[str]) -> int:
+    """Rough token count (about four characters per token) for throughput reporting."""
+    return sum(len(text) // 4 + 1 for text in texts)
+
+
+class IngestionCheckpoint:
+    """Tracks which batches of a run are done, persisted as JSON.
+
+    Batches can finish out of order, so the file keeps a watermark (every batch below
+    it is done) plus the finished batches above it.
+    """
+
+    def __init__(self, path: Optional[str], batch_size: int, namespace: str):
+        self.path = path
+        self.batch_size = batch_size
+        self.namespace = namespace
+        self.watermark = 0
+        self.completed: set = set()
+        self.documents = 0
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self) -> None:
+        with open(self.path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("batch_size") != self.batch_size or state.get("namespace") != self.namespace:
+            raise ValueError(
+                f"Checkpoint {self.path} was written with batch_size={state.get('batch_size')} and "
+                f"namespace={state.get('namespace')!r}; resume with the same settings or delete it."
+            )
+        self.watermark = state.get("watermark", 0)
+        self.completed = set(state.get("completed", []))
+        self.documents = state.get("documents", 0)
+
+    def is_done(self, batch_index: int) -> bool:
+        return batch_index < self.watermark or batch_index in self.completed
+
+    def mark_done(self, batch_index: int, documents: int) -> None:
+        """Record a finished batch and rewrite the checkpoint file atomically."""
+        with self._lock:
+            self.completed.add(batch_index)
+            self.documents += documents
+            while self.watermark in self.completed:
+                self.completed.discard(self.watermark)
+                self.watermark += 1
+            if not self.path:
+                return
+            state = {
+                "batch_size": self.batch_size,
+                "namespace": self.namespace,
+                "watermark": self.watermark,
+                "completed": sorted(self.completed),
+                "documents": self.documents
+            }
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+
+    def remove(self) -> None:
+        """Forget every finished batch and delete the checkpoint file, once a run is complete."""
+        with self._lock:
+            self.watermark = 0
+            self.completed.clear()
+            self.documents = 0
+            if self.path and os.path.exists(self.path):
+                os.remove(self.path)
+
+
+class BulkIngestor:
+    """Embeds and upserts a document stream in parallel batches with backpressure."""
+
+    def __init__(self, manager, namespace: str = "", batch_size: int = 64, max_workers: int = 4,
+                 max_in_flight: Optional[int] = None, max_retries: int = 3, retry_backoff: float = 1.0,
+                 checkpoint_path: Optional[str] = None, progress_every: int = 10):
+        """Initialize the ingestor.
+
+        Args:
+            manager: VectorDBManager providing the embedding model and index name.
+            namespace: Namespace to upsert into.
+            batch_size: Documents per embedding request.
+            max_workers: Batches embedded and upserted concurrently.
+            max_in_flight: Batches read ahead of the workers; reading pauses once this many
+                are queued or running. Defaults to twice ``max_workers``.
+            max_retries: Attempts per batch before the run fails.
+            retry_backoff: Initial retry delay in seconds, doubled after every failure.
+            checkpoint_path: JSON file used to resume an interrupted run (optional).
+            progress_every: Print throughput after this many finished batches (0 disables).
+        """
+        if batch_size < 1 or max_workers < 1:
+            raise ValueError("batch_size and max_workers must be at least 1")
+        self.manager = manager
+        self.namespace = namespace
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight or max_workers * 2
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.checkpoint = IngestionCheckpoint(checkpoint_path, batch_size, namespace)
+        self.progress_every = progress_every
+
+    def _batches(self, documents: Iterable[Union[Document, Dict[str, Any]]]) -> Iterator[Tuple[int, List]]:
+        batch: List = []
+        batch_index = 0
+        for doc in documents:
+            batch.append(doc)
+            if len(batch) == self.batch_size:
+                yield batch_index, batch
+                batch, batch_index = [], batch_index + 1
+        if batch:
+            yield batch_index, batch
+
+    def _process_batch(self, docs: List[Union[Document, Dict[str, Any]]]) -> Tuple[int, int]:
+        """Embed and upsert one batch, retrying with backoff. Returns (documents, tokens)."""
+        records = [document_record(doc) for doc in docs]
+        texts = [text for _, text, _ in records]
+        delay = self.retry_backoff
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                vectors = self.manager.get_embedding_model().embed_documents(texts)
+                items = [
+                    (doc_id, vector, {**metadata, TEXT_KEY: text})
+                    for (doc_id, text, metadata), vector in zip(records, vectors)
+                ]
+                self.manager.backend.upsert(self.manager.index_name, items, namespace=self.namespace)
+                if self.manager.keyword_index is not None:
+                    self.manager.keyword_index.add(self.manager.index_name, records, namespace=self.namespace)
+                return len(records), _estimate_tokens(texts)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    inc(PIPELINE_ERRORS, pipeline="ingestion", stage="batch", outcome="failed")
+                    raise
+                inc(PIPELINE_ERRORS, pipeline="ingestion", stage="batch", outcome="retried")
+                print(f"Ingestion batch failed (attempt {attempt}/{self.max_retries}): {str(e)}; retrying in {delay:.1f}s")
+                time.sleep(delay)
+                delay *= 2
+
+    def run(self, documents: Iterable[Union[Document, Dict[str, Any]]]) -> Dict[str, Any]:
+        """Ingest a document stream and return throughput statistics.
+
+        Batches recorded in the checkpoint are skipped. When every batch has finished,
+        the checkpoint is removed.
+
+        Raises:
+            ValueError: If a batch still fails after all retries. Finished batches stay
+                checkpointed, so the same call can be repeated to resume.
+        """
+        self.manager.create_index()
+        started = time.perf_counter()
+        documents_done = tokens_done = batches_done = skipped = 0
+        in_flight: Dict[Future, int] = {}
+
+        def collect(futures) -> None:
+            nonlocal documents_done, tokens_done, batches_done
+            for future in futures:
+                batch_index = in_flight.pop(future)
+                try:
+                    count, tokens = future.result()
+                except Exception as e:
+                    raise ValueError(f"Failed to ingest batch {batch_index}: {str(e)}")
+                self.checkpoint.mark_done(batch_index, count)
+                documents_done += count
+                tokens_done += tokens
+                batches_done += 1
+                if self.progress_every and batches_done % self.progress_every == 0:
+                    elapsed = time.perf_counter() - started
+                    print(f"Ingested {documents_done} documents ({documents_done / elapsed:.1f} docs/sec, "
+                          f"{tokens_done / elapsed:.0f} tokens/sec)")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingest") as pool:
+            try:
+                for batch_index, batch in self._batches(documents):
+                    if self.checkpoint.is_done(batch_index):
+                        skipped += 1
+                        continue
+                    # Backpressure: stop reading until a running batch finishes
+                    while len(in_flight) >= self.max_in_flight:
+                        finished, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                        collect(finished)
+                    in_flight[pool.submit(self._process_batch, batch)] = batch_index
+                collect(wait(list(in_flight)).done)
+            except BaseException:
+                for future in in_flight:
+                    future.cancel()
+                raise
+            finally:
+                # Keep finished batches durable for local backends too
+                self.manager.backend.persist()
+
+        # Every batch is in the index; a rerun (e.g. of an edited file) must not skip any
+        self.checkpoint.remove()
+        if skipped:
+            print(f"Warning: skipped {skipped} batches already ingested according to checkpoint "
+                  f"{self.checkpoint.path}")
+        elapsed = time.perf_counter() - started
+        stats = {
+            "namespace": self.namespace,
+            "documents": documents_done,
+            "batches": batches_done,
+            "skipped_batches": skipped,
+            "estimated_tokens": tokens_done,
+            "seconds": round(elapsed, 3),
+            "docs_per_sec": documents_done / elapsed if elapsed else 0.0,
+            "tokens_per_sec": tokens_done / elapsed if elapsed else 0.0
+        }
+        print(f"Ingestion complete: {stats}")
+        return stats
+
+
+if __name__ == "__main__":
+    from memory.pinecode.vectordb_manager import VectorDBManager
+
+    parser = argparse.ArgumentParser(description="Bulk-load a JSONL file of documents into the vector database.")
+    parser.add_argument("file", help="JSONL file with one {'page_content', 'metadata', 'id'} object per line")
+    parser.add_argument("--provider", default=os.environ.get('DEFAULT_EMBEDDING_PROVIDER', 'openai'), help="Embedding provider")
+    parser.add_argument("--backend", help="Vector backend: pinecone or faiss (default: VECTOR_BACKEND)")
+    parser.add_argument("--namespace", default="", help="Index namespace")
+    parser.add_argument("--batch-size", type=int, default=64, help="Documents per embedding request")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent batches")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <file>.checkpoint.json)")
+    args = parser.parse_args()
+
+    manager = VectorDBManager(provider_name=args.provider, backend=args.backend)
+    manager.ingest_jsonl(
+        args.file,
+        namespace=args.namespace,
+        batch_size=args.batch_size,
+        max_workers=args.workers,
+        checkpoint_path=args.checkpoint or f"{args.file}.checkpoint.json"
+    )
@@ -0,0 +1,153 @@
+import json
+import os
+
+import pytest
+
+from memory.pinecode.ingestion import (BulkIngestor, IngestionCheckpoint, InvalidDocumentError,
+                                       iter_ndjson_documents)
+
+
+class StubEmbeddings:
+    def __init__(self, failures=0, fail_on=None):
+        self.failures = failures
+        self.fail_on = fail_on
+
+    def embed_documents(self, texts):
+        if self.fail_on in texts:
+            raise ConnectionError("embedding service unavailable")
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("embedding service unavailable")
+        return [[float(len(text))] for text in texts]
+
+
+class StubBackend:
+    def __init__(self):
+        self.items = {}
+
+    def upsert(self, index_name, items, namespace=""):
+        for doc_id, vector, metadata in items:
+            self.items[(namespace, doc_id)] = (vector, metadata)
+
+    def persist(self):
+        pass
+
+
+class StubManager:
+    """The parts of VectorDBManager that BulkIngestor uses."""
+
+    index_name = "test-index"
+    keyword_index = None
+
+    def __init__(self, failures=0):
+        self.embeddings = StubEmbeddings(failures)
+        self.backend = StubBackend()
+
+    def create_index(self):
+        return self.index_name
+
+    def get_embedding_model(self):
+        return self.embeddings
+
+
+def _documents(count):
+    return [{"page_content": f"document {i}", "id": f"doc-{i}"} for i in range(count)]
+
+
+def test_checkpoint_watermark_advances_over_out_of_order_batches(tmp_path):
+    path = str(tmp_path / "run.checkpoint.json")
+    checkpoint = IngestionCheckpoint(path, batch_size=10, namespace="docs")
+
+    checkpoint.mark_done(1, 10)
+    checkpoint.mark_done(2, 10)
+    assert checkpoint.watermark == 0 and not checkpoint.is_done(0) and checkpoint.is_done(2)
+
+    checkpoint.mark_done(0, 10)
+    assert checkpoint.watermark == 3 and checkpoint.completed == set()
+
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"batch_size": 10, "namespace": "docs", "watermark": 3, "completed": [], "documents": 30}
+
+
+def test_checkpoint_resumes_from_file(tmp_path):
+    path = str(tmp_path / "run.checkpoint.json")
+    IngestionCheckpoint(path, batch_size=10, namespace="").mark_done(4, 10)
+
+    resumed = IngestionCheckpoint(path, batch_size=10, namespace="")
+    assert resumed.is_done(4) and not resumed.is_done(0)
+    assert resumed.documents == 10
+
+
+def test_checkpoint_rejects_different_settings(tmp_path):
+    path = str(tmp_path / "run.checkpoint.json")
+    IngestionCheckpoint(path, batch_size=10, namespace="").mark_done(0, 10)
+
+    with pytest.raises(ValueError):
+        IngestionCheckpoint(path, batch_size=20, namespace="")
+
+
+def test_bulk_ingestor_upserts_every_document():
+    manager = StubManager()
+    stats = BulkIngestor(manager, batch_size=4, max_workers=2, progress_every=0).run(_documents(10))
+
+    assert stats["documents"] == 10 and stats["batches"] == 3
+    assert len(manager.backend.items) == 10
+
+
+def test_bulk_ingestor_retries_failed_batches():
+    manager = StubManager(failures=2)
+    stats = BulkIngestor(manager, batch_size=5, max_workers=1, retry_backoff=0.001, progress_every=0).run(_documents(5))
+
+    assert stats["documents"] == 5
+
+
+def test_bulk_ingestor_skips_checkpointed_batches(tmp_path, capsys):
+    path = str(tmp_path / "run.checkpoint.json")
+    checkpoint = IngestionCheckpoint(path, batch_size=5, namespace="")
+    checkpoint.mark_done(0, 5)
+
+    manager = StubManager()
+    stats = BulkIngestor(manager, batch_size=5, max_workers=1, checkpoint_path=path, progress_every=0).run(_documents(10))
+
+    assert stats["skipped_batches"] == 1 and stats["documents"] == 5
+    assert sorted(doc_id for _, doc_id in manager.backend.items) == [f"doc-{i}" for i in range(5, 10)]
+    assert "skipped 1 batches" in capsys.readouterr().out
+
+
+def test_completed_run_removes_its_checkpoint(tmp_path):
+    path = str(tmp_path / "run.checkpoint.json")
+    BulkIngestor(StubManager(), batch_size=5, checkpoint_path=path, progress_every=0).run(_documents(10))
+
+    assert not os.path.exists(path)
+    rerun = BulkIngestor(StubManager(), batch_size=5, checkpoint_path=path, progress_every=0).run(_documents(10))
+    assert rerun["documents"] == 10 and rerun["skipped_batches"] == 0
+
+
+def test_bulk_ingestor_fails_after_max_retries():
+    manager = StubManager(failures=5)
+    ingestor = BulkIngestor(manager, batch_size=5, max_retries=2, retry_backoff=0.001, progress_every=0)
+
+    with pytest.raises(ValueError):
+        ingestor.run(_documents(5))
+
+
+def test_failed_run_keeps_finished_batches_checkpointed(tmp_path):
+    path = str(tmp_path / "run.checkpoint.json")
+    manager = StubManager()
+    manager.embeddings = StubEmbeddings(fail_on="document 7")
+
+    with pytest.raises(ValueError):
+        BulkIngestor(manager, batch_size=5, max_workers=1, max_retries=1, checkpoint_path=path,
+                     progress_every=0).run(_documents(10))
+
+    resumed = IngestionCheckpoint(path, batch_size=5, namespace="")
+    assert resumed.is_done(0) and not resumed.is_done(1)
+
+
+def test_ndjson_reader_reports_bad_lines():
+    lines = [b'{"page_content": "a"}\n', b"\n", b"not json\n"]
+    documents = iter_ndjson_documents(lines, source="upload")
+
+    assert next(documents) == {"page_content": "a"}
+    with pytest.raises(InvalidDocumentError, match="line 3 of upload"):
+        next(documents)
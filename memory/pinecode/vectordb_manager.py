@@ -1,27 +1,168 @@
+import asyncio
 import os
-import pinecone
+import threading
 from dotenv import load_dotenv
-from langchain_pinecone import PineconeVectorStore
-from langchain_community.embeddings import OpenAIEmbeddings, HuggingFaceEmbeddings
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
 from langchain.schema.document import Document
-from typing import List, Dict, Any, Optional, Union
+from rags.data_retriever import DataRetriever
+from memory.vector_backends import VectorBackend, document_record, get_vector_backend
+from memory.keyword_index import get_keyword_index
+from utils.embedding_cache import CachedEmbeddings, get_embedding_cache
+from utils.embedding_batcher import BatchingEmbeddings
+from utils.metrics import EMBEDDING_SECONDS, METRICS_ENABLED, VECTOR_QUERY_SECONDS, timed
+from utils.async_bridge import background_loop
+from typing import List, Dict, Any, Iterable, Optional, Tuple, Union
 
 # Load environment variables
 load_dotenv()
 
+
+def build_embedding_model(provider_name: str):
+    """
+    Construct a new embedding model for a provider.
+    
+    Args:
+        provider_name (str): The name of the embedding provider (e.g., 'openai', 'huggingface', 'gemini')
+        
+    Returns:
+        Embedding model instance
+        
+    Raises:
+        ValueError: If provider is not supported or API key is missing
+    """
+    provider_name = provider_name.lower()
+    if provider_name == 'openai':
+        api_key = os.environ.get('OPENAI_API_KEY')
+        if not api_key:
+            raise ValueError("OpenAI API key not found. Please set OPENAI_API_KEY environment variable.")
+        from langchain_community.embeddings import OpenAIEmbeddings
+        return OpenAIEmbeddings(openai_api_key=api_key)
+        
+    elif provider_name == 'huggingface':
+        api_key = os.environ.get('HUGGINGFACE_API_KEY')
+        model_name = "sentence-transformers/all-mpnet-base-v2"
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        if api_key:
+            return HuggingFaceEmbeddings(
+                model_name=model_name,
+                huggingfacehub_api_token=api_key
+            )
+        else:
+            # Use local model if no API key
+            return HuggingFaceEmbeddings(model_name=model_name)
+            
+    elif provider_name == 'gemini':
+        api_key = os.environ.get('GEMINI_API_KEY')
+        if not api_key:
+            raise ValueError("Gemini API key not found. Please set GEMINI_API_KEY environment variable.")
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        return GoogleGenerativeAIEmbeddings(
+            model="embedding-001",
+            google_api_key=api_key
+        )
+        
+    else:
+        raise ValueError(f"Unsupported provider: {provider_name}")
+
+
+class _TimedEmbeddings(Embeddings):
+    """Records the duration of every request that reaches the embedding provider."""
+    
+    def __init__(self, embeddings: Embeddings, provider_name: str):
+        self.embeddings = embeddings
+        self.provider_name = provider_name
+    
+    def embed_documents(self, texts: List[str], **kwargs) -> List[List[float]]:
+        with timed(EMBEDDING_SECONDS, provider=self.provider_name, kind="documents"):
+            return self.embeddings.embed_documents(texts, **kwargs)
+    
+    def embed_query(self, text: str) -> List[float]:
+        with timed(EMBEDDING_SECONDS, provider=self.provider_name, kind="query"):
+            return self.embeddings.embed_query(text)
+    
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        with timed(EMBEDDING_SECONDS, provider=self.provider_name, kind="documents"):
+            return await self.embeddings.aembed_documents(texts)
+    
+    async def aembed_query(self, text: str) -> List[float]:
+        with timed(EMBEDDING_SECONDS, provider=self.provider_name, kind="query"):
+            return await self.embeddings.aembed_query(text)
+
+
+# One embedding model per provider, shared by every VectorDBManager and cache in the process
+_shared_embeddings: Dict[str, Any] = {}
+_shared_batchers: Dict[str, BatchingEmbeddings] = {}
+_shared_embeddings_lock = threading.Lock()
+
+
+def get_shared_embedding_model(provider_name: str):
+    """
+    Return the process-wide embedding model for a provider, building it on first use.
+    
+    Unless EMBEDDING_CACHE_ENABLED is false, the model is wrapped in the shared
+    content-hash cache. Unless EMBEDDING_BATCH_ENABLED is false, single-query embeddings
+    that miss the cache are micro-batched with other concurrent queries.
+    
+    Raises:
+        ValueError: If provider is not supported or API key is missing
+    """
+    provider_name = provider_name.lower()
+    embeddings = _shared_embeddings.get(provider_name)
+    if embeddings is None:
+        with _shared_embeddings_lock:
+            embeddings = _shared_embeddings.get(provider_name)
+            if embeddings is None:
+                embeddings = build_embedding_model(provider_name)
+                if METRICS_ENABLED:
+                    embeddings = _TimedEmbeddings(embeddings, provider_name)
+                if os.getenv("EMBEDDING_BATCH_ENABLED", "true").lower() == "true":
+                    batch_fn = None
+                    if provider_name == 'gemini':
+                        # Gemini embeds queries and documents with different task types
+                        model = embeddings
+                        batch_fn = lambda texts: model.embed_documents(texts, task_type="retrieval_query")
+                    embeddings = BatchingEmbeddings(
+                        embeddings,
+                        max_batch_size=int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32")),
+                        max_wait_ms=float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5")),
+                        workers=int(os.getenv("EMBEDDING_BATCH_WORKERS", "2")),
+                        batch_fn=batch_fn
+                    )
+                    _shared_batchers[provider_name] = embeddings
+                cache = get_embedding_cache()
+                if cache is not None:
+                    model_name = DataRetriever(provider_name).get_embedding_model()
+                    embeddings = CachedEmbeddings(embeddings, cache, provider_name, model_name)
+                _shared_embeddings[provider_name] = embeddings
+    return embeddings
+
+
+def get_embedding_batcher_stats() -> Dict[str, Any]:
+    """Return micro-batcher statistics (batch sizes, queue waits) for each loaded provider."""
+    return {provider: batcher.stats() for provider, batcher in list(_shared_batchers.items())}
+
+
 class VectorDBManager:
     """
-    A class to manage Pinecone vector database operations including initialization,
+    A class to manage vector database operations including initialization,
     index creation, document addition, and retrieval.
+    
+    Storage is delegated to a VectorBackend: the hosted Pinecone service (default) or a
+    local FAISS index, selected with the ``backend`` argument or VECTOR_BACKEND.
+    
+    The embedding model, the per-namespace vector stores and the set of indexes known
+    to exist are built once and reused, so a query only pays for embedding and search.
     """
     
-    def __init__(self, provider_name: str = "openai"):
+    def __init__(self, provider_name: str = "openai", backend: Optional[Union[str, VectorBackend]] = None):
         """
         Initialize the VectorDBManager with a provider name.
         
         Args:
             provider_name (str): The name of the embedding provider (e.g., 'openai', 'huggingface', 'gemini')
+            backend: Vector backend name ('pinecone' or 'faiss') or instance. Defaults to the
+                VECTOR_BACKEND environment variable, then 'pinecone'.
         """
         self.provider_name = provider_name.lower()
         self.pinecone_api_key = os.environ.get('PINECONE_API_KEY') or os.environ.get('PINECODE_API_KEY')
@@ -36,8 +177,17 @@ class VectorDBManager:
             'gemini': os.environ.get('GEMINI_API_KEY')
         }
         
-        # Initialize Pinecone
-        self._init_pinecone()
+        # Long-lived handles, built on first use
+        self._lock = threading.RLock()
+        self._embeddings = None
+        self._vector_stores: Dict[str, VectorStore] = {}
+        self._known_indexes: set = set()
+        
+        # Initialize the storage backend
+        self.backend = backend if isinstance(backend, VectorBackend) else get_vector_backend(backend)
+        
+        # BM25 index kept alongside the vectors for hybrid retrieval (None when disabled)
+        self.keyword_index = get_keyword_index()
     
     def _get_dimension_for_provider(self) -> int:
         """
@@ -55,24 +205,9 @@ class VectorDBManager:
         else:
             return 1536  # Default to OpenAI dimension
     
-    def _init_pinecone(self) -> None:
-        """
-        Initialize the Pinecone client.
-        
-        Raises:
-            ValueError: If Pinecone API key is not set
-        """
-        if not self.pinecone_api_key:
-            raise ValueError("Pinecone API key not found. Please set PINECONE_API_KEY environment variable.")
-        
-        pinecone.init(
-            api_key=self.pinecone_api_key,
-            environment=self.pinecone_environment
-        )
-    
     def create_index(self, index_name: Optional[str] = None, dimension: Optional[int] = None) -> str:
         """
-        Create a new Pinecone index if it doesn't exist.
+        Create a new index if it doesn't exist.
         
         Args:
             index_name (str, optional): Name of the index to create. Defaults to self.index_name.
@@ -87,21 +222,25 @@ class VectorDBManager:
         index_name = index_name or self.index_name
         dimension = dimension or self.dimension
         
-        # Check if index already exists
-        existing_indexes = pinecone.list_indexes()
+        # Skip the existence check (a list_indexes round-trip on Pinecone) once the index is known
+        if index_name in self._known_indexes:
+            return index_name
         
-        if index_name not in existing_indexes:
+        with self._lock:
+            if index_name in self._known_indexes:
+                return index_name
+            
             try:
-                pinecone.create_index(
-                    name=index_name,
-                    dimension=dimension,
-                    metric="cosine"
-                )
-                print(f"Created new Pinecone index: {index_name} with dimension {dimension}")
+                created = self.backend.ensure_index(index_name, dimension)
             except Exception as e:
-                raise ValueError(f"Failed to create Pinecone index: {str(e)}")
-        else:
-            print(f"Using existing Pinecone index: {index_name}")
+                raise ValueError(f"Failed to create {self.backend.name} index: {str(e)}")
+            
+            if created:
+                print(f"Created new {self.backend.name} index: {index_name} with dimension {dimension}")
+            else:
+                print(f"Using existing {self.backend.name} index: {index_name}")
+            
+            self._known_indexes.add(index_name)
         
         return index_name
     
@@ -109,45 +248,43 @@ class VectorDBManager:
         """
         Returns the appropriate embedding model based on the provider name.
         
+        The model is shared by every manager in the process (see get_shared_embedding_model),
+        so local models (e.g. the Hugging Face sentence-transformer) load their weights only
+        once, and identical text is embedded only once across ingestion and queries.
+        
         Returns:
             Embedding model instance
             
         Raises:
             ValueError: If provider is not supported or API key is missing
         """
-        if self.provider_name == 'openai':
-            api_key = self.api_keys.get('openai')
-            if not api_key:
-                raise ValueError("OpenAI API key not found. Please set OPENAI_API_KEY environment variable.")
-            return OpenAIEmbeddings(openai_api_key=api_key)
-            
-        elif self.provider_name == 'huggingface':
-            api_key = self.api_keys.get('huggingface')
-            model_name = "sentence-transformers/all-mpnet-base-v2"
-            if api_key:
-                return HuggingFaceEmbeddings(
-                    model_name=model_name,
-                    huggingfacehub_api_token=api_key
-                )
-            else:
-                # Use local model if no API key
-                return HuggingFaceEmbeddings(model_name=model_name)
-                
-        elif self.provider_name == 'gemini':
-            api_key = self.api_keys.get('gemini')
-            if not api_key:
-                raise ValueError("Gemini API key not found. Please set GEMINI_API_KEY environment variable.")
-            return GoogleGenerativeAIEmbeddings(
-                model="embedding-001",
-                google_api_key=api_key
-            )
+        if self._embeddings is None:
+            self._embeddings = get_shared_embedding_model(self.provider_name)
+        return self._embeddings
+    
+    def get_vector_store(self, namespace: str = "") -> VectorStore:
+        """
+        Returns the vector store for a namespace, creating it on first use.
+        
+        Args:
+            namespace: Namespace of the store (optional)
             
-        else:
-            raise ValueError(f"Unsupported provider: {self.provider_name}")
+        Returns:
+            LangChain vector store bound to this manager's index and embedding model
+        """
+        vector_store = self._vector_stores.get(namespace)
+        if vector_store is None:
+            embeddings = self.get_embedding_model()
+            with self._lock:
+                vector_store = self._vector_stores.get(namespace)
+                if vector_store is None:
+                    vector_store = self.backend.get_vector_store(self.index_name, embeddings, namespace)
+                    self._vector_stores[namespace] = vector_store
+        return vector_store
     
     def add_documents(self, documents: List[Union[Document, Dict[str, Any]]], namespace: str = "") -> None:
         """
-        Add documents to the Pinecone index.
+        Add documents to the index.
         
         Args:
             documents: List of documents to add. Can be langchain Document objects or dictionaries
@@ -161,37 +298,73 @@ class VectorDBManager:
             # Ensure index exists
             self.create_index()
             
-            # Convert dict documents to langchain Documents if needed
-            processed_docs = []
-            for doc in documents:
-                if isinstance(doc, dict):
-                    processed_docs.append(Document(
-                        page_content=doc.get('page_content', ''),
-                        metadata=doc.get('metadata', {})
-                    ))
-                else:
-                    processed_docs.append(doc)
-            
-            # Get embedding model
-            embeddings = self.get_embedding_model()
+            # Normalize Documents and dicts to (id, text, metadata); ids are shared with the keyword index
+            records = [document_record(doc) for doc in documents]
             
-            # Create vector store and add documents
-            vector_store = PineconeVectorStore.from_documents(
-                documents=processed_docs,
-                embedding=embeddings,
-                index_name=self.index_name,
-                namespace=namespace
+            # Add documents through the shared vector store
+            vector_store = self.get_vector_store(namespace)
+            vector_store.add_texts(
+                [text for _, text, _ in records],
+                metadatas=[metadata for _, _, metadata in records],
+                ids=[doc_id for doc_id, _, _ in records]
             )
+            self.backend.persist()
+            if self.keyword_index is not None:
+                self.keyword_index.add(self.index_name, records, namespace=namespace)
             
-            print(f"Added {len(processed_docs)} documents to Pinecone index {self.index_name}")
+            print(f"Added {len(records)} documents to {self.backend.name} index {self.index_name}")
             return vector_store
             
         except Exception as e:
-            raise ValueError(f"Failed to add documents to Pinecone: {str(e)}")
+            raise ValueError(f"Failed to add documents to {self.backend.name}: {str(e)}")
+    
+    def ingest(self, documents: Iterable[Union[Document, Dict[str, Any]]], namespace: str = "", batch_size: int = 64,
+               max_workers: int = 4, checkpoint_path: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        """
+        Stream documents into the index in parallel batches.
+        
+        Unlike add_documents, the input is consumed lazily, batches are embedded and
+        upserted concurrently with retries, and progress can be checkpointed so an
+        interrupted run resumes where it stopped.
+        
+        Args:
+            documents: Iterable of langchain Documents or dicts with 'page_content',
+                      'metadata' and an optional 'id'
+            namespace: Namespace to add documents to (optional)
+            batch_size: Documents per embedding request
+            max_workers: Batches processed concurrently
+            checkpoint_path: JSON file recording finished batches (optional)
+            **kwargs: Further BulkIngestor options (max_in_flight, max_retries, ...)
+            
+        Returns:
+            Dict with document counts, docs/sec and embedding tokens/sec
+            
+        Raises:
+            ValueError: If a batch cannot be ingested after retries
+        """
+        from memory.pinecode.ingestion import BulkIngestor
+        
+        ingestor = BulkIngestor(
+            self,
+            namespace=namespace,
+            batch_size=batch_size,
+            max_workers=max_workers,
+            checkpoint_path=checkpoint_path,
+            **kwargs
+        )
+        return ingestor.run(documents)
+    
+    def ingest_jsonl(self, path: str, namespace: str = "", **kwargs) -> Dict[str, Any]:
+        """
+        Stream a JSONL file of documents into the index; see ingest() for options.
+        """
+        from memory.pinecode.ingestion import iter_jsonl_documents
+        
+        return self.ingest(iter_jsonl_documents(path), namespace=namespace, **kwargs)
     
     def get_retriever(self, namespace: str = "", search_kwargs: Optional[Dict[str, Any]] = None):
         """
-        Get a retriever for the Pinecone vector store.
+        Get a retriever for the vector store.
         
         Args:
             namespace: Namespace to search in (optional)
@@ -204,19 +377,11 @@ class VectorDBManager:
             ValueError: If retriever cannot be created
         """
         try:
-            # Get embedding model
-            embeddings = self.get_embedding_model()
-            
             # Set default search kwargs if not provided
             if search_kwargs is None:
                 search_kwargs = {"k": 4}  # Default to retrieving top 4 results
             
-            # Create vector store
-            vector_store = PineconeVectorStore(
-                index_name=self.index_name,
-                embedding=embeddings,
-                namespace=namespace
-            )
+            vector_store = self.get_vector_store(namespace)
             
             # Return retriever
             return vector_store.as_retriever(search_kwargs=search_kwargs)
@@ -224,6 +389,65 @@ class VectorDBManager:
         except Exception as e:
             raise ValueError(f"Failed to create retriever: {str(e)}")
     
+    def get_hybrid_retriever(self, namespace: str = "", k: int = 4, dense_timeout: Optional[float] = None, **kwargs):
+        """
+        Get a retriever that fuses vector and BM25 keyword search.
+        
+        Both searches run concurrently and are merged with reciprocal-rank fusion, which
+        lifts exact-term matches (city names, SKUs) without raising k. If the vector
+        search takes longer than dense_timeout, the keyword results are returned alone.
+        
+        Args:
+            namespace: Namespace to search in (optional)
+            k: Number of documents to return
+            dense_timeout: Seconds to wait for the vector search. Defaults to the
+                HYBRID_DENSE_TIMEOUT environment variable (2.0).
+            **kwargs: Further HybridRetriever options (fetch_k, rrf_k, dense_weight, keyword_weight)
+            
+        Returns:
+            A HybridRetriever
+            
+        Raises:
+            ValueError: If the keyword index is disabled or the retriever cannot be created
+        """
+        from rags.hybrid_retriever import HybridRetriever
+        
+        if self.keyword_index is None:
+            raise ValueError("Hybrid retrieval needs the keyword index; set HYBRID_KEYWORD_INDEX=true.")
+        try:
+            return HybridRetriever(
+                vector_store=self.get_vector_store(namespace),
+                keyword_index=self.keyword_index,
+                index_name=self.index_name,
+                namespace=namespace,
+                k=k,
+                dense_timeout=dense_timeout if dense_timeout is not None else float(os.getenv("HYBRID_DENSE_TIMEOUT", "2.0")),
+                **kwargs
+            )
+        except Exception as e:
+            raise ValueError(f"Failed to create hybrid retriever: {str(e)}")
+    
+    def hybrid_query(self, query_text: str, namespace: str = "", top_k: int = 4):
+        """
+        Query with hybrid (vector + keyword) retrieval and return the fused results.
+        
+        Args:
+            query_text: The query text
+            namespace: Namespace to search in (optional)
+            top_k: Number of results to return
+            
+        Returns:
+            List of documents; each carries its fused score in metadata['rrf_score']
+            
+        Raises:
+            ValueError: If query fails
+        """
+        try:
+            with timed(VECTOR_QUERY_SECONDS, backend=self.backend.name, mode="hybrid"):
+                return self.get_hybrid_retriever(namespace=namespace, k=top_k).search(query_text)[0]
+        except Exception as e:
+            raise ValueError(f"Hybrid query failed: {str(e)}")
+    
     def query(self, query_text: str, namespace: str = "", top_k: int = 4):
         """
         Query the vector store directly and return results.
@@ -240,28 +464,84 @@ class VectorDBManager:
             ValueError: If query fails
         """
         try:
-            retriever = self.get_retriever(namespace=namespace, search_kwargs={"k": top_k})
-            return retriever.get_relevant_documents(query_text)
+            with timed(VECTOR_QUERY_SECONDS, backend=self.backend.name, mode="dense"):
+                return self.get_vector_store(namespace).similarity_search(query_text, k=top_k)
         except Exception as e:
             raise ValueError(f"Query failed: {str(e)}")
     
-    def delete_index(self, index_name: Optional[str] = None) -> None:
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
         """
-        Delete a Pinecone index.
+        Embed several query strings together.
+        
+        The queries are submitted concurrently, so cached ones are answered from the
+        embedding cache and the rest share micro-batched provider requests.
+        
+        Args:
+            queries: The query texts
+            
+        Returns:
+            One vector per query, in order
+        """
+        embeddings = self.get_embedding_model()
+        
+        async def embed_all():
+            return await asyncio.gather(*(embeddings.aembed_query(query) for query in queries))
+        
+        return list(background_loop.run(embed_all()))
+    
+    def batch_query(self, queries: List[str], namespace: str = "", top_k: int = 4) -> List[List[Tuple[Document, float]]]:
+        """
+        Search for several queries in one call.
+        
+        All queries are embedded together (see embed_queries) and the vectors are searched
+        as one batch, which on the FAISS backend is a single index search.
+        
+        Args:
+            queries: The query texts
+            namespace: Namespace to search in (optional)
+            top_k: Number of results per query
+            
+        Returns:
+            For each query, a list of (document, similarity) pairs
+            
+        Raises:
+            ValueError: If the search fails
+        """
+        if not queries:
+            return []
+        try:
+            with timed(VECTOR_QUERY_SECONDS, backend=self.backend.name, mode="batch"):
+                vectors = self.embed_queries(queries)
+                return self.backend.search_many(self.index_name, vectors, k=top_k, namespace=namespace)
+        except Exception as e:
+            raise ValueError(f"Batch query failed: {str(e)}")
+    
+    def delete_index(self, index_name: Optional[str] = None) -> bool:
+        """
+        Delete an index.
         
         Args:
             index_name: Name of the index to delete. Defaults to self.index_name.
             
+        Returns:
+            bool: False if the index did not exist
+            
         Raises:
             ValueError: If index deletion fails
         """
         index_name = index_name or self.index_name
         
         try:
-            if index_name in pinecone.list_indexes():
-                pinecone.delete_index(index_name)
-                print(f"Deleted Pinecone index: {index_name}")
-            else:
-                print(f"Index {index_name} does not exist")
+            if self.keyword_index is not None:
+                self.keyword_index.delete_index(index_name)
+            if self.backend.delete_index(index_name):
+                print(f"Deleted {self.backend.name} index: {index_name}")
+                with self._lock:
+                    self._known_indexes.discard(index_name)
+                    if index_name == self.index_name:
+                        self._vector_stores.clear()
+                return True
+            print(f"Index {index_name} does not exist")
+            return False
         except Exception as e:
-            raise ValueError(f"Failed to delete Pinecone index: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Failed to delete {self.backend.name} index: {str(e)}")
\ No newline at end of file
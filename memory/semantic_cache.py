@@ -0,0 +1,228 @@
+"""Semantic response cache for OrchestraAgent chat queries.
+
+Answers are partitioned by provider and a hash of the system prompt, so only answers
+given under the same instructions are compared. A lookup first checks an exact hash of
+(partition, normalized query), which costs nothing but a dict access. On a miss the
+normalized query is embedded and compared with earlier queries of the partition; an
+answer whose query is at least ``threshold`` cosine-similar is reused. Entries expire
+after ``ttl`` seconds and each partition keeps at most ``max_entries`` answers, evicting
+the least recently used. numpy is imported on first use, not when the app starts.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from utils.metrics import CACHE_REQUESTS, inc
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivial variants match exactly."""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+class _Partition:
+    """Vectors and answers of one partition, stored in fixed slots of a matrix."""
+
+    def __init__(self, max_entries: int):
+        import numpy as np
+
+        self.max_entries = max_entries
+        self.vectors: Optional["np.ndarray"] = None
+        self.valid = np.zeros(max_entries, dtype=bool)
+        # slot -> (exact key, response, expires_at), in least recently used order
+        self.entries: "OrderedDict[int, Tuple[str, Any, float]]" = OrderedDict()
+        self.free = list(range(max_entries - 1, -1, -1))
+
+    def release(self, slot: int) -> str:
+        exact_key, _, _ = self.entries.pop(slot)
+        self.valid[slot] = False
+        self.free.append(slot)
+        return exact_key
+
+
+class SemanticResponseCache:
+    """Exact-then-semantic cache of LLM answers, partitioned by provider and system prompt."""
+
+    def __init__(self, embeddings, threshold: float = 0.92, ttl: float = 3600.0, max_entries: int = 2048):
+        """Initialize the cache.
+
+        Args:
+            embeddings: LangChain embedding model used for the similarity lookup.
+            threshold: Minimum cosine similarity for a semantic hit.
+            ttl: Seconds an answer stays valid.
+            max_entries: Answers kept per partition; least recently used are evicted.
+        """
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._partitions: Dict[str, _Partition] = {}
+        # exact key -> (partition, slot)
+        self._exact: Dict[str, Tuple[str, int]] = {}
+        self._exact_hits = 0
+        self._semantic_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def _partition_key(partition: str, system_prompt: str) -> str:
+        # Only answers given under the same system prompt are comparable
+        return f"{partition}:{hashlib.sha256(system_prompt.strip().encode('utf-8')).hexdigest()[:16]}"
+
+    @staticmethod
+    def _exact_key(partition_key: str, query: str) -> str:
+        return hashlib.sha256(f"{partition_key}\x00{normalize_query(query)}".encode("utf-8")).hexdigest()
+
+    def _embed(self, query: str) -> "np.ndarray":
+        import numpy as np
+
+        vector = np.asarray(self.embeddings.embed_query(normalize_query(query)), dtype="float32")
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _hit_locked(self, partition: _Partition, slot: int) -> Optional[Any]:
+        """Return the answer in ``slot`` if still fresh, dropping it otherwise."""
+        _, response, expires_at = partition.entries[slot]
+        if expires_at < time.time():
+            del self._exact[partition.release(slot)]
+            self._evictions += 1
+            return None
+        partition.entries.move_to_end(slot)
+        return response
+
+    def lookup(self, partition: str, query: str, system_prompt: str = "") -> Optional[Dict[str, Any]]:
+        """Return ``{"response", "match", "similarity"}`` for a cached answer, or None.
+
+        Args:
+            partition: Partition name, e.g. the LLM provider.
+            query: The user's query.
+            system_prompt: System prompt the answer was produced under.
+        """
+        import numpy as np
+
+        partition = self._partition_key(partition, system_prompt)
+        exact_key = self._exact_key(partition, query)
+        with self._lock:
+            location = self._exact.get(exact_key)
+            if location is not None:
+                response = self._hit_locked(self._partitions[location[0]], location[1])
+                if response is not None:
+                    self._exact_hits += 1
+                    inc(CACHE_REQUESTS, cache="semantic", result="exact_hit")
+                    return {"response": response, "match": "exact", "similarity": 1.0}
+            part = self._partitions.get(partition)
+            if part is None or not part.entries:
+                self._misses += 1
+                inc(CACHE_REQUESTS, cache="semantic", result="miss")
+                return None
+
+        vector = self._embed(query)
+        with self._lock:
+            part = self._partitions.get(partition)
+            if part is not None and part.vectors is not None and part.vectors.shape[1] == vector.shape[0]:
+                similarities = part.vectors @ vector
+                similarities[~part.valid] = -1.0
+                slot = int(np.argmax(similarities))
+                similarity = float(similarities[slot])
+                if similarity >= self.threshold:
+                    response = self._hit_locked(part, slot)
+                    if response is not None:
+                        self._semantic_hits += 1
+                        inc(CACHE_REQUESTS, cache="semantic", result="semantic_hit")
+                        return {"response": response, "match": "semantic", "similarity": similarity}
+            self._misses += 1
+        inc(CACHE_REQUESTS, cache="semantic", result="miss")
+        return None
+
+    def store(self, partition: str, query: str, response: Any, system_prompt: str = "") -> None:
+        """Cache an answer for a query."""
+        import numpy as np
+
+        partition = self._partition_key(partition, system_prompt)
+        exact_key = self._exact_key(partition, query)
+        vector = self._embed(query)
+        with self._lock:
+            part = self._partitions.get(partition)
+            if part is None:
+                part = self._partitions[partition] = _Partition(self.max_entries)
+            if part.vectors is None or part.vectors.shape[1] != vector.shape[0]:
+                part.vectors = np.zeros((self.max_entries, vector.shape[0]), dtype="float32")
+
+            location = self._exact.pop(exact_key, None)
+            if location is not None:
+                self._partitions[location[0]].release(location[1])
+            if not part.free:
+                oldest = next(iter(part.entries))
+                del self._exact[part.release(oldest)]
+                self._evictions += 1
+            slot = part.free.pop()
+            part.vectors[slot] = vector
+            part.valid[slot] = True
+            part.entries[slot] = (exact_key, response, time.time() + self.ttl)
+            self._exact[exact_key] = (partition, slot)
+
+    def clear(self) -> None:
+        """Drop every cached answer."""
+        with self._lock:
+            self._partitions.clear()
+            self._exact.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit/miss counters."""
+        with self._lock:
+            lookups = self._exact_hits + self._semantic_hits + self._misses
+            return {
+                "size": len(self._exact),
+                "partitions": {name: len(part.entries) for name, part in self._partitions.items()},
+                "threshold": self.threshold,
+                "ttl": self.ttl,
+                "exact_hits": self._exact_hits,
+                "semantic_hits": self._semantic_hits,
+                "misses": self._misses,
+                "hit_rate": (self._exact_hits + self._semantic_hits) / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+
+# Process-wide cache, built on first use
+_semantic_cache: Optional[SemanticResponseCache] = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> Optional[SemanticResponseCache]:
+    """Return the shared response cache, or None unless SEMANTIC_CACHE_ENABLED is true.
+
+    Queries are embedded with SEMANTIC_CACHE_EMBEDDING_PROVIDER (default:
+    DEFAULT_EMBEDDING_PROVIDER, then 'openai').
+    """
+    global _semantic_cache
+    if os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() != "true":
+        return None
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                from memory.pinecode.vectordb_manager import get_shared_embedding_model
+
+                provider = os.getenv("SEMANTIC_CACHE_EMBEDDING_PROVIDER") or os.getenv("DEFAULT_EMBEDDING_PROVIDER", "openai")
+                try:
+                    embeddings = get_shared_embedding_model(provider)
+                except Exception as e:
+                    # The cache is an optimization; requests still work without it
+                    print(f"Warning: Semantic cache disabled, could not load {provider} embeddings: {str(e)}")
+                    return None
+                _semantic_cache = SemanticResponseCache(
+                    embeddings,
+                    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+                    ttl=float(os.getenv("SEMANTIC_CACHE_TTL", "3600")),
+                    max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2048"))
+                )
+    return _semantic_cache
@@ -0,0 +1,364 @@
+"""Server-side conversation session stores.
+
+Sessions let multi-turn clients send only the new message on each turn while the
+server keeps the conversation history. Two backends are provided:
+
+- ``InMemorySessionStore``: process-local LRU with a TTL, for single-process servers.
+- ``SQLiteSessionStore``: file-backed, shared by every worker process on a host.
+
+Both bound the number of messages kept per session (system messages are always kept)
+and report eviction metrics via ``stats()``.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+class SessionNotFoundError(ValueError):
+    """Raised when a session ID is unknown or has expired."""
+
+
+class SessionStore(ABC):
+    """Base class for session stores.
+
+    Subclasses implement storage; this class holds the shared limits and counters.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600.0, max_sessions: int = 10000, max_messages: int = 100):
+        """Initialize the store.
+
+        Args:
+            ttl_seconds: Seconds a session may go untouched before it expires.
+            max_sessions: Maximum number of live sessions; least recently used are evicted.
+            max_messages: Maximum non-system messages kept per session; oldest are dropped.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self._lock = threading.RLock()
+        self._counters = {
+            "created": 0,
+            "hits": 0,
+            "misses": 0,
+            "expired_evictions": 0,
+            "lru_evictions": 0,
+            "trimmed_messages": 0,
+        }
+
+    @staticmethod
+    def new_session_id() -> str:
+        """Generate a new random session ID."""
+        return uuid.uuid4().hex
+
+    def _trim(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Keep system messages plus the newest ``max_messages`` other messages."""
+        system = [m for m in messages if m.get("role") == "system"]
+        others = [m for m in messages if m.get("role") != "system"]
+        if len(others) <= self.max_messages:
+            return messages
+        self._counters["trimmed_messages"] += len(others) - self.max_messages
+        return system + others[-self.max_messages:]
+
+    @abstractmethod
+    def create_session(self, messages: Optional[List[Dict[str, Any]]] = None) -> str:
+        """Create a session, optionally seeded with messages, and return its ID."""
+
+    @abstractmethod
+    def get_history(self, session_id: str, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return a slice of a session's messages.
+
+        Raises:
+            SessionNotFoundError: If the session is unknown or expired.
+        """
+
+    @abstractmethod
+    def append(self, session_id: str, messages: List[Dict[str, Any]]) -> int:
+        """Append messages to a session and return its new message count.
+
+        Raises:
+            SessionNotFoundError: If the session is unknown or expired.
+        """
+
+    @abstractmethod
+    def get_state(self, session_id: str) -> Dict[str, Any]:
+        """Return the small JSON-serializable state saved with a session (e.g. a history summary)."""
+
+    @abstractmethod
+    def set_state(self, session_id: str, state: Dict[str, Any]) -> None:
+        """Replace the state saved with a session. Unknown sessions are ignored."""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        """Delete a session. Returns True if it existed."""
+
+    @abstractmethod
+    def count_sessions(self) -> int:
+        """Return the number of live sessions."""
+
+    def stats(self) -> Dict[str, Any]:
+        """Return session counts and eviction metrics."""
+        with self._lock:
+            stats = dict(self._counters)
+        stats.update({
+            "backend": type(self).__name__,
+            "sessions": self.count_sessions(),
+            "ttl_seconds": self.ttl_seconds,
+            "max_sessions": self.max_sessions,
+            "max_messages": self.max_messages,
+        })
+        return stats
+
+
+class InMemorySessionStore(SessionStore):
+    """Process-local session store with LRU eviction and a TTL."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # session_id -> (messages, last_access)
+        self._sessions: "OrderedDict[str, Any]" = OrderedDict()
+        self._states: Dict[str, Dict[str, Any]] = {}
+
+    def _get_live(self, session_id: str) -> List[Dict[str, Any]]:
+        """Return a live session's messages and mark it recently used. Caller holds the lock."""
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            self._counters["misses"] += 1
+            raise SessionNotFoundError(f"Unknown or expired session_id: {session_id}")
+        messages, last_access = entry
+        now = time.monotonic()
+        if now - last_access > self.ttl_seconds:
+            del self._sessions[session_id]
+            self._states.pop(session_id, None)
+            self._counters["expired_evictions"] += 1
+            self._counters["misses"] += 1
+            raise SessionNotFoundError(f"Unknown or expired session_id: {session_id}")
+        self._sessions[session_id] = (messages, now)
+        self._sessions.move_to_end(session_id)
+        self._counters["hits"] += 1
+        return messages
+
+    def _evict_locked(self) -> None:
+        """Drop expired sessions from the LRU end, then enforce ``max_sessions``."""
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._sessions:
+            oldest_id, (_, last_access) = next(iter(self._sessions.items()))
+            if last_access >= cutoff:
+                break
+            del self._sessions[oldest_id]
+            self._states.pop(oldest_id, None)
+            self._counters["expired_evictions"] += 1
+        while len(self._sessions) > self.max_sessions:
+            evicted_id, _ = self._sessions.popitem(last=False)
+            self._states.pop(evicted_id, None)
+            self._counters["lru_evictions"] += 1
+
+    def create_session(self, messages: Optional[List[Dict[str, Any]]] = None) -> str:
+        session_id = self.new_session_id()
+        with self._lock:
+            self._sessions[session_id] = (self._trim(list(messages or [])), time.monotonic())
+            self._counters["created"] += 1
+            self._evict_locked()
+        return session_id
+
+    def get_history(self, session_id: str, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            messages = self._get_live(session_id)
+            end = None if limit is None else offset + limit
+            return [dict(m) for m in messages[offset:end]]
+
+    def append(self, session_id: str, messages: List[Dict[str, Any]]) -> int:
+        with self._lock:
+            history = self._trim(self._get_live(session_id) + [dict(m) for m in messages])
+            self._sessions[session_id] = (history, time.monotonic())
+            return len(history)
+
+    def get_state(self, session_id: str) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._states.get(session_id, {}))
+
+    def set_state(self, session_id: str, state: Dict[str, Any]) -> None:
+        with self._lock:
+            if session_id in self._sessions:
+                self._states[session_id] = dict(state)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            self._states.pop(session_id, None)
+            return self._sessions.pop(session_id, None) is not None
+
+    def count_sessions(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """File-backed session store shared by every process on the host."""
+
+    def __init__(self, db_path: str = "sessions.db", **kwargs):
+        """Initialize the store.
+
+        Args:
+            db_path: Path of the SQLite database file.
+            **kwargs: Limits passed to ``SessionStore``.
+        """
+        super().__init__(**kwargs)
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY, created_at REAL NOT NULL, last_access REAL NOT NULL, state TEXT)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_messages ("
+            " session_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL,"
+            " PRIMARY KEY (session_id, seq))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_access ON sessions (last_access)")
+
+    def _touch_live(self, session_id: str) -> None:
+        """Check a session is live and refresh its last access time. Caller holds the lock."""
+        now = time.time()
+        row = self._conn.execute("SELECT last_access FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            self._counters["misses"] += 1
+            raise SessionNotFoundError(f"Unknown or expired session_id: {session_id}")
+        if now - row[0] > self.ttl_seconds:
+            # Left for _evict_locked to delete, so a rolled-back transaction can't undo it
+            self._counters["misses"] += 1
+            raise SessionNotFoundError(f"Unknown or expired session_id: {session_id}")
+        self._conn.execute("UPDATE sessions SET last_access = ? WHERE id = ?", (now, session_id))
+        self._counters["hits"] += 1
+
+    def _delete_locked(self, session_id: str) -> int:
+        self._conn.execute("DELETE FROM session_messages WHERE session_id = ?", (session_id,))
+        return self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount
+
+    def _evict_locked(self) -> None:
+        """Delete expired sessions, then the least recently used beyond ``max_sessions``."""
+        cutoff = time.time() - self.ttl_seconds
+        expired = [row[0] for row in self._conn.execute("SELECT id FROM sessions WHERE last_access < ?", (cutoff,))]
+        for session_id in expired:
+            self._delete_locked(session_id)
+        self._counters["expired_evictions"] += len(expired)
+
+        overflow = self.count_sessions() - self.max_sessions
+        if overflow > 0:
+            oldest = [row[0] for row in self._conn.execute(
+                "SELECT id FROM sessions ORDER BY last_access ASC LIMIT ?", (overflow,))]
+            for session_id in oldest:
+                self._delete_locked(session_id)
+            self._counters["lru_evictions"] += len(oldest)
+
+    def _insert_messages(self, session_id: str, messages: List[Dict[str, Any]]) -> None:
+        row = self._conn.execute("SELECT MAX(seq) FROM session_messages WHERE session_id = ?", (session_id,)).fetchone()
+        next_seq = (row[0] + 1) if row and row[0] is not None else 0
+        self._conn.executemany(
+            "INSERT INTO session_messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)",
+            [(session_id, next_seq + i, m["role"], m["content"]) for i, m in enumerate(messages)]
+        )
+
+    def _trim_stored(self, session_id: str) -> None:
+        """Drop the oldest non-system messages beyond ``max_messages``."""
+        count = self._conn.execute(
+            "SELECT COUNT(*) FROM session_messages WHERE session_id = ? AND role != 'system'", (session_id,)
+        ).fetchone()[0]
+        excess = count - self.max_messages
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM session_messages WHERE session_id = ? AND seq IN ("
+                " SELECT seq FROM session_messages WHERE session_id = ? AND role != 'system'"
+                " ORDER BY seq ASC LIMIT ?)",
+                (session_id, session_id, excess)
+            )
+            self._counters["trimmed_messages"] += excess
+
+    def create_session(self, messages: Optional[List[Dict[str, Any]]] = None) -> str:
+        session_id = self.new_session_id()
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT INTO sessions (id, created_at, last_access) VALUES (?, ?, ?)", (session_id, now, now))
+                if messages:
+                    self._insert_messages(session_id, messages)
+                    self._trim_stored(session_id)
+                self._evict_locked()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._counters["created"] += 1
+        return session_id
+
+    def get_history(self, session_id: str, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._touch_live(session_id)
+            rows = self._conn.execute(
+                "SELECT role, content FROM session_messages WHERE session_id = ? ORDER BY seq ASC LIMIT ? OFFSET ?",
+                (session_id, -1 if limit is None else limit, offset)
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def append(self, session_id: str, messages: List[Dict[str, Any]]) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._touch_live(session_id)
+                self._insert_messages(session_id, messages)
+                self._trim_stored(session_id)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM session_messages WHERE session_id = ?", (session_id,)).fetchone()[0]
+
+    def get_state(self, session_id: str) -> Dict[str, Any]:
+        with self._lock:
+            row = self._conn.execute("SELECT state FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else {}
+
+    def set_state(self, session_id: str, state: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE sessions SET state = ? WHERE id = ?", (json.dumps(state), session_id))
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._delete_locked(session_id) > 0
+
+    def count_sessions(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def get_session_store() -> SessionStore:
+    """Create the session store configured by environment variables.
+
+    ``SESSION_STORE`` selects the backend ('memory' or 'sqlite'); ``SESSION_DB_PATH``,
+    ``SESSION_TTL_SECONDS``, ``SESSION_MAX_SESSIONS`` and ``SESSION_MAX_MESSAGES`` tune it.
+
+    Raises:
+        ValueError: If the backend is not supported.
+    """
+    backend = os.environ.get("SESSION_STORE", "memory").lower()
+    limits = {
+        "ttl_seconds": float(os.environ.get("SESSION_TTL_SECONDS", "3600")),
+        "max_sessions": int(os.environ.get("SESSION_MAX_SESSIONS", "10000")),
+        "max_messages": int(os.environ.get("SESSION_MAX_MESSAGES", "100")),
+    }
+    if backend == "memory":
+        return InMemorySessionStore(**limits)
+    elif backend == "sqlite":
+        return SQLiteSessionStore(db_path=os.environ.get("SESSION_DB_PATH", "sessions.db"), **limits)
+    else:
+        raise ValueError(f"Unsupported session store: {backend}. Supported stores: 'memory', 'sqlite'.")
@@ -0,0 +1,45 @@
+from memory.keyword_index import KeywordIndex, tokenize
+
+
+def _index(tmp_path):
+    index = KeywordIndex(str(tmp_path / "keywords.db"))
+    index.add("products", [
+        ("1", "Trail running shoe SKU-4411 in blue", {"category": "shoes"}),
+        ("2", "Waterproof hiking boot for rocky trails", {"category": "boots"}),
+        ("3", "Running socks, pack of three", {"category": "socks"}),
+    ])
+    return index
+
+
+def test_tokenize_keeps_codes_whole_and_split():
+    assert tokenize("The SKU-4411 is in v2.1") == ["sku-4411", "sku", "4411", "v2.1", "v2", "1"]
+
+
+def test_exact_code_ranks_first(tmp_path):
+    results = _index(tmp_path).search("products", "sku-4411", k=3)
+
+    assert [document.metadata["category"] for document, _ in results] == ["shoes"]
+
+
+def test_bm25_prefers_documents_matching_more_terms(tmp_path):
+    results = _index(tmp_path).search("products", "running shoe", k=3)
+
+    assert [document.metadata["category"] for document, _ in results] == ["shoes", "socks"]
+    assert results[0][1] > results[1][1]
+
+
+def test_documents_are_replaced_by_id(tmp_path):
+    index = _index(tmp_path)
+    index.add("products", [("1", "Leather sandal", {"category": "sandals"})])
+
+    assert index.search("products", "sku-4411") == []
+    assert index.search("products", "sandal")[0][0].metadata == {"category": "sandals"}
+
+
+def test_namespaces_and_indexes_are_separate(tmp_path):
+    index = _index(tmp_path)
+    index.add("products", [("9", "Trail map", {})], namespace="maps")
+
+    assert [document.page_content for document, _ in index.search("products", "trail", namespace="maps")] == ["Trail map"]
+    index.delete_index("products")
+    assert index.search("products", "trail") == []
@@ -0,0 +1,108 @@
+import time
+
+from langchain_core.embeddings import Embeddings
+
+from agents.orchestra_agent import OrchestraAgent
+from memory.semantic_cache import SemanticResponseCache, normalize_query
+
+
+class StubEmbeddings(Embeddings):
+    """Bag-of-words vectors over a tiny vocabulary; records every text it embedded."""
+
+    VOCABULARY = ["capital", "france", "paris", "weather", "tokyo", "city", "the", "what", "is", "of"]
+
+    def __init__(self):
+        self.texts = []
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        self.texts.append(text)
+        words = text.split()
+        return [float(words.count(word)) for word in self.VOCABULARY]
+
+
+def _cache(**kwargs):
+    embeddings = StubEmbeddings()
+    return embeddings, SemanticResponseCache(embeddings, **kwargs)
+
+
+def test_normalize_query():
+    assert normalize_query("  What's the CAPITAL of France?! ") == "what s the capital of france"
+
+
+def test_exact_hit_skips_the_embedding_call():
+    embeddings, cache = _cache()
+    cache.store("openai", "What is the capital of France?", "Paris.")
+    embedded = len(embeddings.texts)
+
+    hit = cache.lookup("openai", "what is the capital of france")
+
+    assert hit == {"response": "Paris.", "match": "exact", "similarity": 1.0}
+    assert len(embeddings.texts) == embedded
+
+
+def test_similar_question_is_a_semantic_hit():
+    _, cache = _cache(threshold=0.9)
+    cache.store("openai", "What is the capital of France?", "Paris.")
+
+    hit = cache.lookup("openai", "What is the capital city of France?")
+
+    assert hit["match"] == "semantic" and hit["response"] == "Paris."
+    assert 0.9 <= hit["similarity"] < 1.0
+    assert cache.lookup("openai", "What is the weather in Tokyo?") is None
+
+
+def test_partitions_and_system_prompts_are_separate():
+    _, cache = _cache()
+    cache.store("openai", "What is the capital of France?", "Paris.", system_prompt="Be brief.")
+
+    assert cache.lookup("gemini", "What is the capital of France?", system_prompt="Be brief.") is None
+    assert cache.lookup("openai", "What is the capital of France?", system_prompt="Answer in French.") is None
+    assert cache.lookup("openai", "What is the capital of France?", system_prompt=" Be brief. ") is not None
+
+
+def test_entries_expire():
+    _, cache = _cache(ttl=0.05)
+    cache.store("openai", "What is the capital of France?", "Paris.")
+    time.sleep(0.1)
+
+    assert cache.lookup("openai", "What is the capital of France?") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_least_recently_used_answer_is_evicted():
+    _, cache = _cache(max_entries=2)
+    cache.store("openai", "capital of france", "Paris.")
+    cache.store("openai", "weather in tokyo", "Sunny.")
+    cache.lookup("openai", "capital of france")
+    cache.store("openai", "what is paris", "A city.")
+
+    assert cache.lookup("openai", "capital of france")["response"] == "Paris."
+    assert cache.lookup("openai", "weather in tokyo") is None
+    assert cache.stats()["size"] == 2
+
+
+def test_storing_a_question_again_replaces_its_answer():
+    _, cache = _cache()
+    cache.store("openai", "capital of france", "Paris.")
+    cache.store("openai", "Capital of France?", "Paris, France.")
+
+    assert cache.lookup("openai", "capital of france")["response"] == "Paris, France."
+    assert cache.stats()["size"] == 1
+
+
+def test_agent_answers_the_opening_question_from_the_cache():
+    _, cache = _cache()
+    first = OrchestraAgent(llm_prefix="mock", use_tools=False, verbose=False, response_cache=cache)
+    answer = first.process_query("What is the capital of France?")
+
+    second = OrchestraAgent(llm_prefix="mock", use_tools=False, verbose=False, response_cache=cache)
+    assert second.process_query("what is the capital of france") == answer
+    assert second.last_cache_hit == {"match": "exact", "similarity": 1.0}
+    assert second.conversation_history[-1] == {"role": "assistant", "content": answer}
+
+    # Follow-up turns depend on the conversation, so they are never served from the cache
+    second.process_query("What is the capital of France?")
+    assert second.last_cache_hit is None
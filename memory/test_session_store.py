@@ -0,0 +1,110 @@
+import time
+
+import pytest
+
+from memory.session_store import (InMemorySessionStore, SessionNotFoundError, SessionStore, SQLiteSessionStore,
+                                  get_session_store)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(**limits):
+        if request.param == "memory":
+            return InMemorySessionStore(**limits)
+        return SQLiteSessionStore(db_path=str(tmp_path / "sessions.db"), **limits)
+    return make
+
+
+def _messages(*contents, role="user"):
+    return [{"role": role, "content": content} for content in contents]
+
+
+def test_history_round_trips(make_store):
+    store = make_store()
+    session_id = store.create_session(_messages("Be brief.", role="system"))
+
+    assert store.append(session_id, _messages("hi", "there")) == 3
+    assert store.get_history(session_id) == _messages("Be brief.", role="system") + _messages("hi", "there")
+    assert store.get_history(session_id, offset=1, limit=1) == _messages("hi")
+
+
+def test_oldest_messages_are_trimmed_but_system_messages_kept(make_store):
+    store = make_store(max_messages=2)
+    session_id = store.create_session(_messages("Be brief.", role="system"))
+
+    store.append(session_id, _messages("one", "two", "three"))
+
+    assert [m["content"] for m in store.get_history(session_id)] == ["Be brief.", "two", "three"]
+    assert store.stats()["trimmed_messages"] == 1
+
+
+def test_unknown_and_deleted_sessions_raise(make_store):
+    store = make_store()
+    session_id = store.create_session()
+
+    assert store.delete(session_id)
+    assert not store.delete(session_id)
+    with pytest.raises(SessionNotFoundError):
+        store.get_history(session_id)
+    with pytest.raises(SessionNotFoundError):
+        store.append("missing", _messages("hi"))
+
+
+def test_sessions_expire_after_ttl(make_store):
+    store = make_store(ttl_seconds=0.05)
+    session_id = store.create_session(_messages("hi"))
+    time.sleep(0.1)
+
+    with pytest.raises(SessionNotFoundError):
+        store.get_history(session_id)
+
+
+def test_least_recently_used_session_is_evicted(make_store):
+    store = make_store(max_sessions=2)
+    first = store.create_session()
+    second = store.create_session()
+    store.get_history(first)
+    time.sleep(0.01)
+    store.create_session()
+
+    assert store.count_sessions() == 2
+    store.get_history(first)
+    with pytest.raises(SessionNotFoundError):
+        store.get_history(second)
+    assert store.stats()["lru_evictions"] == 1
+
+
+def test_state_is_kept_with_the_session(make_store):
+    store = make_store()
+    session_id = store.create_session()
+
+    store.set_state(session_id, {"summary": "earlier talk", "summarized_count": 4})
+    store.set_state("missing", {"summary": "ignored"})
+
+    assert store.get_state(session_id) == {"summary": "earlier talk", "summarized_count": 4}
+    assert store.get_state("missing") == {}
+
+
+def test_sqlite_sessions_are_shared_between_store_instances(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    session_id = SQLiteSessionStore(db_path=path).create_session(_messages("hi"))
+
+    assert SQLiteSessionStore(db_path=path).get_history(session_id) == _messages("hi")
+
+
+def test_session_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+
+def test_get_session_store_reads_the_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv("SESSION_STORE", "sqlite")
+    monkeypatch.setenv("SESSION_DB_PATH", str(tmp_path / "sessions.db"))
+    monkeypatch.setenv("SESSION_MAX_MESSAGES", "7")
+
+    store = get_session_store()
+
+    assert isinstance(store, SQLiteSessionStore) and store.max_messages == 7
+    monkeypatch.setenv("SESSION_STORE", "redis")
+    with pytest.raises(ValueError):
+        get_session_store()
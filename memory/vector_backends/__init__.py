@@ -0,0 +1,43 @@
+"""Pluggable vector storage for VectorDBManager.
+
+``get_vector_backend()`` returns a process-wide backend chosen by name or by the
+VECTOR_BACKEND environment variable ('pinecone' or 'faiss'). Backend modules are
+imported on first use, so only the selected backend's dependencies are needed.
+"""
+
+import os
+import threading
+from typing import Dict, Optional
+
+from memory.vector_backends.base import BackendVectorStore, TEXT_KEY, VectorBackend, document_record
+
+SUPPORTED_BACKENDS = ("pinecone", "faiss")
+
+_backends: Dict[str, VectorBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_vector_backend(name: Optional[str] = None) -> VectorBackend:
+    """Return the shared backend instance for ``name`` (default: VECTOR_BACKEND or 'pinecone').
+
+    Raises:
+        ValueError: If the backend is not supported or cannot be initialized
+    """
+    name = (name or os.getenv("VECTOR_BACKEND", "pinecone")).lower()
+    if name not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Unsupported vector backend: {name}. Supported backends: {', '.join(SUPPORTED_BACKENDS)}")
+
+    with _backends_lock:
+        backend = _backends.get(name)
+        if backend is None:
+            if name == "faiss":
+                from memory.vector_backends.faiss_backend import FaissBackend
+                backend = FaissBackend()
+            else:
+                from memory.vector_backends.pinecone_backend import PineconeBackend
+                backend = PineconeBackend()
+            _backends[name] = backend
+        return backend
+
+
+__all__ = ['VectorBackend', 'BackendVectorStore', 'TEXT_KEY', 'document_record', 'SUPPORTED_BACKENDS', 'get_vector_backend']
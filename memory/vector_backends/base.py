@@ -0,0 +1,143 @@
+"""Backend interface used by VectorDBManager, plus a LangChain vector store on top of it."""
+
+import hashlib
+import json
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from langchain.schema.document import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+# Metadata key holding the document text (the PineconeVectorStore convention)
+TEXT_KEY = "text"
+
+# (id, vector, metadata including TEXT_KEY)
+VectorItem = Tuple[str, List[float], Dict[str, Any]]
+
+# Runs the per-vector searches of backends without a native batch query
+_search_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="vector-search")
+
+
+def document_record(doc: Union[Document, Dict[str, Any]]) -> Tuple[str, str, Dict[str, Any]]:
+    """Return (id, text, metadata) for a Document or a dict with 'page_content'/'text'.
+
+    Documents without an explicit id get one derived from their content and metadata,
+    so re-sending a batch overwrites vectors instead of duplicating them.
+    """
+    if isinstance(doc, Document):
+        text, metadata, doc_id = doc.page_content, dict(doc.metadata or {}), None
+    else:
+        text = doc.get('page_content', doc.get('text', ''))
+        metadata = dict(doc.get('metadata') or {})
+        doc_id = doc.get('id')
+    if not doc_id:
+        fingerprint = json.dumps([text, metadata], sort_keys=True, default=str)
+        doc_id = hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+    return str(doc_id), text, metadata
+
+
+class VectorBackend(ABC):
+    """Storage and nearest-neighbour search for one family of vector indexes."""
+
+    name: str = "base"
+
+    @abstractmethod
+    def ensure_index(self, index_name: str, dimension: int) -> bool:
+        """Create the index if needed. Returns True if it was created."""
+
+    @abstractmethod
+    def delete_index(self, index_name: str) -> bool:
+        """Delete the index. Returns False if it did not exist."""
+
+    @abstractmethod
+    def upsert(self, index_name: str, items: List[VectorItem], namespace: str = "") -> None:
+        """Insert or overwrite vectors by id."""
+
+    @abstractmethod
+    def search(self, index_name: str, vector: List[float], k: int = 4,
+               namespace: str = "") -> List[Tuple[Document, float]]:
+        """Return the ``k`` most similar documents with their cosine similarity."""
+
+    def search_many(self, index_name: str, vectors: List[List[float]], k: int = 4,
+                    namespace: str = "") -> List[List[Tuple[Document, float]]]:
+        """Search several vectors at once; one result list per vector, in order.
+
+        The default issues the searches concurrently. Backends that can search a batch of
+        vectors in one call override this.
+        """
+        return list(_search_executor.map(lambda vector: self.search(index_name, vector, k, namespace), vectors))
+
+    def get_vector_store(self, index_name: str, embeddings: Embeddings, namespace: str = "") -> VectorStore:
+        """Return a LangChain vector store for the index (used for retrievers)."""
+        return BackendVectorStore(self, index_name, embeddings, namespace)
+
+    def persist(self) -> None:
+        """Flush pending writes to durable storage (no-op for remote backends)."""
+
+
+class BackendVectorStore(VectorStore):
+    """LangChain VectorStore adapter that embeds with ``embeddings`` and stores in a VectorBackend."""
+
+    def __init__(self, backend: VectorBackend, index_name: str, embeddings: Embeddings, namespace: str = ""):
+        self.backend = backend
+        self.index_name = index_name
+        self._embeddings = embeddings
+        self.namespace = namespace
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embeddings
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        return self._upsert(texts, self._embeddings.embed_documents(texts), metadatas, ids,
+                            kwargs.get("namespace", self.namespace))
+
+    def _upsert(self, texts: List[str], vectors: List[List[float]], metadatas: Optional[List[dict]],
+                ids: Optional[List[str]], namespace: str) -> List[str]:
+        metadatas = metadatas or [{} for _ in texts]
+        ids = list(ids) if ids else [
+            document_record({"page_content": text, "metadata": metadata})[0] for text, metadata in zip(texts, metadatas)
+        ]
+        self.backend.upsert(
+            self.index_name,
+            [(doc_id, vector, {**metadata, TEXT_KEY: text})
+             for doc_id, vector, text, metadata in zip(ids, vectors, texts, metadatas)],
+            namespace=namespace
+        )
+        return ids
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        vector = self._embeddings.embed_query(query)
+        return self.backend.search(self.index_name, vector, k=k, namespace=kwargs.get("namespace", self.namespace))
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are already cosine similarities
+        return lambda score: score
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   backend: Optional[VectorBackend] = None, index_name: Optional[str] = None,
+                   namespace: str = "", ids: Optional[List[str]] = None, **kwargs: Any) -> "BackendVectorStore":
+        """Embed ``texts`` into ``index_name`` on ``backend`` and return a store for that index.
+
+        The index is created with the dimension of the embeddings if it does not exist.
+
+        Raises:
+            ValueError: If ``backend`` or ``index_name`` is missing.
+        """
+        if backend is None or not index_name:
+            raise ValueError("BackendVectorStore.from_texts needs the backend and index_name keyword arguments")
+        store = cls(backend, index_name, embedding, namespace)
+        texts = list(texts)
+        if texts:
+            vectors = embedding.embed_documents(texts)
+            backend.ensure_index(index_name, len(vectors[0]))
+            store._upsert(texts, vectors, metadatas, ids, namespace)
+        return store
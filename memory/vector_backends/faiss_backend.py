@@ -0,0 +1,407 @@
+"""Local FAISS vector backend.
+
+Each (index, namespace) pair is its own FAISS index file under ``FAISS_INDEX_DIR``;
+ids, texts and metadata live in a SQLite file next to them. Saved indexes are opened
+memory-mapped, so a process starts serving without reading every vector into RAM,
+and they are loaded fully only when new vectors are added.
+
+Each namespace has its own readers-writer lock: searches of a namespace run
+concurrently, and only an upsert to that namespace makes them wait.
+
+Index types (``FAISS_INDEX_TYPE``):
+    flat  exact inner-product search; best up to ~100k vectors per namespace.
+    hnsw  graph ANN search; fast, no training, higher memory.
+    ivf   inverted lists; exact search until ``FAISS_IVF_TRAIN_SIZE`` vectors exist,
+          then trained and switched over automatically.
+"""
+
+import atexit
+import contextlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+import faiss
+import numpy as np
+from langchain.schema.document import Document
+
+from memory.vector_backends.base import TEXT_KEY, VectorBackend, VectorItem
+
+INDEX_TYPES = ("flat", "hnsw", "ivf")
+
+# Ids per metadata query, below SQLite's bound-parameter limit
+_SQL_BATCH = 900
+
+
+class _ReadWriteLock:
+    """Many readers or one writer. Waiting writers hold back new readers so they are not starved."""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextlib.contextmanager
+    def read(self) -> Iterator[None]:
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def write(self) -> Iterator[None]:
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class _Namespace:
+    """One FAISS index plus its dirty/mmap state."""
+
+    def __init__(self, index, path: str, mmapped: bool):
+        self.index = index
+        self.path = path
+        self.mmapped = mmapped
+        self.dirty = False
+        self.tombstones = 0
+
+
+class FaissBackend(VectorBackend):
+    """Stores vectors in local FAISS indexes using cosine similarity."""
+
+    name = "faiss"
+
+    def __init__(self, base_dir: Optional[str] = None, index_type: Optional[str] = None,
+                 hnsw_m: Optional[int] = None, ef_search: Optional[int] = None,
+                 nlist: Optional[int] = None, nprobe: Optional[int] = None,
+                 ivf_train_size: Optional[int] = None):
+        """Initialize the backend; unset options come from environment variables.
+
+        Args:
+            base_dir: Directory holding one sub-directory per index (FAISS_INDEX_DIR).
+            index_type: 'flat', 'hnsw' or 'ivf' (FAISS_INDEX_TYPE).
+            hnsw_m: HNSW graph degree (FAISS_HNSW_M).
+            ef_search: HNSW search breadth (FAISS_HNSW_EF_SEARCH).
+            nlist: IVF cluster count (FAISS_IVF_NLIST).
+            nprobe: IVF clusters visited per search (FAISS_IVF_NPROBE).
+            ivf_train_size: Vectors needed before an IVF index is trained (FAISS_IVF_TRAIN_SIZE).
+
+        Raises:
+            ValueError: If the index type is not supported.
+        """
+        self.base_dir = base_dir or os.getenv("FAISS_INDEX_DIR", "faiss_index")
+        self.index_type = (index_type or os.getenv("FAISS_INDEX_TYPE", "flat")).lower()
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unsupported FAISS index type: {self.index_type}. Supported types: {', '.join(INDEX_TYPES)}")
+        self.hnsw_m = hnsw_m or int(os.getenv("FAISS_HNSW_M", "32"))
+        self.ef_search = ef_search or int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))
+        self.nlist = nlist or int(os.getenv("FAISS_IVF_NLIST", "256"))
+        self.nprobe = nprobe or int(os.getenv("FAISS_IVF_NPROBE", "8"))
+        self.ivf_train_size = ivf_train_size or int(os.getenv("FAISS_IVF_TRAIN_SIZE", str(self.nlist * 39)))
+        # Guards the dicts below and namespace loading; held only briefly. Lock order:
+        # a namespace lock, then an index transaction lock, then this one.
+        self._lock = threading.RLock()
+        self._namespace_locks: Dict[Tuple[str, str], _ReadWriteLock] = {}
+        # Namespaces of one index share a SQLite connection, so their transactions take turns
+        self._transaction_locks: Dict[str, threading.Lock] = {}
+        # One persist at a time, so two callers never write the same temporary file
+        self._persist_lock = threading.Lock()
+        self._namespaces: Dict[Tuple[str, str], _Namespace] = {}
+        self._dimensions: Dict[str, int] = {}
+        self._conns: Dict[str, sqlite3.Connection] = {}
+        atexit.register(self.persist)
+
+    # -- storage helpers --------------------------------------------------
+
+    def _index_dir(self, index_name: str) -> str:
+        return os.path.join(self.base_dir, quote(index_name, safe=""))
+
+    def _namespace_lock(self, index_name: str, namespace: str) -> _ReadWriteLock:
+        with self._lock:
+            return self._namespace_locks.setdefault((index_name, namespace), _ReadWriteLock())
+
+    def _transaction_lock(self, index_name: str) -> threading.Lock:
+        with self._lock:
+            return self._transaction_locks.setdefault(index_name, threading.Lock())
+
+    def _conn(self, index_name: str) -> sqlite3.Connection:
+        with self._lock:
+            return self._open_conn(index_name)
+
+    def _open_conn(self, index_name: str) -> sqlite3.Connection:
+        conn = self._conns.get(index_name)
+        if conn is None:
+            os.makedirs(self._index_dir(index_name), exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self._index_dir(index_name), "metadata.db"),
+                                   check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS vectors ("
+                " namespace TEXT NOT NULL, doc_id TEXT NOT NULL, vector_id INTEGER NOT NULL,"
+                " text TEXT NOT NULL, metadata TEXT NOT NULL, PRIMARY KEY (namespace, doc_id))"
+            )
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS vectors_by_id ON vectors (namespace, vector_id)")
+            self._conns[index_name] = conn
+        return conn
+
+    def _dimension(self, index_name: str) -> Optional[int]:
+        with self._lock:
+            return self._load_dimension(index_name)
+
+    def _load_dimension(self, index_name: str) -> Optional[int]:
+        if index_name not in self._dimensions:
+            row = self._conn(index_name).execute("SELECT value FROM settings WHERE key = 'dimension'").fetchone()
+            if row is None:
+                return None
+            self._dimensions[index_name] = int(row[0])
+        return self._dimensions[index_name]
+
+    def _new_index(self, dimension: int, index_type: str):
+        if index_type == "hnsw":
+            inner = faiss.IndexHNSWFlat(dimension, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        elif index_type == "ivf":
+            inner = faiss.IndexIVFFlat(faiss.IndexFlatIP(dimension), dimension, self.nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            inner = faiss.IndexFlatIP(dimension)
+        return faiss.IndexIDMap2(inner)
+
+    def _namespace(self, index_name: str, namespace: str, writable: bool = False) -> Optional[_Namespace]:
+        """Return the namespace's index, loading it (memory-mapped unless ``writable``).
+
+        Callers hold the namespace's lock: the write side when ``writable``.
+        """
+        with self._lock:
+            return self._load_namespace(index_name, namespace, writable)
+
+    def _load_namespace(self, index_name: str, namespace: str, writable: bool) -> Optional[_Namespace]:
+        key = (index_name, namespace)
+        entry = self._namespaces.get(key)
+        if entry is not None and not (writable and entry.mmapped):
+            return entry
+
+        path = os.path.join(self._index_dir(index_name), f"{quote(namespace, safe='') or '_default'}.faiss")
+        if os.path.exists(path):
+            if writable:
+                index = faiss.read_index(path)
+            else:
+                try:
+                    index = faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+                except RuntimeError:
+                    # Not every index type supports mmap; fall back to a normal load
+                    index, writable = faiss.read_index(path), True
+            entry = _Namespace(index, path, mmapped=not writable)
+            live = self._conn(index_name).execute(
+                "SELECT COUNT(*) FROM vectors WHERE namespace = ?", (namespace,)).fetchone()[0]
+            entry.tombstones = max(0, index.ntotal - live)
+        elif writable:
+            dimension = self._dimension(index_name)
+            if dimension is None:
+                raise ValueError(f"FAISS index {index_name} does not exist; call ensure_index() first")
+            # IVF starts exact and is trained once enough vectors exist
+            entry = _Namespace(self._new_index(dimension, "flat" if self.index_type == "ivf" else self.index_type),
+                               path, mmapped=False)
+        else:
+            return None
+        self._configure(entry.index)
+        self._namespaces[key] = entry
+        return entry
+
+    def _configure(self, index) -> None:
+        inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap2) else index
+        if isinstance(inner, faiss.IndexHNSW):
+            inner.hnsw.efSearch = self.ef_search
+        elif isinstance(inner, faiss.IndexIVF):
+            inner.nprobe = self.nprobe
+
+    def _maybe_train_ivf(self, entry: _Namespace) -> None:
+        """Move an IVF namespace from its exact bootstrap index to a trained IVF index."""
+        inner = faiss.downcast_index(entry.index.index)
+        if self.index_type != "ivf" or isinstance(inner, faiss.IndexIVF) or entry.index.ntotal < self.ivf_train_size:
+            return
+        ids = faiss.vector_to_array(entry.index.id_map).astype("int64")
+        vectors = inner.reconstruct_n(0, inner.ntotal)
+        index = self._new_index(inner.d, "ivf")
+        faiss.downcast_index(index.index).train(vectors)
+        index.add_with_ids(vectors, ids)
+        self._configure(index)
+        entry.index = index
+        print(f"Trained FAISS IVF index on {len(ids)} vectors ({self.nlist} lists)")
+
+    @staticmethod
+    def _as_matrix(vectors: List[List[float]]) -> np.ndarray:
+        matrix = np.ascontiguousarray(np.asarray(vectors, dtype="float32"))
+        faiss.normalize_L2(matrix)
+        return matrix
+
+    # -- VectorBackend ----------------------------------------------------
+
+    def ensure_index(self, index_name: str, dimension: int) -> bool:
+        with self._lock:
+            existing = self._dimension(index_name)
+            if existing is not None:
+                if existing != dimension:
+                    raise ValueError(f"FAISS index {index_name} has dimension {existing}, not {dimension}")
+                return False
+            self._conn(index_name).execute(
+                "INSERT INTO settings (key, value) VALUES ('dimension', ?)", (str(dimension),))
+            self._dimensions[index_name] = dimension
+            return True
+
+    def delete_index(self, index_name: str) -> bool:
+        with self._lock:
+            locks = [lock for key, lock in self._namespace_locks.items() if key[0] == index_name]
+        with contextlib.ExitStack() as stack:
+            # Wait for searches and upserts of the index to finish
+            for lock in locks:
+                stack.enter_context(lock.write())
+            stack.enter_context(self._transaction_lock(index_name))
+            with self._lock:
+                index_dir = self._index_dir(index_name)
+                if not os.path.isdir(index_dir):
+                    return False
+                conn = self._conns.pop(index_name, None)
+                if conn is not None:
+                    conn.close()
+                self._dimensions.pop(index_name, None)
+                for key in [key for key in self._namespaces if key[0] == index_name]:
+                    del self._namespaces[key]
+                shutil.rmtree(index_dir)
+                return True
+
+    def upsert(self, index_name: str, items: List[VectorItem], namespace: str = "") -> None:
+        if not items:
+            return
+        with self._namespace_lock(index_name, namespace).write():
+            entry = self._namespace(index_name, namespace, writable=True)
+            matrix = self._as_matrix([vector for _, vector, _ in items])
+            if matrix.ndim != 2 or matrix.shape[1] != entry.index.d:
+                raise ValueError(f"FAISS index {index_name} has dimension {entry.index.d}, not {matrix.shape[-1]}")
+            conn = self._conn(index_name)
+            doc_ids = [doc_id for doc_id, _, _ in items]
+
+            replaced = []
+            for start in range(0, len(doc_ids), 500):
+                chunk = doc_ids[start:start + 500]
+                replaced += [row[0] for row in conn.execute(
+                    f"SELECT vector_id FROM vectors WHERE namespace = ? AND doc_id IN ({','.join('?' * len(chunk))})",
+                    [namespace] + chunk)]
+
+            row = conn.execute("SELECT MAX(vector_id) FROM vectors WHERE namespace = ?", (namespace,)).fetchone()
+            first_id = (row[0] + 1) if row[0] is not None else 0
+            vector_ids = np.arange(first_id, first_id + len(items), dtype="int64")
+            with self._transaction_lock(index_name):
+                conn.execute("BEGIN")
+                try:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO vectors (namespace, doc_id, vector_id, text, metadata) VALUES (?, ?, ?, ?, ?)",
+                        [(namespace, doc_id, int(vector_id), metadata.get(TEXT_KEY, ""),
+                          json.dumps({k: v for k, v in metadata.items() if k != TEXT_KEY}, default=str))
+                         for (doc_id, _, metadata), vector_id in zip(items, vector_ids)])
+                    # Vectors go in last, so a failed add rolls the metadata back with it
+                    entry.index.add_with_ids(matrix, vector_ids)
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+                conn.execute("COMMIT")
+            entry.dirty = True
+
+            # Overwritten documents got a fresh vector id; old vectors are removed
+            # where the index supports it, otherwise skipped at search time
+            if replaced:
+                try:
+                    entry.index.remove_ids(np.asarray(replaced, dtype="int64"))
+                except RuntimeError:
+                    entry.tombstones += len(replaced)
+            self._maybe_train_ivf(entry)
+
+    def search(self, index_name: str, vector: List[float], k: int = 4,
+               namespace: str = "") -> List[Tuple[Document, float]]:
+        return self.search_many(index_name, [vector], k, namespace)[0]
+
+    def search_many(self, index_name: str, vectors: List[List[float]], k: int = 4,
+                    namespace: str = "") -> List[List[Tuple[Document, float]]]:
+        """Search all vectors with one FAISS call and one metadata read per chunk of ids."""
+        if not vectors:
+            return []
+        with self._namespace_lock(index_name, namespace).read():
+            entry = self._namespace(index_name, namespace)
+            if entry is None or entry.index.ntotal == 0:
+                return [[] for _ in vectors]
+            # Over-fetch when stale vectors may occupy some of the top slots
+            fetch = min(k + entry.tombstones, entry.index.ntotal)
+            scores, ids = entry.index.search(self._as_matrix(vectors), fetch)
+            hits = [
+                [(int(vector_id), float(score)) for vector_id, score in zip(ids[row], scores[row]) if vector_id >= 0]
+                for row in range(len(vectors))
+            ]
+            wanted = sorted({vector_id for row_hits in hits for vector_id, _ in row_hits})
+            rows = {}
+            for start in range(0, len(wanted), _SQL_BATCH):
+                chunk = wanted[start:start + _SQL_BATCH]
+                rows.update(
+                    (row[0], row[1:]) for row in self._conn(index_name).execute(
+                        f"SELECT vector_id, text, metadata FROM vectors WHERE namespace = ? AND vector_id IN ({','.join('?' * len(chunk))})",
+                        [namespace] + chunk))
+        results = []
+        for row_hits in hits:
+            documents = []
+            for vector_id, score in row_hits:
+                if vector_id in rows:
+                    text, metadata = rows[vector_id]
+                    documents.append((Document(page_content=text, metadata=json.loads(metadata)), score))
+                    if len(documents) == k:
+                        break
+            results.append(documents)
+        return results
+
+    def persist(self) -> None:
+        """Write every modified namespace index to disk."""
+        with self._persist_lock:
+            self._persist()
+
+    def _persist(self) -> None:
+        with self._lock:
+            keys = [key for key, entry in self._namespaces.items() if entry.dirty]
+        for key in keys:
+            # Writing only reads the index, so searches carry on meanwhile
+            with self._namespace_lock(*key).read():
+                entry = self._namespaces.get(key)
+                if entry is not None and entry.dirty:
+                    tmp_path = f"{entry.path}.tmp"
+                    faiss.write_index(entry.index, tmp_path)
+                    os.replace(tmp_path, entry.path)
+                    entry.dirty = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Return vector counts for every loaded namespace."""
+        with self._lock:
+            return {
+                "index_type": self.index_type,
+                "namespaces": {
+                    f"{index_name}/{namespace}": {"vectors": entry.index.ntotal, "mmapped": entry.mmapped}
+                    for (index_name, namespace), entry in self._namespaces.items()
+                }
+            }
@@ -0,0 +1,72 @@
+"""Pinecone (hosted) vector backend."""
+
+import os
+from typing import List, Tuple
+
+import pinecone
+from langchain.schema.document import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from langchain_pinecone import PineconeVectorStore
+
+from memory.vector_backends.base import TEXT_KEY, VectorBackend, VectorItem
+
+# Pinecone accepts at most this many vectors per upsert request
+UPSERT_CHUNK_SIZE = 100
+
+
+class PineconeBackend(VectorBackend):
+    """Stores vectors in Pinecone indexes."""
+
+    name = "pinecone"
+
+    def __init__(self, api_key: str = None, environment: str = None):
+        """Initialize the Pinecone client.
+
+        Raises:
+            ValueError: If Pinecone API key is not set
+        """
+        api_key = api_key or os.environ.get('PINECONE_API_KEY') or os.environ.get('PINECODE_API_KEY')
+        environment = environment or os.environ.get('PINECONE_ENVIRONMENT') or os.environ.get('PINECODE_ENVIRONMENT', 'gcp-starter')
+        if not api_key:
+            raise ValueError("Pinecone API key not found. Please set PINECONE_API_KEY environment variable.")
+
+        pinecone.init(api_key=api_key, environment=environment)
+        self._indexes = {}
+
+    def _index(self, index_name: str):
+        index = self._indexes.get(index_name)
+        if index is None:
+            index = self._indexes[index_name] = pinecone.Index(index_name)
+        return index
+
+    def ensure_index(self, index_name: str, dimension: int) -> bool:
+        if index_name in pinecone.list_indexes():
+            return False
+        pinecone.create_index(name=index_name, dimension=dimension, metric="cosine")
+        return True
+
+    def delete_index(self, index_name: str) -> bool:
+        if index_name not in pinecone.list_indexes():
+            return False
+        pinecone.delete_index(index_name)
+        self._indexes.pop(index_name, None)
+        return True
+
+    def upsert(self, index_name: str, items: List[VectorItem], namespace: str = "") -> None:
+        index = self._index(index_name)
+        for start in range(0, len(items), UPSERT_CHUNK_SIZE):
+            index.upsert(vectors=items[start:start + UPSERT_CHUNK_SIZE], namespace=namespace)
+
+    def search(self, index_name: str, vector: List[float], k: int = 4,
+               namespace: str = "") -> List[Tuple[Document, float]]:
+        result = self._index(index_name).query(vector=vector, top_k=k, include_metadata=True, namespace=namespace)
+        documents = []
+        for match in result["matches"]:
+            metadata = dict(match.get("metadata") or {})
+            text = metadata.pop(TEXT_KEY, "")
+            documents.append((Document(page_content=text, metadata=metadata), match["score"]))
+        return documents
+
+    def get_vector_store(self, index_name: str, embeddings: Embeddings, namespace: str = "") -> VectorStore:
+        return PineconeVectorStore(index_name=index_name, embedding=embeddings, namespace=namespace)
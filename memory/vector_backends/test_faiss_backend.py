@@ -0,0 +1,89 @@
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from memory.vector_backends.base import TEXT_KEY, BackendVectorStore
+from memory.vector_backends.faiss_backend import FaissBackend
+
+
+class StubEmbeddings(Embeddings):
+    """Maps each known word to its own axis, so the nearest neighbour is predictable."""
+
+    WORDS = ["paris", "lyon", "tokyo", "osaka"]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [1.0 if word in text.lower() else 0.0 for word in self.WORDS]
+
+
+def _item(doc_id, word, **metadata):
+    return doc_id, StubEmbeddings().embed_query(word), {TEXT_KEY: f"About {word}", **metadata}
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = FaissBackend(base_dir=str(tmp_path), index_type="flat")
+    backend.ensure_index("places", 4)
+    return backend
+
+
+def _search(backend, word, k=1, namespace=""):
+    return [(doc.page_content, doc.metadata) for doc, _ in
+            backend.search("places", StubEmbeddings().embed_query(word), k=k, namespace=namespace)]
+
+
+def test_upsert_and_search(backend):
+    backend.upsert("places", [_item("1", "paris", country="FR"), _item("2", "tokyo", country="JP")])
+
+    assert _search(backend, "tokyo")[0][0] == "About tokyo"
+    assert _search(backend, "paris")[0][1]["country"] == "FR"
+
+
+def test_upsert_replaces_documents_by_id(backend):
+    backend.upsert("places", [_item("1", "paris")])
+    backend.upsert("places", [_item("1", "lyon")])
+
+    assert [text for text, _ in _search(backend, "paris", k=4)] == ["About lyon"]
+
+
+def test_failed_add_keeps_the_previous_documents(backend):
+    backend.upsert("places", [_item("1", "paris", version=1)])
+
+    with pytest.raises(ValueError):
+        backend.upsert("places", [("1", [1.0, 0.0], {TEXT_KEY: "About paris", "version": 2})])
+
+    assert _search(backend, "paris") == [("About paris", {"version": 1})]
+    backend.upsert("places", [_item("2", "tokyo")])
+    assert [text for text, _ in _search(backend, "paris", k=4)] == ["About paris", "About tokyo"]
+
+
+def test_namespaces_are_separate(backend):
+    backend.upsert("places", [_item("1", "paris")], namespace="europe")
+    backend.upsert("places", [_item("1", "tokyo")], namespace="asia")
+
+    assert _search(backend, "paris", namespace="europe")[0][0] == "About paris"
+    assert _search(backend, "paris", namespace="asia")[0][0] == "About tokyo"
+
+
+def test_persisted_index_is_reloaded(backend, tmp_path):
+    backend.upsert("places", [_item("1", "osaka")])
+    backend.persist()
+
+    reloaded = FaissBackend(base_dir=str(tmp_path), index_type="flat")
+    assert _search(reloaded, "osaka")[0][0] == "About osaka"
+
+
+def test_from_texts_creates_the_index(tmp_path):
+    backend = FaissBackend(base_dir=str(tmp_path), index_type="flat")
+
+    store = BackendVectorStore.from_texts(["About paris", "About tokyo"], StubEmbeddings(),
+                                          metadatas=[{"country": "FR"}, {"country": "JP"}],
+                                          backend=backend, index_name="cities")
+
+    assert store.similarity_search("tokyo", k=1)[0].metadata == {"country": "JP"}
+
+
+def test_from_texts_needs_a_backend_and_index():
+    with pytest.raises(ValueError):
+        BackendVectorStore.from_texts(["About paris"], StubEmbeddings())
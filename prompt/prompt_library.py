@@ -1,8 +1,18 @@
 from typing import Optional
-from langchain import hub
-from langchain.prompts import PromptTemplate
-from langchain_core.prompts import ChatPromptTemplate
-prompt = hub.pull("rlm/rag-prompt")
+from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+
+# Vendored copy of the "rlm/rag-prompt" LangChain Hub prompt. Pulling it from the hub
+# at import time made every worker start depend on a network round trip.
+RAG_PROMPT = (
+    "You are an assistant for question-answering tasks. Use the following pieces of retrieved context "
+    "to answer the question. If you don't know the answer, just say that you don't know. "
+    "Use three sentences maximum and keep the answer concise.\n"
+    "Question: {question} \n"
+    "Context: {context} \n"
+    "Answer:"
+)
+
+_rag_prompt: Optional[ChatPromptTemplate] = None
 
 class PromptLibrary:
     """A static class to provide the RAG prompt template for the Sales Maker application.
@@ -11,14 +21,16 @@ class PromptLibrary:
     """
     
     @staticmethod
-    def get_default_rag_prompt() -> str:
-        """Get the RAG prompt template as a string.
+    def get_default_rag_prompt() -> ChatPromptTemplate:
+        """Get the RAG prompt template.
         
         Returns:
-            The RAG prompt template as a string.
+            The RAG prompt as a ChatPromptTemplate with 'context' and 'question' inputs.
         """
-        # Return the RAG prompt template directly as a string
-        return prompt
+        global _rag_prompt
+        if _rag_prompt is None:
+            _rag_prompt = ChatPromptTemplate.from_messages([("human", RAG_PROMPT)])
+        return _rag_prompt
 
 
     @staticmethod
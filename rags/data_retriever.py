@@ -4,6 +4,13 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# List of supported providers
+SUPPORTED_PROVIDERS = {
+    "openai": "OpenAI embedding model (text-embedding-ada-002)",
+    "huggingface": "Hugging Face embedding models (sentence-transformers/all-mpnet-base-v2)",
+    "gemini": "Google Gemini embedding models (embedding-001)"
+}
+
 class DataRetriever:
     def __init__(self, provider_name):
         """
@@ -0,0 +1,93 @@
+"""Hybrid dense + BM25 retrieval with reciprocal-rank fusion.
+
+The dense (vector) search and the keyword (BM25) search run concurrently and their
+rankings are merged with reciprocal-rank fusion, so exact-term matches such as city
+names or product SKUs surface even when their embeddings rank them low. If the dense
+search does not answer within ``dense_timeout`` the keyword results are returned alone.
+"""
+
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.schema.document import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+
+# Shared pool for the dense leg; a timed-out search finishes in the background
+_dense_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("HYBRID_DENSE_WORKERS", "8")), thread_name_prefix="hybrid-dense")
+
+
+def _doc_key(doc: Document) -> str:
+    return hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int = 4, rrf_k: int = 60,
+                           weights: Optional[List[float]] = None) -> List[Document]:
+    """Merge ranked document lists; each document scores sum(weight / (rrf_k + rank)).
+
+    Documents are matched across lists by their content, and the fused score is stored
+    in ``metadata['rrf_score']``.
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc in enumerate(ranking, 1):
+            key = _doc_key(doc)
+            scores[key] = scores.get(key, 0.0) + weight / (rrf_k + rank)
+            documents.setdefault(key, doc)
+    fused = []
+    for key in sorted(scores, key=scores.get, reverse=True)[:k]:
+        doc = documents[key]
+        fused.append(Document(page_content=doc.page_content, metadata={**doc.metadata, "rrf_score": scores[key]}))
+    return fused
+
+
+class HybridRetriever(BaseRetriever):
+    """Retriever that fuses a vector store search with a KeywordIndex search."""
+
+    vector_store: Any
+    keyword_index: Any
+    index_name: str
+    namespace: str = ""
+    k: int = 4
+    fetch_k: Optional[int] = None
+    rrf_k: int = 60
+    dense_weight: float = 1.0
+    keyword_weight: float = 1.0
+    dense_timeout: float = 2.0
+
+    def search(self, query: str) -> Tuple[List[Document], Dict[str, Any]]:
+        """Run both searches and return (fused documents, timing info)."""
+        fetch_k = self.fetch_k or self.k * 2
+        started = time.perf_counter()
+        dense_future = _dense_executor.submit(self.vector_store.similarity_search, query, k=fetch_k)
+
+        # The keyword leg runs on the calling thread while the dense search is in flight
+        keyword_docs = [doc for doc, _ in self.keyword_index.search(self.index_name, query, k=fetch_k, namespace=self.namespace)]
+        keyword_seconds = time.perf_counter() - started
+
+        info = {"keyword_ms": round(keyword_seconds * 1000, 2), "dense_timed_out": False}
+        remaining = max(0.0, self.dense_timeout - keyword_seconds)
+        try:
+            dense_docs = dense_future.result(timeout=remaining)
+            info["dense_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        except FutureTimeoutError:
+            print(f"Dense search exceeded {self.dense_timeout}s; returning keyword results only")
+            info["dense_timed_out"] = True
+            return keyword_docs[:self.k], info
+        except Exception as e:
+            print(f"Dense search failed ({str(e)}); returning keyword results only")
+            info["dense_error"] = str(e)
+            return keyword_docs[:self.k], info
+
+        fused = reciprocal_rank_fusion(
+            [dense_docs, keyword_docs], k=self.k, rrf_k=self.rrf_k, weights=[self.dense_weight, self.keyword_weight])
+        return fused, info
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.search(query)[0]
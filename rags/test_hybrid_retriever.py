@@ -0,0 +1,35 @@
+from langchain.schema.document import Document
+
+from rags.hybrid_retriever import reciprocal_rank_fusion
+
+
+def _docs(*texts):
+    return [Document(page_content=text, metadata={"source": text}) for text in texts]
+
+
+def test_documents_in_both_rankings_rank_first():
+    dense = _docs("a", "b", "c")
+    keyword = _docs("c", "d", "e")
+
+    fused = reciprocal_rank_fusion([dense, keyword], k=4, rrf_k=60)
+
+    assert [doc.page_content for doc in fused] == ["c", "a", "b", "d"]
+    assert fused[0].metadata["rrf_score"] == 1 / 63 + 1 / 61
+    assert fused[0].metadata["source"] == "c"
+    # Ties keep the order documents were first seen in
+    assert fused[2].metadata["rrf_score"] == fused[3].metadata["rrf_score"]
+
+
+def test_weights_shift_the_order():
+    fused = reciprocal_rank_fusion([_docs("a"), _docs("b")], k=2, weights=[1.0, 2.0])
+
+    assert [doc.page_content for doc in fused] == ["b", "a"]
+
+
+def test_k_limits_the_result_and_inputs_are_not_modified():
+    dense = _docs("a", "b", "c")
+
+    fused = reciprocal_rank_fusion([dense], k=2)
+
+    assert len(fused) == 2
+    assert "rrf_score" not in dense[0].metadata
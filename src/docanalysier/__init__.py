@@ -0,0 +1,5 @@
+"""Document analysis: cached per-chunk summaries, entities and key facts, streamed as they complete."""
+
+from .document_analyser import DocumentAnalyser, get_analysis_cache
+
+__all__ = ['DocumentAnalyser', 'get_analysis_cache']
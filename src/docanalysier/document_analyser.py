@@ -0,0 +1,282 @@
+"""Incremental per-chunk document analysis with cached results.
+
+Each chunk of a document is sent to the configured LLM for a summary, named entities
+and key facts. Results are cached on disk by model and chunk content hash, so
+re-analysing a revised document only calls the LLM for the chunks that changed.
+Uncached chunks run with bounded concurrency; a rate-limit response pauses every worker using the same
+provider (honouring Retry-After) before the chunk is retried with backoff. Results
+stream back as they complete, cached ones first.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.prompts import ChatPromptTemplate
+
+from LLMs.llm_factory import LLMFactory
+from LLMs.llm_router import is_retryable_error
+from src.document_pipeline import DocumentPipeline, content_hash
+from utils.async_bridge import background_loop
+from utils.sqlite_cache import SQLiteCache
+
+# Bump when the prompt or result shape changes, so stale cached results are not reused
+ANALYSIS_VERSION = "1"
+
+ANALYSIS_CACHE_TTL = float(os.getenv("DOC_ANALYSIS_CACHE_TTL", str(90 * 24 * 3600)))
+
+EXTRACTION_PROMPT = """Analyse the document excerpt below and reply with only a JSON object of the form
+{{"summary": "one or two sentences", "entities": [{{"name": "...", "type": "person|organization|location|date|product|other"}}], "key_facts": ["..."]}}
+Use empty lists when there are no entities or facts. Do not add anything outside the JSON.
+
+Excerpt:
+{text}"""
+
+_extraction_template = ChatPromptTemplate.from_template(EXTRACTION_PROMPT)
+
+# Persistent cache, opened on first use so importing the module creates no files
+_analysis_cache = None
+_analysis_cache_lock = threading.Lock()
+
+
+def get_analysis_cache() -> SQLiteCache:
+    """Return the persistent per-chunk analysis cache, opening it on first use."""
+    global _analysis_cache
+    if _analysis_cache is None:
+        with _analysis_cache_lock:
+            if _analysis_cache is None:
+                _analysis_cache = SQLiteCache(os.getenv("DOC_ANALYSIS_CACHE_PATH", "doc_analysis_cache.db"), namespace="doc_analysis")
+    return _analysis_cache
+
+
+def model_identity(llm) -> Optional[str]:
+    """Name of the model behind a chat model (the provider models, for a router), if known."""
+    providers = getattr(llm, "providers", None)
+    if isinstance(providers, dict):
+        names = [model_identity(model) for model in providers.values()]
+        return "+".join(names) if names and all(names) else None
+    name = getattr(llm, "model_name", None) or getattr(llm, "model", None)
+    return name if isinstance(name, str) and name else None
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Whether an error is a provider rate limit (HTTP 429 or a rate-limit error type)."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or any(name in type(error).__name__ for name in ("RateLimit", "ResourceExhausted"))
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds requested by a Retry-After header on the error's response, if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimitGate:
+    """Pause shared by every request to one provider after it reports a rate limit."""
+
+    def __init__(self):
+        self._resume_at = 0.0
+
+    def pause(self, seconds: float) -> None:
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    async def wait(self) -> None:
+        delay = self._resume_at - time.monotonic()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self._resume_at - time.monotonic()
+
+
+# One gate per provider: rate limits apply to the API key, not to one analysis run
+_rate_limit_gates: Dict[str, RateLimitGate] = {}
+
+
+def parse_analysis(text: str) -> Dict[str, Any]:
+    """Parse the model's JSON reply, tolerating code fences and surrounding prose.
+
+    Raises:
+        ValueError: If no JSON object can be read from the reply
+    """
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if match is None:
+        raise ValueError("Model reply contains no JSON object")
+    data = json.loads(match.group(0))
+    if not isinstance(data, dict):
+        raise ValueError("Model reply is not a JSON object")
+    return {
+        "summary": str(data.get("summary", "")),
+        "entities": [entity for entity in data.get("entities") or [] if isinstance(entity, dict) and entity.get("name")],
+        "key_facts": [str(fact) for fact in data.get("key_facts") or []]
+    }
+
+
+class DocumentAnalyser:
+    """Extracts summaries, entities and key facts from every chunk of a document."""
+
+    def __init__(self, llm_provider: str = "openai", llm=None, pipeline: Optional[DocumentPipeline] = None,
+                 cache: Optional[SQLiteCache] = None, max_concurrency: int = 4, max_retries: int = 4,
+                 retry_backoff: float = 1.0, cache_namespace: Optional[str] = None):
+        """Initialize the analyser.
+
+        Args:
+            llm_provider: LLMFactory provider used when ``llm`` is not given; also part of
+                the cache key and the rate-limit gate.
+            llm: Chat model to analyse with (default: the pooled model for ``llm_provider``).
+            pipeline: DocumentPipeline used to chunk files (default settings if omitted).
+            cache: Result cache (default: the shared SQLite cache at DOC_ANALYSIS_CACHE_PATH).
+            max_concurrency: LLM calls running at the same time.
+            max_retries: Attempts per chunk for rate limits and other transient errors.
+            retry_backoff: Initial retry delay in seconds, doubled after every failure.
+            cache_namespace: Part of the cache key that identifies the model (default: the
+                model's name). Required when ``llm`` is given and its model name cannot be read.
+        
+        Raises:
+            ValueError: If a limit is below 1, or no cache namespace can be determined for ``llm``.
+        """
+        if max_concurrency < 1 or max_retries < 1:
+            raise ValueError("max_concurrency and max_retries must be at least 1")
+        self.llm_provider = llm_provider
+        self.cache_namespace = cache_namespace or model_identity(llm)
+        if llm is not None and self.cache_namespace is None:
+            raise ValueError("Cannot read the model name of 'llm'; pass cache_namespace so its cached results "
+                             "are not mixed with another model's")
+        self.llm = llm if llm is not None else LLMFactory.get_pooled_llm(llm_provider, temperature=0.0)
+        if self.cache_namespace is None:
+            # Factory providers pin their model, so the provider name identifies it
+            self.cache_namespace = model_identity(self.llm) or llm_provider
+        self.pipeline = pipeline or DocumentPipeline()
+        self.cache = cache if cache is not None else get_analysis_cache()
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.gate = _rate_limit_gates.setdefault(llm_provider, RateLimitGate())
+
+    def cache_key(self, chunk_hash: str) -> str:
+        """Cache key of a chunk: its content hash, the provider, the model and the analysis version."""
+        key = f"{ANALYSIS_VERSION}:{self.llm_provider}:{self.cache_namespace}:{chunk_hash}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    async def _analyse_chunk(self, text: str, stats: Dict[str, int]) -> Dict[str, Any]:
+        delay = self.retry_backoff
+        for attempt in range(1, self.max_retries + 1):
+            await self.gate.wait()
+            try:
+                response = await self.llm.ainvoke(_extraction_template.format_messages(text=text))
+                return parse_analysis(str(response.content))
+            except Exception as e:
+                rate_limited = is_rate_limit_error(e)
+                if attempt == self.max_retries or not (rate_limited or is_retryable_error(e)):
+                    raise
+                stats["retries"] += 1
+                wait = retry_after(e) or delay * (1 + random.random())
+                if rate_limited:
+                    stats["rate_limited"] += 1
+                    # Hold back every worker on this provider, not just this one
+                    self.gate.pause(wait)
+                print(f"Chunk analysis failed (attempt {attempt}/{self.max_retries}): {str(e)}; retrying in {wait:.1f}s")
+                await asyncio.sleep(wait)
+                delay *= 2
+
+    async def aanalyse_chunks(self, chunks: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """Analyse chunks and yield events as results become available.
+
+        Yields:
+            {'type': 'chunk', 'index', 'chunk_hash', 'metadata', 'result', 'cached'} per chunk
+            (cached chunks first, then the rest in completion order),
+            {'type': 'error', 'index', 'chunk_hash', 'metadata', 'error'} for a chunk that
+            still failed after retries, and finally {'type': 'done', 'stats'}
+        """
+        started = time.perf_counter()
+        stats = {"chunks": len(chunks), "cached": 0, "analysed": 0, "failed": 0, "retries": 0, "rate_limited": 0}
+        pending = []
+        for index, chunk in enumerate(chunks):
+            chunk_hash = content_hash(chunk["page_content"])
+            event = {"index": index, "chunk_hash": chunk_hash, "metadata": chunk.get("metadata", {})}
+            # SQLite is blocking; keep it off the shared event loop
+            result = await asyncio.to_thread(self.cache.get, self.cache_key(chunk_hash))
+            if result is not None:
+                stats["cached"] += 1
+                yield {"type": "chunk", **event, "result": result, "cached": True}
+            else:
+                pending.append((event, chunk["page_content"]))
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(event: Dict[str, Any], text: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    result = await self._analyse_chunk(text, stats)
+                except Exception as e:
+                    return {"type": "error", **event, "error": str(e)}
+            await asyncio.to_thread(self.cache.set, self.cache_key(event["chunk_hash"]), result, ANALYSIS_CACHE_TTL)
+            return {"type": "chunk", **event, "result": result, "cached": False}
+
+        tasks = [asyncio.ensure_future(run(event, text)) for event, text in pending]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                event = await next_done
+                stats["analysed" if event["type"] == "chunk" else "failed"] += 1
+                yield event
+        finally:
+            # The consumer stopped early: do not keep calling the LLM for nobody
+            for task in tasks:
+                task.cancel()
+
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        yield {"type": "done", "stats": stats}
+
+    async def aanalyse(self, path: str) -> AsyncIterator[Dict[str, Any]]:
+        """Chunk a PDF or text file and stream its analysis; see aanalyse_chunks()."""
+        loop = asyncio.get_running_loop()
+        chunks = await loop.run_in_executor(None, lambda: list(self.pipeline.iter_chunks([path])))
+        async for event in self.aanalyse_chunks(chunks):
+            yield event
+
+    def iter_analysis(self, path: str) -> Iterator[Dict[str, Any]]:
+        """Synchronous version of aanalyse(), for streaming from sync code (e.g. Flask)."""
+        return background_loop.iterate(self.aanalyse(path))
+
+    def analyse(self, path: str) -> Dict[str, Any]:
+        """Analyse a document and return the combined report.
+
+        Returns:
+            Dict with per-chunk results in document order, entities merged across chunks
+            with their mention counts, all key facts, failed chunks and run stats
+        """
+        chunks: List[Dict[str, Any]] = []
+        errors: List[Dict[str, Any]] = []
+        stats: Dict[str, Any] = {}
+        for event in self.iter_analysis(path):
+            if event["type"] == "chunk":
+                chunks.append(event)
+            elif event["type"] == "error":
+                errors.append(event)
+            else:
+                stats = event["stats"]
+        chunks.sort(key=lambda event: event["index"])
+
+        entities: Dict[tuple, Dict[str, Any]] = {}
+        for event in chunks:
+            for entity in event["result"]["entities"]:
+                key = (str(entity["name"]).strip().lower(), entity.get("type", "other"))
+                merged = entities.setdefault(key, {"name": entity["name"], "type": key[1], "mentions": 0})
+                merged["mentions"] += 1
+        return {
+            "chunks": [
+                {"index": event["index"], "metadata": event["metadata"], "cached": event["cached"], **event["result"]}
+                for event in chunks
+            ],
+            "entities": sorted(entities.values(), key=lambda entity: entity["mentions"], reverse=True),
+            "key_facts": [fact for event in chunks for fact in event["result"]["key_facts"]],
+            "errors": [{"index": event["index"], "metadata": event["metadata"], "error": event["error"]} for event in errors],
+            "stats": stats
+        }
@@ -0,0 +1,124 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.docanalysier.document_analyser import DocumentAnalyser, model_identity, parse_analysis
+from utils.sqlite_cache import SQLiteCache
+
+
+class RateLimitError(Exception):
+    def __init__(self, retry_after):
+        super().__init__("429 Too Many Requests")
+        self.response = SimpleNamespace(status_code=429, headers={"retry-after": str(retry_after)})
+
+
+class StubLLM:
+    """Replies with an analysis naming the excerpt; ``errors`` are raised first, in order."""
+
+    def __init__(self, model_name="stub-model", errors=(), fail_on=None):
+        self.model_name = model_name
+        self.errors = list(errors)
+        self.fail_on = fail_on
+        self.excerpts = []
+
+    async def ainvoke(self, messages):
+        excerpt = messages[0].content.rsplit("Excerpt:\n", 1)[1]
+        self.excerpts.append(excerpt)
+        if self.errors:
+            raise self.errors.pop(0)
+        if self.fail_on and self.fail_on in excerpt:
+            raise PermissionError("content filtered")
+        reply = {"summary": excerpt[:20], "entities": [{"name": "Paris", "type": "location"}], "key_facts": [excerpt]}
+        return SimpleNamespace(content=f"```json\n{json.dumps(reply)}\n```")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SQLiteCache(str(tmp_path / "doc_analysis.db"), namespace="doc_analysis")
+
+
+def _analyse(analyser, texts):
+    chunks = [{"page_content": text, "metadata": {"page": index + 1}} for index, text in enumerate(texts)]
+
+    async def collect():
+        return [event async for event in analyser.aanalyse_chunks(chunks)]
+
+    return asyncio.run(collect())
+
+
+def test_parse_analysis_reads_fenced_json():
+    reply = 'Here it is:\n```json\n{"summary": "A city.", "entities": [{"name": "Paris"}, {"type": "x"}]}\n```'
+
+    assert parse_analysis(reply) == {"summary": "A city.", "entities": [{"name": "Paris"}], "key_facts": []}
+    with pytest.raises(ValueError):
+        parse_analysis("no json here")
+
+
+def test_model_identity():
+    router = SimpleNamespace(providers={"openai": SimpleNamespace(model_name="gpt-4o"),
+                                        "gemini": SimpleNamespace(model="gemini-1.5-pro")})
+
+    assert model_identity(router) == "gpt-4o+gemini-1.5-pro"
+    assert model_identity(SimpleNamespace(providers={"x": object()})) is None
+    assert model_identity(object()) is None
+
+
+def test_unnamed_model_needs_a_cache_namespace(cache):
+    with pytest.raises(ValueError):
+        DocumentAnalyser(llm=StubLLM(model_name=None), cache=cache)
+
+    assert DocumentAnalyser(llm=StubLLM(model_name=None), cache=cache, cache_namespace="local").cache_namespace == "local"
+
+
+def test_cache_keys_depend_on_the_model(cache):
+    first = DocumentAnalyser(llm=StubLLM("model-a"), cache=cache)
+    second = DocumentAnalyser(llm=StubLLM("model-b"), cache=cache)
+
+    assert first.cache_key("hash") != second.cache_key("hash")
+    assert first.cache_key("hash") == DocumentAnalyser(llm=StubLLM("model-a"), cache=cache).cache_key("hash")
+
+
+def test_revised_document_only_analyses_changed_chunks(cache):
+    llm = StubLLM()
+    _analyse(DocumentAnalyser(llm=llm, cache=cache), ["intro", "body", "ending"])
+
+    events = _analyse(DocumentAnalyser(llm=llm, cache=cache), ["intro", "revised body", "ending"])
+
+    assert llm.excerpts == ["intro", "body", "ending", "revised body"]
+    assert [(event["index"], event["cached"]) for event in events if event["type"] == "chunk"] == \
+        [(0, True), (2, True), (1, False)]
+    assert events[-1]["stats"]["cached"] == 2 and events[-1]["stats"]["analysed"] == 1
+
+
+def test_rate_limits_are_retried(cache):
+    llm = StubLLM(errors=[RateLimitError(0.01), ConnectionError("reset")])
+    analyser = DocumentAnalyser(llm_provider="rate-limit-test", llm=llm, cache=cache, retry_backoff=0.001)
+
+    stats = _analyse(analyser, ["intro"])[-1]["stats"]
+
+    assert stats["analysed"] == 1 and stats["retries"] == 2 and stats["rate_limited"] == 1
+
+
+def test_failed_chunk_is_reported_and_not_cached(cache):
+    llm = StubLLM(fail_on="secret")
+    analyser = DocumentAnalyser(llm=llm, cache=cache)
+
+    events = _analyse(analyser, ["intro", "secret"])
+
+    errors = [event for event in events if event["type"] == "error"]
+    assert [event["index"] for event in errors] == [1] and "content filtered" in errors[0]["error"]
+    assert events[-1]["stats"]["failed"] == 1
+    assert _analyse(analyser, ["secret"])[-1]["stats"]["cached"] == 0
+
+
+def test_analyse_merges_entities_across_chunks(cache, tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("Paris is the capital of France.", encoding="utf-8")
+
+    report = DocumentAnalyser(llm=StubLLM(), cache=cache).analyse(str(path))
+
+    assert report["entities"] == [{"name": "Paris", "type": "location", "mentions": len(report["chunks"])}]
+    assert report["key_facts"] == ["Paris is the capital of France."]
+    assert report["errors"] == [] and report["stats"]["analysed"] == 1
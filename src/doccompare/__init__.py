@@ -0,0 +1,5 @@
+"""Document comparison: chunk alignment by embedding similarity with LLM summaries of the changes."""
+
+from .doc_compare import DocumentComparer, best_matches
+
+__all__ = ['DocumentComparer', 'best_matches']
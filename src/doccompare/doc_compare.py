@@ -0,0 +1,320 @@
+"""Compare two documents by aligning their chunks on embedding similarity.
+
+Both documents are chunked with the document pipeline and every chunk is embedded once.
+Chunks whose text occurs in both documents are paired by content hash and never
+embedded. The rest are aligned with a cosine-similarity matrix computed in fixed-size
+blocks, so memory stays bounded however long the documents are. Each chunk is then
+unchanged (near-identical best match), modified (a mutual best match that differs) or
+only present in one document. Only the modified, added and removed chunks are sent to the
+LLM for a diff summary, so the number of LLM calls follows the amount of change rather
+than the size of the documents.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.prompts import ChatPromptTemplate
+
+from LLMs.llm_factory import LLMFactory
+from src.document_pipeline import DocumentPipeline, content_hash, estimate_tokens
+from utils.async_bridge import background_loop
+
+DIFF_PROMPT = """Below are differences between an original document (A) and a revised document (B).
+CHANGED entries show a passage in A and the passage that replaced it in B; ADDED entries only exist
+in B and REMOVED entries only exist in A. Summarise what changed in meaning, as short bullet points
+that keep the page references. Ignore pure wording or formatting changes.
+
+{changes}
+
+Summary:"""
+
+COMBINE_PROMPT = """Below are partial summaries of the differences between an original document (A)
+and a revised document (B). Merge them into one concise list of the changes in meaning, keeping the
+page references and removing repetition.
+
+{summaries}
+
+Summary:"""
+
+NO_CHANGES_SUMMARY = "The documents match; no differences in content were found."
+
+_diff_template = ChatPromptTemplate.from_template(DIFF_PROMPT)
+_combine_template = ChatPromptTemplate.from_template(COMBINE_PROMPT)
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def best_matches(a: np.ndarray, b: np.ndarray, block_size: int = 1024) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Find, for every row of ``a``, its most similar row of ``b`` by cosine similarity, and
+    the reverse.
+
+    The similarity matrix is computed one ``block_size`` x ``block_size`` tile at a time and
+    only running maxima are kept, so memory is O(block_size^2) rather than O(len(a) * len(b)).
+
+    Returns:
+        (best row of b for each row of a, its similarity,
+         best row of a for each row of b, its similarity); -1 and -inf when the other side is empty
+    """
+    a = _normalize(np.asarray(a, dtype=np.float32))
+    b = _normalize(np.asarray(b, dtype=np.float32))
+    a_index = np.full(len(a), -1, dtype=np.int64)
+    a_score = np.full(len(a), -np.inf, dtype=np.float32)
+    b_index = np.full(len(b), -1, dtype=np.int64)
+    b_score = np.full(len(b), -np.inf, dtype=np.float32)
+
+    for i in range(0, len(a), block_size):
+        a_block = a[i:i + block_size]
+        rows = np.arange(len(a_block))
+        for j in range(0, len(b), block_size):
+            similarities = a_block @ b[j:j + block_size].T
+            columns = np.arange(similarities.shape[1])
+
+            row_best = similarities.argmax(axis=1)
+            row_score = similarities[rows, row_best]
+            better = row_score > a_score[i:i + block_size]
+            a_score[i:i + block_size][better] = row_score[better]
+            a_index[i:i + block_size][better] = row_best[better] + j
+
+            column_best = similarities.argmax(axis=0)
+            column_score = similarities[column_best, columns]
+            better = column_score > b_score[j:j + block_size]
+            b_score[j:j + block_size][better] = column_score[better]
+            b_index[j:j + block_size][better] = column_best[better] + i
+
+    return a_index, a_score, b_index, b_score
+
+
+def _location(metadata: Dict[str, Any]) -> str:
+    if metadata.get("page") is not None:
+        return f"p.{metadata['page']}"
+    return f"offset {metadata.get('offset', 0)}"
+
+
+def _format_change(change: Dict[str, Any]) -> str:
+    if change["type"] == "modified":
+        return (f"CHANGED (A {_location(change['a']['metadata'])} -> B {_location(change['b']['metadata'])}):\n"
+                f"A: {change['a']['text']}\nB: {change['b']['text']}")
+    side = "b" if change["type"] == "added" else "a"
+    label = "ADDED" if change["type"] == "added" else "REMOVED"
+    return f"{label} ({side.upper()} {_location(change[side]['metadata'])}):\n{change[side]['text']}"
+
+
+class DocumentComparer:
+    """Finds and summarises the differences between two documents."""
+
+    def __init__(self, embedding_provider: str = "openai", embeddings=None, llm_provider: str = "openai", llm=None,
+                 pipeline: Optional[DocumentPipeline] = None, same_threshold: float = 0.97,
+                 related_threshold: float = 0.8, block_size: int = 1024, embed_batch_size: int = 256,
+                 token_budget: int = 3000, max_concurrency: int = 4):
+        """Initialize the comparer.
+
+        Args:
+            embedding_provider: Provider of the shared embedding model used when
+                ``embeddings`` is not given (cached, so unchanged chunks are not re-embedded
+                on the next comparison).
+            embeddings: Embedding model to use instead.
+            llm_provider: LLMFactory provider used when ``llm`` is not given.
+            llm: Chat model that writes the diff summary.
+            pipeline: DocumentPipeline used to chunk the files (default settings if omitted).
+            same_threshold: Similarity at or above which two chunks count as unchanged.
+            related_threshold: Similarity at or above which mutually best-matching chunks
+                count as a modified passage rather than a removal plus an addition.
+            block_size: Rows and columns per similarity tile.
+            embed_batch_size: Chunks embedded per request.
+            token_budget: Context tokens per summary call.
+            max_concurrency: Summary calls running at the same time.
+        """
+        if not 0 < related_threshold <= same_threshold <= 1:
+            raise ValueError("Thresholds must satisfy 0 < related_threshold <= same_threshold <= 1")
+        if block_size < 1 or embed_batch_size < 1 or token_budget < 1 or max_concurrency < 1:
+            raise ValueError("block_size, embed_batch_size, token_budget and max_concurrency must be at least 1")
+        if embeddings is None:
+            from memory.pinecode.vectordb_manager import get_shared_embedding_model
+            embeddings = get_shared_embedding_model(embedding_provider)
+        self.embeddings = embeddings
+        self.llm = llm if llm is not None else LLMFactory.get_pooled_llm(llm_provider, temperature=0.0)
+        self.pipeline = pipeline or DocumentPipeline()
+        self.same_threshold = same_threshold
+        self.related_threshold = related_threshold
+        self.block_size = block_size
+        self.embed_batch_size = embed_batch_size
+        self.token_budget = token_budget
+        self.max_concurrency = max_concurrency
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts in batches straight into a float32 matrix."""
+        matrix: Optional[np.ndarray] = None
+        for start in range(0, len(texts), self.embed_batch_size):
+            vectors = np.asarray(self.embeddings.embed_documents(texts[start:start + self.embed_batch_size]), dtype=np.float32)
+            if matrix is None:
+                matrix = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            matrix[start:start + len(vectors)] = vectors
+        return matrix if matrix is not None else np.empty((0, 0), dtype=np.float32)
+
+    def align(self, chunks_a: List[Dict[str, Any]], chunks_b: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """Classify chunks of two documents.
+
+        Args:
+            chunks_a: Chunks of the original document ({'page_content', 'metadata'}).
+            chunks_b: Chunks of the revised document.
+
+        Returns:
+            (changes in document order: 'modified', 'removed' and 'added' entries, counts)
+        """
+        hashes_a = [content_hash(chunk["page_content"]) for chunk in chunks_a]
+        hashes_b = [content_hash(chunk["page_content"]) for chunk in chunks_b]
+        # Identical text needs no embedding
+        common = set(hashes_a) & set(hashes_b)
+        rest_a = [i for i, digest in enumerate(hashes_a) if digest not in common]
+        rest_b = [j for j, digest in enumerate(hashes_b) if digest not in common]
+
+        vectors = self._embed([chunks_a[i]["page_content"] for i in rest_a] + [chunks_b[j]["page_content"] for j in rest_b])
+        a_index, a_score, b_index, b_score = best_matches(vectors[:len(rest_a)], vectors[len(rest_a):], self.block_size)
+
+        # Position in B of every A chunk that has a counterpart there, for ordering removals
+        first_in_b: Dict[str, int] = {}
+        for j, digest in enumerate(hashes_b):
+            first_in_b.setdefault(digest, j)
+        position_in_b: List[Optional[int]] = [first_in_b.get(digest) for digest in hashes_a]
+
+        changes: List[Tuple[Tuple[int, int, int], Dict[str, Any]]] = []
+        removed: List[Tuple[int, Dict[str, Any]]] = []
+        paired_b = set()
+        unchanged = sum(1 for digest in hashes_a if digest in common)
+        for row, i in enumerate(rest_a):
+            match, score = int(a_index[row]), float(a_score[row])
+            if score >= self.same_threshold:
+                unchanged += 1
+                paired_b.add(match)
+                position_in_b[i] = rest_b[match]
+            elif score >= self.related_threshold and int(b_index[match]) == row:
+                paired_b.add(match)
+                position_in_b[i] = rest_b[match]
+                changes.append(((rest_b[match], 0, i), {
+                    "type": "modified", "similarity": round(score, 4),
+                    "a": {"text": chunks_a[i]["page_content"], "metadata": chunks_a[i].get("metadata", {})},
+                    "b": {"text": chunks_b[rest_b[match]]["page_content"], "metadata": chunks_b[rest_b[match]].get("metadata", {})}
+                }))
+            else:
+                removed.append((i, {
+                    "type": "removed", "similarity": round(score, 4) if match >= 0 else None,
+                    "a": {"text": chunks_a[i]["page_content"], "metadata": chunks_a[i].get("metadata", {})}
+                }))
+        added = 0
+        for row, j in enumerate(rest_b):
+            if row in paired_b or float(b_score[row]) >= self.same_threshold:
+                continue
+            added += 1
+            changes.append(((j, 0, -1), {
+                "type": "added", "similarity": round(float(b_score[row]), 4) if b_index[row] >= 0 else None,
+                "b": {"text": chunks_b[j]["page_content"], "metadata": chunks_b[j].get("metadata", {})}
+            }))
+
+        # Document order follows B. A removed chunk goes right after the B position of the
+        # nearest A chunk before it that is still in B (or first, if there is none).
+        anchors: List[int] = []
+        anchor = -1
+        for i in range(len(chunks_a)):
+            anchors.append(anchor)
+            if position_in_b[i] is not None:
+                anchor = position_in_b[i]
+        changes.extend(((anchors[i], 1, i), change) for i, change in removed)
+        changes.sort(key=lambda item: item[0])
+        counts = {
+            "chunks_a": len(chunks_a),
+            "chunks_b": len(chunks_b),
+            "embedded_chunks": len(rest_a) + len(rest_b),
+            "unchanged": unchanged,
+            "modified": sum(1 for _, change in changes if change["type"] == "modified"),
+            "removed": sum(1 for _, change in changes if change["type"] == "removed"),
+            "added": added
+        }
+        return [change for _, change in changes], counts
+
+    def _batches(self, changes: List[Dict[str, Any]]) -> List[str]:
+        """Pack formatted changes into prompts that fit the token budget."""
+        batches, batch, used = [], [], 0
+        for change in changes:
+            text = _format_change(change)
+            tokens = estimate_tokens(text)
+            if batch and used + tokens > self.token_budget:
+                batches.append("\n\n".join(batch))
+                batch, used = [], 0
+            batch.append(text)
+            used += tokens
+        if batch:
+            batches.append("\n\n".join(batch))
+        return batches
+
+    async def _asummarize(self, changes: List[Dict[str, Any]]) -> Tuple[str, int]:
+        """Summarise the changes with one LLM call per batch (run concurrently), merged by a
+        final call when there is more than one batch. Returns (summary, LLM calls)."""
+        if not changes:
+            return NO_CHANGES_SUMMARY, 0
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def summarize(batch: str) -> str:
+            async with semaphore:
+                response = await self.llm.ainvoke(_diff_template.format_messages(changes=batch))
+                return str(response.content).strip()
+
+        summaries = await asyncio.gather(*(summarize(batch) for batch in self._batches(changes)))
+        if len(summaries) == 1:
+            return summaries[0], 1
+        response = await self.llm.ainvoke(_combine_template.format_messages(summaries="\n\n".join(summaries)))
+        return str(response.content).strip(), len(summaries) + 1
+
+    async def acompare_chunks(self, chunks_a: List[Dict[str, Any]], chunks_b: List[Dict[str, Any]],
+                              summarize: bool = True) -> Dict[str, Any]:
+        """Compare two chunked documents; see compare()."""
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        # Embedding and the similarity blocks are blocking work; keep them off the event loop
+        changes, counts = await loop.run_in_executor(None, self.align, chunks_a, chunks_b)
+        aligned = time.perf_counter()
+        try:
+            summary, llm_calls = await self._asummarize(changes) if summarize else (None, 0)
+        except Exception as e:
+            raise ValueError(f"Diff summary failed: {str(e)}")
+        finished = time.perf_counter()
+        return {
+            "summary": summary,
+            "changes": changes,
+            **counts,
+            "llm_calls": llm_calls,
+            "timings": {
+                "align_ms": round((aligned - started) * 1000, 2),
+                "summary_ms": round((finished - aligned) * 1000, 2)
+            }
+        }
+
+    async def acompare(self, path_a: str, path_b: str, summarize: bool = True) -> Dict[str, Any]:
+        """Asynchronous version of compare()."""
+        loop = asyncio.get_running_loop()
+        chunks_a = await loop.run_in_executor(None, lambda: list(self.pipeline.iter_chunks([path_a])))
+        chunks_b = await loop.run_in_executor(None, lambda: list(self.pipeline.iter_chunks([path_b])))
+        return await self.acompare_chunks(chunks_a, chunks_b, summarize=summarize)
+
+    def compare(self, path_a: str, path_b: str, summarize: bool = True) -> Dict[str, Any]:
+        """Compare an original document (A) with a revised one (B).
+
+        Args:
+            path_a: PDF or text file of the original.
+            path_b: PDF or text file of the revision.
+            summarize: Ask the LLM to summarise the differences (otherwise only align).
+
+        Returns:
+            Dict with the summary, the list of changes (modified, removed, added chunks with
+            their text, page metadata and similarity), chunk counts, the number of LLM calls
+            and timings
+
+        Raises:
+            ValueError: If a file cannot be parsed or the summary call fails
+        """
+        return background_loop.run(self.acompare(path_a, path_b, summarize=summarize))
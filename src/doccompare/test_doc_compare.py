@@ -0,0 +1,66 @@
+import hashlib
+
+import numpy as np
+import pytest
+
+from src.doccompare.doc_compare import DocumentComparer, best_matches
+
+
+class StubEmbeddings:
+    """Deterministic pseudo-random vector per text; distinct texts are nearly orthogonal."""
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    @staticmethod
+    def _vector(text):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        return np.random.default_rng(seed).standard_normal(64).tolist()
+
+
+def _chunks(texts):
+    return [{"page_content": text, "metadata": {"page": index + 1}} for index, text in enumerate(texts)]
+
+
+@pytest.mark.parametrize("rows,columns,block_size", [(1, 1, 1), (5, 9, 2), (17, 11, 4), (30, 30, 7), (12, 40, 64)])
+def test_best_matches_agrees_with_dense_argmax(rows, columns, block_size):
+    rng = np.random.default_rng(rows * 100 + columns)
+    a = rng.standard_normal((rows, 8)).astype(np.float32)
+    b = rng.standard_normal((columns, 8)).astype(np.float32)
+
+    a_index, a_score, b_index, b_score = best_matches(a, b, block_size=block_size)
+
+    normalized_a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    normalized_b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    dense = normalized_a @ normalized_b.T
+    np.testing.assert_array_equal(a_index, dense.argmax(axis=1))
+    np.testing.assert_allclose(a_score, dense.max(axis=1), rtol=1e-5, atol=1e-6)
+    np.testing.assert_array_equal(b_index, dense.argmax(axis=0))
+    np.testing.assert_allclose(b_score, dense.max(axis=0), rtol=1e-5, atol=1e-6)
+
+
+def test_best_matches_with_an_empty_side():
+    a_index, a_score, b_index, b_score = best_matches(np.ones((3, 4)), np.empty((0, 4)))
+    assert a_index.tolist() == [-1, -1, -1]
+    assert np.isneginf(a_score).all()
+    assert len(b_index) == len(b_score) == 0
+
+
+def test_removed_chunk_follows_its_preceding_chunk_in_b():
+    comparer = DocumentComparer(embeddings=StubEmbeddings(), llm=object())
+    chunks_a = _chunks(["intro", "terms", "pricing", "old appendix"])
+    chunks_b = _chunks(["new 1", "new 2", "new 3", "new 4", "new 5", "intro", "terms", "pricing"])
+
+    changes, counts = comparer.align(chunks_a, chunks_b)
+
+    assert counts["added"] == 5 and counts["removed"] == 1 and counts["unchanged"] == 3
+    # The removed chunk followed "pricing" in A, which is last in B, so it comes last
+    assert [change["type"] for change in changes] == ["added"] * 5 + ["removed"]
+    assert changes[-1]["a"]["text"] == "old appendix"
+
+
+def test_removed_chunk_without_a_preceding_match_comes_first():
+    comparer = DocumentComparer(embeddings=StubEmbeddings(), llm=object())
+    changes, _ = comparer.align(_chunks(["dropped", "kept"]), _chunks(["added", "kept"]))
+
+    assert [change["type"] for change in changes] == ["removed", "added"]
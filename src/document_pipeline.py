@@ -0,0 +1,260 @@
+"""Streaming document loading and chunking for the document chat packages.
+
+PDF and text files are parsed page by page on a process pool, split into overlapping
+chunks, deduplicated by content hash and handed to ``VectorDBManager.ingest`` in batches.
+Files are cut into page ranges (byte ranges for text), so one large file is also parsed
+by several workers, and only a few ranges are in flight at a time: memory stays flat
+however many pages the documents have, and parsing pauses while embedding catches up.
+
+Run from the command line, e.g.:
+    python -m src.document_pipeline manuals/*.pdf notes.txt --namespace manuals --backend faiss
+"""
+
+import argparse
+import hashlib
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+PDF_EXTENSIONS = (".pdf",)
+TEXT_EXTENSIONS = (".txt", ".md", ".markdown", ".rst", ".csv", ".log")
+
+# Text files have no pages; lines are grouped into pages of about this many characters
+TEXT_PAGE_CHARS = 4000
+
+# (path, kind, start, end): a page range for PDFs, a byte range for text files
+ParseTask = Tuple[str, str, int, int]
+# (pages parsed, [(chunk text, metadata)])
+ParseResult = Tuple[int, List[Tuple[str, Dict[str, Any]]]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) for LLM context budgets."""
+    return len(text) // 4 + 1
+
+
+def content_hash(text: str) -> str:
+    """Hash used to deduplicate chunks. Whitespace is normalised, so re-flowed copies match."""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=8)
+def _splitter(chunk_size: int, chunk_overlap: int):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+
+def split_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[str]:
+    """Split text into chunks of at most ``chunk_size`` characters, preferring paragraph,
+    line and word boundaries, with ``chunk_overlap`` characters shared between neighbours."""
+    if not text.strip():
+        return []
+    return _splitter(chunk_size, chunk_overlap).split_text(text)
+
+
+def _parse_pdf_pages(path: str, start: int, end: int, chunk_size: int, chunk_overlap: int) -> ParseResult:
+    # A reader per range: pypdf caches every object it resolves, so one reader kept
+    # open for a whole 1000-page file would grow with it
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    chunks = []
+    for page_index in range(start, end):
+        text = reader.pages[page_index].extract_text() or ""
+        for chunk_index, chunk in enumerate(split_text(text, chunk_size, chunk_overlap)):
+            chunks.append((chunk, {"source": path, "page": page_index + 1, "chunk": chunk_index}))
+    return end - start, chunks
+
+
+def _parse_text_range(path: str, start: int, end: int, chunk_size: int, chunk_overlap: int) -> ParseResult:
+    # A line belongs to the range it starts in
+    pages = 0
+    chunks = []
+
+    def flush(lines: List[str], offset: int) -> None:
+        nonlocal pages
+        pages += 1
+        for chunk_index, chunk in enumerate(split_text("".join(lines), chunk_size, chunk_overlap)):
+            chunks.append((chunk, {"source": path, "offset": offset, "chunk": chunk_index}))
+
+    with open(path, "rb") as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()
+        lines: List[str] = []
+        length = 0
+        offset = f.tell()
+        while f.tell() < end:
+            position = f.tell()
+            line = f.readline()
+            if not line:
+                break
+            if not lines:
+                offset = position
+            lines.append(line.decode("utf-8", errors="replace"))
+            length += len(lines[-1])
+            if length >= TEXT_PAGE_CHARS:
+                flush(lines, offset)
+                lines, length = [], 0
+        if lines:
+            flush(lines, offset)
+    return pages, chunks
+
+
+def _parse_task(task: ParseTask, chunk_size: int, chunk_overlap: int) -> ParseResult:
+    path, kind, start, end = task
+    if kind == "pdf":
+        return _parse_pdf_pages(path, start, end, chunk_size, chunk_overlap)
+    return _parse_text_range(path, start, end, chunk_size, chunk_overlap)
+
+
+class DocumentPipeline:
+    """Turns PDF and text files into deduplicated chunk documents for the vector database."""
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, max_workers: Optional[int] = None,
+                 pages_per_task: int = 20, text_bytes_per_task: int = 1 << 20, max_pending: Optional[int] = None):
+        """Initialize the pipeline.
+
+        Args:
+            chunk_size: Maximum characters per chunk.
+            chunk_overlap: Characters shared by neighbouring chunks of the same page.
+            max_workers: Parser processes (default: CPU count).
+            pages_per_task: PDF pages parsed per task.
+            text_bytes_per_task: Bytes of a text file parsed per task.
+            max_pending: Tasks submitted ahead of the consumer. Defaults to twice
+                ``max_workers``; this bounds how many parsed pages are held in memory.
+        """
+        if chunk_size < 1 or not 0 <= chunk_overlap < chunk_size:
+            raise ValueError("chunk_size must be positive and chunk_overlap between 0 and chunk_size - 1")
+        if pages_per_task < 1 or text_bytes_per_task < 1:
+            raise ValueError("pages_per_task and text_bytes_per_task must be at least 1")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_task = pages_per_task
+        self.text_bytes_per_task = text_bytes_per_task
+        self.max_pending = max_pending or self.max_workers * 2
+        self.stats: Dict[str, Any] = {}
+
+    def _tasks(self, paths: Iterable[str]) -> Iterator[ParseTask]:
+        for path in paths:
+            extension = os.path.splitext(path)[1].lower()
+            if extension in PDF_EXTENSIONS:
+                from pypdf import PdfReader
+
+                try:
+                    page_count = len(PdfReader(path).pages)
+                except Exception as e:
+                    raise ValueError(f"Failed to open {path}: {str(e)}")
+                step, size = self.pages_per_task, page_count
+                kind = "pdf"
+            elif extension in TEXT_EXTENSIONS:
+                step, size = self.text_bytes_per_task, os.path.getsize(path)
+                kind = "text"
+            else:
+                raise ValueError(f"Unsupported document type '{extension}' for {path}; "
+                                 f"expected one of {', '.join(PDF_EXTENSIONS + TEXT_EXTENSIONS)}")
+            self.stats["files"] += 1
+            for start in range(0, size, step):
+                yield path, kind, start, min(start + step, size)
+
+    def _collect(self, result: ParseResult, seen: set) -> Iterator[Dict[str, Any]]:
+        pages, chunks = result
+        self.stats["pages"] += pages
+        for text, metadata in chunks:
+            digest = content_hash(text)
+            if digest in seen:
+                self.stats["duplicate_chunks"] += 1
+                continue
+            seen.add(digest)
+            self.stats["chunks"] += 1
+            yield {"page_content": text, "metadata": metadata, "id": digest}
+
+    def iter_chunks(self, paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """Yield chunk documents ({'page_content', 'metadata', 'id'}) in file and page order.
+
+        Chunk ids are content hashes, so the same chunk appearing twice (in one file or
+        across files) is yielded once, and re-running over the same files overwrites
+        rather than duplicates. Parsing only runs ``max_pending`` tasks ahead of the
+        consumer. ``self.stats`` is updated as chunks are yielded.
+
+        Raises:
+            ValueError: If a file has an unsupported type or cannot be parsed.
+        """
+        self.stats = {"files": 0, "pages": 0, "chunks": 0, "duplicate_chunks": 0, "seconds": 0.0, "pages_per_sec": 0.0}
+        started = time.perf_counter()
+        seen: set = set()
+        pending: Deque[Tuple[ParseTask, Future]] = deque()
+
+        def next_result() -> ParseResult:
+            task, future = pending.popleft()
+            try:
+                return future.result()
+            except Exception as e:
+                raise ValueError(f"Failed to parse {task[0]} ({task[1]} range {task[2]}-{task[3]}): {str(e)}")
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            try:
+                for task in self._tasks(paths):
+                    pending.append((task, pool.submit(_parse_task, task, self.chunk_size, self.chunk_overlap)))
+                    if len(pending) >= self.max_pending:
+                        yield from self._collect(next_result(), seen)
+                while pending:
+                    yield from self._collect(next_result(), seen)
+            finally:
+                for _, future in pending:
+                    future.cancel()
+                elapsed = time.perf_counter() - started
+                self.stats["seconds"] = round(elapsed, 3)
+                self.stats["pages_per_sec"] = self.stats["pages"] / elapsed if elapsed else 0.0
+
+    def ingest(self, manager, paths: Iterable[str], namespace: str = "", batch_size: int = 64, **kwargs) -> Dict[str, Any]:
+        """Parse, chunk and ingest files into a VectorDBManager; see VectorDBManager.ingest().
+
+        Returns:
+            The ingestion stats plus files, pages, chunks, duplicate_chunks and
+            pages_per_sec (end to end, including embedding)
+        """
+        stats = manager.ingest(self.iter_chunks(paths), namespace=namespace, batch_size=batch_size, **kwargs)
+        elapsed = stats["seconds"]
+        stats.update({
+            "files": self.stats["files"],
+            "pages": self.stats["pages"],
+            "chunks": self.stats["chunks"],
+            "duplicate_chunks": self.stats["duplicate_chunks"],
+            "pages_per_sec": self.stats["pages"] / elapsed if elapsed else 0.0
+        })
+        print(f"Parsed {stats['pages']} pages from {stats['files']} files into {stats['chunks']} chunks "
+              f"({stats['duplicate_chunks']} duplicates skipped, {stats['pages_per_sec']:.1f} pages/sec)")
+        return stats
+
+
+if __name__ == "__main__":
+    from memory.pinecode.vectordb_manager import VectorDBManager
+
+    parser = argparse.ArgumentParser(description="Load, chunk and ingest PDF and text files into the vector database.")
+    parser.add_argument("files", nargs="+", help="PDF or text files")
+    parser.add_argument("--provider", default=os.environ.get('DEFAULT_EMBEDDING_PROVIDER', 'openai'), help="Embedding provider")
+    parser.add_argument("--backend", help="Vector backend: pinecone or faiss (default: VECTOR_BACKEND)")
+    parser.add_argument("--namespace", default="", help="Index namespace")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Maximum characters per chunk")
+    parser.add_argument("--chunk-overlap", type=int, default=200, help="Characters shared by neighbouring chunks")
+    parser.add_argument("--parse-workers", type=int, help="Parser processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=64, help="Chunks per embedding request")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent embedding batches")
+    parser.add_argument("--checkpoint", help="Checkpoint file for resuming an interrupted run")
+    args = parser.parse_args()
+
+    pipeline = DocumentPipeline(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap, max_workers=args.parse_workers)
+    pipeline.ingest(
+        VectorDBManager(provider_name=args.provider, backend=args.backend),
+        args.files,
+        namespace=args.namespace,
+        batch_size=args.batch_size,
+        max_workers=args.workers,
+        checkpoint_path=args.checkpoint
+    )
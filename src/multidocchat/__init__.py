@@ -0,0 +1,5 @@
+"""Multi-document chat: parallel per-document retrieval with single-call or map-reduce answers."""
+
+from .multi_doc_chat import MultiDocChat, rerank, pack_hits
+
+__all__ = ['MultiDocChat', 'rerank', 'pack_hits']
@@ -0,0 +1,322 @@
+"""Chat over many documents with parallel per-document retrieval and map-reduce answering.
+
+Every document is stored in its own namespace of the shared index. A question is
+searched in all of them concurrently, one ``VectorDBManager.get_retriever`` per document,
+and the hits are reranked by similarity and merged under a token budget for a single LLM
+call. When hits come from more than ``map_reduce_threshold`` documents, batches of
+documents are condensed against the question by concurrent "map" calls and one "reduce"
+call writes the answer. Either way the critical path is one retrieval round plus one or
+two LLM rounds, so latency stays roughly flat as documents are added.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from langchain.schema.document import Document
+from langchain_core.prompts import ChatPromptTemplate
+
+from LLMs.llm_factory import LLMFactory
+from src.document_pipeline import DocumentPipeline, estimate_tokens
+from utils.async_bridge import background_loop
+from utils.embedding_cache import CachedEmbeddings
+from utils.metrics import PIPELINE_ERRORS, inc
+
+# Shared pool for the per-document searches
+_retrieval_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("MULTIDOC_RETRIEVAL_WORKERS", "16")), thread_name_prefix="multidoc-retrieval")
+
+ANSWER_PROMPT = """You answer questions about a set of documents using only the excerpts below.
+Each excerpt starts with its source label in square brackets. Cite the labels you rely on, point out
+where documents disagree, and say that you don't know if the excerpts do not contain the answer.
+
+Excerpts:
+{context}
+
+Question: {question}
+Answer:"""
+
+MAP_PROMPT = """Extract everything in the excerpts below that helps answer the question, as short notes
+that keep the source label in square brackets. If nothing is relevant, reply with exactly NONE.
+
+Excerpts:
+{context}
+
+Question: {question}
+Notes:"""
+
+REDUCE_PROMPT = """You answer questions about a set of documents. Below are notes taken from the
+documents, with their source labels in square brackets. Combine them into one answer, cite the labels
+you rely on, point out where documents disagree, and say that you don't know if the notes do not
+contain the answer.
+
+Notes:
+{context}
+
+Question: {question}
+Answer:"""
+
+NO_MATCH_ANSWER = "I couldn't find anything about that in the selected documents."
+
+_answer_template = ChatPromptTemplate.from_template(ANSWER_PROMPT)
+_map_template = ChatPromptTemplate.from_template(MAP_PROMPT)
+_reduce_template = ChatPromptTemplate.from_template(REDUCE_PROMPT)
+
+
+class Hit(NamedTuple):
+    """A retrieved chunk, the document it came from and its similarity to the question."""
+    document_id: str
+    document: Document
+    score: float
+
+
+def rerank(hits: Iterable[Hit]) -> List[Hit]:
+    """Order hits from all documents by similarity, dropping repeated chunk texts.
+
+    Scores come from the same index and embedding model, so they compare across documents.
+    """
+    best: Dict[str, Hit] = {}
+    for hit in hits:
+        key = hashlib.sha256(hit.document.page_content.encode("utf-8")).hexdigest()
+        if key not in best or hit.score > best[key].score:
+            best[key] = hit
+    return sorted(best.values(), key=lambda hit: hit.score, reverse=True)
+
+
+def pack_hits(hits: List[Hit], token_budget: int) -> List[Hit]:
+    """Select reranked hits that fit the budget: the best hit of every document first, so
+    each matching document is represented, then the remaining hits by score."""
+    represented = set()
+    firsts, rest = [], []
+    for hit in hits:
+        (rest if hit.document_id in represented else firsts).append(hit)
+        represented.add(hit.document_id)
+
+    selected, used = [], 0
+    for hit in firsts + rest:
+        tokens = estimate_tokens(format_hit(hit))
+        if used + tokens <= token_budget:
+            selected.append(hit)
+            used += tokens
+    return sorted(selected, key=lambda hit: hit.score, reverse=True)
+
+
+def source_label(hit: Hit) -> str:
+    """Label a hit for citation, e.g. '[handbook p.12]'."""
+    page = hit.document.metadata.get("page")
+    return f"[{hit.document_id} p.{page}]" if page is not None else f"[{hit.document_id}]"
+
+
+def format_hit(hit: Hit) -> str:
+    return f"{source_label(hit)} {hit.document.page_content}"
+
+
+class MultiDocChat:
+    """Question answering across several documents stored in per-document namespaces."""
+
+    def __init__(self, manager, llm_provider: str = "openai", llm=None, temperature: float = 0.0,
+                 namespace_prefix: str = "doc:", k_per_document: int = 4, token_budget: int = 3000,
+                 map_reduce_threshold: int = 6, max_concurrency: int = 8, min_score: Optional[float] = None):
+        """Initialize the chat engine.
+
+        Args:
+            manager: VectorDBManager holding the document namespaces.
+            llm_provider: LLMFactory provider used when ``llm`` is not given.
+            llm: Chat model to answer with (default: the pooled model for ``llm_provider``).
+            temperature: Sampling temperature of the pooled model.
+            namespace_prefix: Prefix of every document's namespace.
+            k_per_document: Chunks retrieved from each document.
+            token_budget: Context tokens per LLM call (the single answer call, each map
+                call and the reduce call).
+            map_reduce_threshold: Answer with map-reduce once hits come from more than this
+                many documents.
+            max_concurrency: Map calls running at the same time.
+            min_score: Drop hits with a lower similarity (optional).
+        """
+        if k_per_document < 1 or token_budget < 1 or max_concurrency < 1:
+            raise ValueError("k_per_document, token_budget and max_concurrency must be at least 1")
+        self.manager = manager
+        self.llm = llm if llm is not None else LLMFactory.get_pooled_llm(llm_provider, temperature=temperature)
+        self.namespace_prefix = namespace_prefix
+        self.k_per_document = k_per_document
+        self.token_budget = token_budget
+        self.map_reduce_threshold = map_reduce_threshold
+        self.max_concurrency = max_concurrency
+        self.min_score = min_score
+        self.document_ids: List[str] = []
+
+    def namespace(self, document_id: str) -> str:
+        """Return the namespace a document is stored in."""
+        return f"{self.namespace_prefix}{document_id}"
+
+    def add_document(self, path: str, document_id: Optional[str] = None, pipeline=None, **kwargs) -> Dict[str, Any]:
+        """Load, chunk and ingest a PDF or text file into its own namespace.
+
+        Args:
+            path: File to add.
+            document_id: Name of the document (default: the file name without extension).
+            pipeline: DocumentPipeline to parse with (default: a new one with default settings).
+            **kwargs: Further VectorDBManager.ingest options (batch_size, max_workers, ...).
+
+        Returns:
+            The document id and the pipeline's ingestion stats
+        """
+        document_id = document_id or os.path.splitext(os.path.basename(path))[0]
+        stats = (pipeline or DocumentPipeline()).ingest(self.manager, [path], namespace=self.namespace(document_id), **kwargs)
+        if document_id not in self.document_ids:
+            self.document_ids.append(document_id)
+        return {"document_id": document_id, **stats}
+
+    def _search(self, document_id: str, question: str) -> List[Hit]:
+        retriever = self.manager.get_retriever(
+            namespace=self.namespace(document_id), search_kwargs={"k": self.k_per_document})
+        # Ask the retriever's store for scores too, so hits can be ranked across documents
+        results = retriever.vectorstore.similarity_search_with_score(question, **retriever.search_kwargs)
+        return [
+            Hit(document_id, doc, score) for doc, score in results
+            if self.min_score is None or score >= self.min_score
+        ]
+
+    async def aretrieve(self, question: str, document_ids: List[str]) -> Tuple[List[Hit], List[str]]:
+        """Search every document concurrently.
+
+        Returns:
+            (reranked hits from all documents, ids of documents whose search failed)
+        """
+        embeddings = self.manager.get_embedding_model()
+        if isinstance(embeddings, CachedEmbeddings):
+            # Embed the question once; every per-document search then hits the cache
+            await embeddings.aembed_query(question)
+
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *(loop.run_in_executor(_retrieval_executor, self._search, document_id, question) for document_id in document_ids),
+            return_exceptions=True
+        )
+        hits, failed = [], []
+        for document_id, result in zip(document_ids, results):
+            if isinstance(result, Exception):
+                inc(PIPELINE_ERRORS, pipeline="multidoc", stage="retrieval", outcome="skipped")
+                print(f"Retrieval failed for document {document_id}: {str(result)}")
+                failed.append(document_id)
+            else:
+                hits.extend(result)
+        return rerank(hits), failed
+
+    async def _acomplete(self, template: ChatPromptTemplate, question: str, context: str) -> str:
+        response = await self.llm.ainvoke(template.format_messages(context=context, question=question))
+        return str(response.content).strip()
+
+    def _map_batches(self, hits: List[Hit]) -> List[List[Hit]]:
+        """Group hits by document (best documents first) and pack whole documents into
+        batches that each fit the token budget."""
+        by_document: Dict[str, List[Hit]] = {}
+        for hit in hits:
+            by_document.setdefault(hit.document_id, []).append(hit)
+
+        batches: List[List[Hit]] = []
+        batch: List[Hit] = []
+        used = 0
+        for document_hits in by_document.values():
+            document_hits = pack_hits(document_hits, self.token_budget)
+            tokens = sum(estimate_tokens(format_hit(hit)) for hit in document_hits)
+            if batch and used + tokens > self.token_budget:
+                batches.append(batch)
+                batch, used = [], 0
+            batch.extend(document_hits)
+            used += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    async def _amap_reduce(self, question: str, hits: List[Hit]) -> Tuple[str, List[Hit], int]:
+        """Condense batches of documents concurrently, then answer from the notes.
+
+        Returns:
+            (answer, hits sent to the map calls, number of map calls)
+        """
+        batches = self._map_batches(hits)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def map_batch(batch: List[Hit]) -> str:
+            async with semaphore:
+                return await self._acomplete(_map_template, question, "\n\n".join(format_hit(hit) for hit in batch))
+
+        results = await asyncio.gather(*(map_batch(batch) for batch in batches), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if len(errors) == len(results):
+            raise errors[0]
+        for error in errors:
+            inc(PIPELINE_ERRORS, pipeline="multidoc", stage="map", outcome="skipped")
+            print(f"Map call failed, answering without its documents: {str(error)}")
+
+        # Batches are in best-first order, so notes that overflow the budget are the least relevant
+        notes, used = [], 0
+        for result in results:
+            if isinstance(result, Exception) or not result or result.upper() == "NONE":
+                continue
+            tokens = estimate_tokens(result)
+            if used + tokens <= self.token_budget:
+                notes.append(result)
+                used += tokens
+        if not notes:
+            return NO_MATCH_ANSWER, [hit for batch in batches for hit in batch], len(batches)
+        answer = await self._acomplete(_reduce_template, question, "\n\n".join(notes))
+        return answer, [hit for batch in batches for hit in batch], len(batches)
+
+    async def aask(self, question: str, document_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Answer a question from the given documents (default: every added document).
+
+        Returns:
+            Dict with the answer, the mode used ('single', 'map_reduce' or 'none'), the
+            sources sent to the LLM, documents whose retrieval failed, and timings
+
+        Raises:
+            ValueError: If the question or document list is empty, or the LLM call fails
+        """
+        if not question or not question.strip():
+            raise ValueError("Question must not be empty")
+        document_ids = list(document_ids or self.document_ids)
+        if not document_ids:
+            raise ValueError("No documents to search; add one with add_document() or pass document_ids")
+
+        started = time.perf_counter()
+        hits, failed = await self.aretrieve(question, document_ids)
+        retrieved = time.perf_counter()
+
+        map_calls = 0
+        try:
+            if not hits:
+                mode, answer, used = "none", NO_MATCH_ANSWER, []
+            elif len({hit.document_id for hit in hits}) > self.map_reduce_threshold:
+                mode = "map_reduce"
+                answer, used, map_calls = await self._amap_reduce(question, hits)
+            else:
+                mode = "single"
+                used = pack_hits(hits, self.token_budget)
+                answer = await self._acomplete(_answer_template, question, "\n\n".join(format_hit(hit) for hit in used))
+        except Exception as e:
+            raise ValueError(f"Multi-document answer failed: {str(e)}")
+        finished = time.perf_counter()
+
+        return {
+            "answer": answer,
+            "mode": mode,
+            "sources": [
+                {"document_id": hit.document_id, "label": source_label(hit), "score": hit.score, "metadata": hit.document.metadata}
+                for hit in used
+            ],
+            "failed_documents": failed,
+            "map_calls": map_calls,
+            "timings": {
+                "retrieval_ms": round((retrieved - started) * 1000, 2),
+                "answer_ms": round((finished - retrieved) * 1000, 2)
+            }
+        }
+
+    def ask(self, question: str, document_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Synchronous version of aask(), run on the shared background event loop."""
+        return background_loop.run(self.aask(question, document_ids))
@@ -0,0 +1,137 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from langchain.schema.document import Document
+
+from src.multidocchat.multi_doc_chat import NO_MATCH_ANSWER, Hit, MultiDocChat, pack_hits, rerank
+
+
+class StubLLM:
+    """Answers every prompt with ``reply`` and records the prompts it was sent."""
+
+    def __init__(self, reply="Answer [a].", fail_on=None):
+        self.reply = reply
+        self.fail_on = fail_on
+        self.prompts = []
+
+    async def ainvoke(self, messages):
+        prompt = messages[0].content
+        self.prompts.append(prompt)
+        if self.fail_on and self.fail_on in prompt:
+            raise ConnectionError("LLM unavailable")
+        return SimpleNamespace(content=self.reply)
+
+
+class StubStore:
+    def __init__(self, results):
+        self.results = results
+
+    def similarity_search_with_score(self, question, k=4):
+        if isinstance(self.results, Exception):
+            raise self.results
+        return self.results[:k]
+
+
+class StubManager:
+    """Serves fixed (document, score) results per namespace."""
+
+    def __init__(self, results):
+        self.results = results
+
+    def get_embedding_model(self):
+        return None
+
+    def get_retriever(self, namespace="", search_kwargs=None):
+        return SimpleNamespace(vectorstore=StubStore(self.results.get(namespace, [])), search_kwargs=search_kwargs)
+
+
+def _results(document_id, *scores):
+    return [(Document(page_content=f"{document_id} chunk {i}", metadata={"page": i}), score)
+            for i, score in enumerate(scores)]
+
+
+def _chat(results, llm=None, **kwargs):
+    manager = StubManager({f"doc:{document_id}": hits for document_id, hits in results.items()})
+    return MultiDocChat(manager, llm=llm or StubLLM(), **kwargs)
+
+
+def _hit(document_id, text, score):
+    return Hit(document_id, Document(page_content=text), score)
+
+
+def test_rerank_orders_by_score_and_drops_repeated_chunks():
+    hits = rerank([_hit("a", "shared", 0.5), _hit("b", "shared", 0.9), _hit("a", "only a", 0.7)])
+
+    assert [(hit.document_id, hit.score) for hit in hits] == [("b", 0.9), ("a", 0.7)]
+
+
+def test_pack_hits_represents_every_document_first():
+    hits = [_hit("a", "a1 " * 20, 0.9), _hit("a", "a2 " * 20, 0.8), _hit("b", "b1 " * 20, 0.1)]
+
+    selected = pack_hits(hits, token_budget=40)
+
+    assert {hit.document_id for hit in selected} == {"a", "b"}
+
+
+def test_single_call_answers_from_the_best_hits():
+    llm = StubLLM()
+    chat = _chat({"a": _results("a", 0.9, 0.2), "b": _results("b", 0.5)}, llm=llm)
+
+    result = chat.ask("What changed?", ["a", "b"])
+
+    assert result["mode"] == "single" and result["answer"] == "Answer [a]."
+    assert [source["label"] for source in result["sources"]] == ["[a p.0]", "[b p.0]", "[a p.1]"]
+    assert len(llm.prompts) == 1 and "[b p.0] b chunk 0" in llm.prompts[0]
+
+
+def test_many_documents_use_map_reduce():
+    llm = StubLLM(reply="Notes [x].")
+    chat = _chat({name: _results(name, 0.5) for name in "abcd"}, llm=llm, map_reduce_threshold=2, token_budget=12)
+
+    result = chat.ask("What changed?", list("abcd"))
+
+    assert result["mode"] == "map_reduce" and result["map_calls"] > 1
+    assert len(llm.prompts) == result["map_calls"] + 1
+
+
+def test_failed_map_call_is_skipped(capsys):
+    chat = _chat({name: _results(name, 0.5) for name in "abc"}, llm=StubLLM(fail_on="b chunk 0"),
+                 map_reduce_threshold=1, token_budget=12)
+
+    result = chat.ask("What changed?", list("abc"))
+
+    assert result["mode"] == "map_reduce"
+    assert "Map call failed" in capsys.readouterr().out
+
+
+def test_failed_retrieval_is_reported(capsys):
+    chat = _chat({"a": _results("a", 0.9), "b": ConnectionError("index unavailable")})
+
+    result = chat.ask("What changed?", ["a", "b"])
+
+    assert result["failed_documents"] == ["b"] and result["mode"] == "single"
+    assert "Retrieval failed for document b" in capsys.readouterr().out
+
+
+def test_no_hits_skips_the_llm():
+    llm = StubLLM()
+    chat = _chat({"a": _results("a", 0.1)}, llm=llm, min_score=0.5)
+
+    result = chat.ask("What changed?", ["a"])
+
+    assert result["mode"] == "none" and result["answer"] == NO_MATCH_ANSWER
+    assert llm.prompts == []
+
+
+def test_llm_failure_is_a_value_error():
+    chat = _chat({"a": _results("a", 0.9)}, llm=StubLLM(fail_on="Question"))
+
+    with pytest.raises(ValueError):
+        asyncio.run(chat.aask("What changed?", ["a"]))
+
+
+@pytest.mark.parametrize("question, document_ids", [("  ", ["a"]), ("What changed?", None)])
+def test_question_and_documents_are_required(question, document_ids):
+    with pytest.raises(ValueError):
+        _chat({}).ask(question, document_ids)
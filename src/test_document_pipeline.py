@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from src.document_pipeline import TEXT_PAGE_CHARS, _parse_text_range, content_hash, split_text
+
+
+@pytest.fixture
+def text_file(tmp_path):
+    path = tmp_path / "notes.txt"
+    lines = [f"line {i}: " + "word " * (i % 7) + "\n" for i in range(300)]
+    path.write_text("".join(lines), encoding="utf-8")
+    return str(path), lines
+
+
+def _lines_in(path, start, end):
+    # Chunk size larger than any page, so each page comes back as one chunk
+    _, chunks = _parse_text_range(path, start, end, chunk_size=TEXT_PAGE_CHARS * 2, chunk_overlap=0)
+    return [line.strip() for chunk, _ in chunks for line in chunk.split("\n") if line.strip()]
+
+
+@pytest.mark.parametrize("step", [1, 17, 100, 1000, 100000])
+def test_adjacent_ranges_cover_every_line_once(text_file, step):
+    path, lines = text_file
+    size = os.path.getsize(path)
+
+    seen = []
+    for start in range(0, size, step):
+        seen.extend(_lines_in(path, start, min(start + step, size)))
+
+    assert seen == [line.strip() for line in lines]
+
+
+def test_range_records_the_offset_of_its_first_line(text_file):
+    path, lines = text_file
+    second_line = len(lines[0].encode("utf-8"))
+
+    _, chunks = _parse_text_range(path, 1, second_line + 1, chunk_size=1000, chunk_overlap=0)
+
+    assert [metadata["offset"] for _, metadata in chunks] == [second_line]
+    assert chunks[0][0].startswith("line 1:")
+
+
+def test_split_text_respects_chunk_size():
+    text = "\n\n".join("paragraph " + str(i) + " " + "text " * 30 for i in range(10))
+
+    chunks = split_text(text, chunk_size=200, chunk_overlap=20)
+
+    assert len(chunks) > 1 and all(len(chunk) <= 200 for chunk in chunks)
+    assert split_text("   \n ") == []
+
+
+def test_content_hash_ignores_whitespace_layout():
+    assert content_hash("a  b\nc") == content_hash("a b c")
+    assert content_hash("a b c") != content_hash("a b d")
@@ -0,0 +1,99 @@
+import json
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+import app as app_module
+from memory.pinecode.vectordb_manager import VectorDBManager
+from memory.vector_backends.faiss_backend import FaissBackend
+
+
+class StubEmbeddings(Embeddings):
+    """Maps each known word to its own axis, so the nearest neighbour is predictable."""
+
+    WORDS = ["paris", "lyon", "tokyo", "osaka"]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [1.0 if word in text.lower() else 0.0 for word in self.WORDS]
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setenv("HYBRID_KEYWORD_INDEX", "false")
+    manager = VectorDBManager("openai", backend=FaissBackend(base_dir=str(tmp_path), index_type="flat"))
+    manager.dimension = len(StubEmbeddings.WORDS)
+    manager._embeddings = StubEmbeddings()
+    monkeypatch.setattr(app_module, "vector_db_manager", manager)
+    return app_module.app.test_client()
+
+
+def _add(client, *words, **options):
+    documents = [{"page_content": f"About {word}", "metadata": {"city": word}, "id": word} for word in words]
+    return client.post("/vectordb/add", json={"documents": documents, **options})
+
+
+def test_create_add_search_and_delete(client):
+    created = client.post("/vectordb/create", json={})
+    assert created.status_code == 200 and created.get_json()["backend"] == "faiss"
+
+    added = _add(client, "paris", "tokyo")
+    assert added.status_code == 200 and added.get_json()["documents"] == 2
+
+    match = client.post("/vectordb/search", json={"query": "tokyo", "top_k": 1}).get_json()["matches"][0]
+    assert match["page_content"] == "About tokyo" and match["metadata"]["city"] == "tokyo"
+
+    assert client.delete("/vectordb/delete", json={}).get_json()["deleted"] is True
+    assert client.delete("/vectordb/delete", json={}).status_code == 404
+
+
+def test_ndjson_upload_is_ingested(client):
+    lines = [json.dumps({"page_content": f"About {word}", "id": word}) for word in ("lyon", "osaka")]
+
+    response = client.post("/vectordb/add?namespace=cities&batch_size=1", data="\n".join(lines),
+                           content_type="application/x-ndjson")
+
+    assert response.status_code == 200 and response.get_json()["batches"] == 2
+    search = client.post("/vectordb/search", json={"query": "osaka", "top_k": 1, "namespace": "cities"})
+    assert search.get_json()["matches"][0]["page_content"] == "About osaka"
+
+
+def test_bad_ndjson_line_is_a_client_error(client):
+    response = client.post("/vectordb/add", data='{"page_content": "About lyon"}\nnot json\n',
+                           content_type="application/x-ndjson")
+
+    assert response.status_code == 400 and "line 2" in response.get_json()["error"]
+
+
+def test_batch_search_answers_each_query(client):
+    _add(client, "paris", "lyon", "tokyo")
+
+    results = client.post("/vectordb/search", json={"queries": ["lyon", "tokyo"], "top_k": 1}).get_json()["results"]
+
+    assert [result["query"] for result in results] == ["lyon", "tokyo"]
+    assert [result["matches"][0]["metadata"]["city"] for result in results] == ["lyon", "tokyo"]
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/vectordb/add", {"documents": []}),
+    ("/vectordb/add", {"documents": ["About paris"]}),
+    ("/vectordb/add", {"documents": [{"page_content": "About paris"}], "batch_size": 0}),
+    ("/vectordb/search", {"query": "  "}),
+    ("/vectordb/search", {"query": "paris", "top_k": app_module.MAX_SEARCH_TOP_K + 1}),
+    ("/vectordb/search", {"queries": ["paris"] * (app_module.MAX_SEARCH_QUERIES + 1)}),
+    ("/vectordb/create", {"index_name": "another-index"}),
+])
+def test_invalid_requests_are_rejected(client, path, body):
+    response = client.post(path, json=body)
+
+    assert response.status_code == 400 and "error" in response.get_json()
+
+
+def test_unconfigured_vector_database_is_unavailable(monkeypatch):
+    monkeypatch.setattr(app_module, "get_vector_db_manager", lambda: None)
+
+    response = app_module.app.test_client().post("/vectordb/search", json={"query": "paris"})
+
+    assert response.status_code == 503
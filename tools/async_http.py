@@ -0,0 +1,47 @@
+"""Shared async HTTP client for the tools.
+
+Tools that call external APIs from their ``_arun`` methods use this client so
+connections are pooled and kept alive across calls instead of being opened per call.
+"""
+
+import asyncio
+import threading
+from typing import Dict
+
+import httpx
+
+# Default timeouts for tool API calls (seconds)
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+# One client per event loop: an httpx.AsyncClient must not be shared across loops
+_clients: Dict[int, httpx.AsyncClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the pooled async HTTP client for the running event loop.
+    
+    Returns:
+        httpx.AsyncClient: A client with keep-alive connection pooling and timeouts.
+    """
+    loop_id = id(asyncio.get_running_loop())
+    client = _clients.get(loop_id)
+    if client is None or client.is_closed:
+        with _clients_lock:
+            client = _clients.get(loop_id)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(
+                    timeout=DEFAULT_TIMEOUT,
+                    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+                )
+                _clients[loop_id] = client
+    return client
+
+
+async def close_async_client() -> None:
+    """Close the client bound to the running event loop, e.g. on server shutdown."""
+    loop_id = id(asyncio.get_running_loop())
+    with _clients_lock:
+        client = _clients.pop(loop_id, None)
+    if client is not None:
+        await client.aclose()
@@ -3,10 +3,56 @@
 This module provides a tool to get facts about cities using the Wikipedia API.
 """
 
+import argparse
+import asyncio
+import os
+import threading
 import wikipediaapi
-from typing import Dict, Any, Optional, Type, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterable, Optional, Type, List
 from pydantic import BaseModel, Field
 from langchain.tools import BaseTool, tool
+from utils.metrics import CACHE_REQUESTS, TOOL_CALL_SECONDS, inc, instrument
+from utils.sqlite_cache import SQLiteCache
+from utils.ttl_cache import TTLCache
+
+# One Wikipedia client (and its HTTP session) shared by every tool instance
+_shared_wiki = None
+_shared_wiki_lock = threading.Lock()
+
+def get_shared_wiki():
+    """Return the process-wide Wikipedia client, creating it on first use."""
+    global _shared_wiki
+    if _shared_wiki is None:
+        with _shared_wiki_lock:
+            if _shared_wiki is None:
+                _shared_wiki = wikipediaapi.Wikipedia('SalesMakerAgent/1.0 (david@example.com)', 'en')
+    return _shared_wiki
+
+# City facts rarely change, so found pages are kept for a long time and misses for a day
+CITY_FACTS_CACHE_TTL = float(os.getenv("CITY_FACTS_CACHE_TTL", str(30 * 24 * 3600)))
+CITY_FACTS_NEGATIVE_TTL = float(os.getenv("CITY_FACTS_NEGATIVE_TTL", str(24 * 3600)))
+
+# Persistent cache, opened on first use so importing the module creates no files
+_disk_cache = None
+_disk_cache_lock = threading.Lock()
+
+# In-process layer: hot cities skip SQLite and concurrent misses share one Wikipedia fetch.
+# Its misses are broken down in the same metric as disk_hit or disk_miss.
+_memory_cache = TTLCache(ttl=3600, max_size=1024, cache_if=lambda result: "error" not in result, name="city_facts")
+
+def get_city_facts_cache() -> SQLiteCache:
+    """Return the persistent city facts cache, opening it on first use."""
+    global _disk_cache
+    if _disk_cache is None:
+        with _disk_cache_lock:
+            if _disk_cache is None:
+                _disk_cache = SQLiteCache(os.getenv("CITY_FACTS_CACHE_PATH", "city_facts_cache.db"), namespace="city_facts")
+    return _disk_cache
+
+def _cache_key(city: str) -> str:
+    """Normalize a city name so case and spacing variants share one entry."""
+    return " ".join(city.split()).lower()
 
 class CityFactsInput(BaseModel):
     """Input for the city facts tool."""
@@ -21,10 +67,10 @@ class CityFactsTool(BaseTool):
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.wiki = wikipediaapi.Wikipedia('SalesMakerAgent/1.0 (david@example.com)', 'en')
+        self.wiki = get_shared_wiki()
     
-    def _run(self, city: str) -> Dict[str, Any]:
-        """Run the city facts tool."""
+    def _fetch(self, city: str) -> Dict[str, Any]:
+        """Fetch and format city facts from Wikipedia."""
         try:
             # Search for the city page
             page = self.wiki.page(f"{city}")
@@ -35,7 +81,7 @@ class CityFactsTool(BaseTool):
             
             # If still doesn't exist, return error
             if not page.exists():
-                return {"error": f"Could not find Wikipedia page for {city}"}
+                return {"error": f"Could not find Wikipedia page for {city}", "not_found": True}
             
             # Get the summary (first section)
             summary = page.summary[0:1500]  # Limit to 1500 chars
@@ -52,10 +98,39 @@ class CityFactsTool(BaseTool):
         except Exception as e:
             return {"error": f"Error fetching city facts: {str(e)}"}
     
+    def _lookup(self, city: str, refresh: bool = False) -> Dict[str, Any]:
+        """Serve city facts from the persistent cache, fetching and storing them on a miss.
+        
+        Found pages and confirmed misses are stored; transient fetch errors are not.
+        """
+        key = _cache_key(city)
+        disk_cache = get_city_facts_cache()
+        if not refresh:
+            cached = disk_cache.get(key)
+            inc(CACHE_REQUESTS, cache="city_facts", result="disk_miss" if cached is None else "disk_hit")
+            if cached is not None:
+                return cached
+        
+        result = self._fetch(city)
+        if "error" not in result:
+            disk_cache.set(key, result, CITY_FACTS_CACHE_TTL)
+        elif result.pop("not_found", False):
+            disk_cache.set(key, result, CITY_FACTS_NEGATIVE_TTL)
+        return result
+    
+    # _arun calls _run in a worker thread, so this covers both paths
+    @instrument(TOOL_CALL_SECONDS, tool="city_facts")
+    def _run(self, city: str) -> Dict[str, Any]:
+        """Run the city facts tool."""
+        return _memory_cache.get_or_compute(_cache_key(city), lambda: self._lookup(city))
+    
     async def _arun(self, city: str) -> Dict[str, Any]:
-        """Run the city facts tool asynchronously."""
-        # For simplicity, we're using the synchronous version
-        return self._run(city)
+        """Run the city facts tool asynchronously.
+        
+        wikipediaapi only offers a blocking client, so the lookup runs in a worker
+        thread and the event loop stays free while Wikipedia responds.
+        """
+        return await asyncio.to_thread(self._run, city)
 
 
 @tool
@@ -72,10 +147,43 @@ def get_city_facts(city: str) -> Dict[str, Any]:
     return city_facts_tool._run(city)
 
 
-# Alternative implementation using LangChain's built-in WikipediaQueryRun tool
-from langchain_community.tools.wikipedia.tool import WikipediaQueryRun
-from langchain_community.utilities.wikipedia import WikipediaAPIWrapper
+def prewarm_city_facts(cities: Iterable[str], max_workers: int = 4, refresh: bool = False) -> Dict[str, int]:
+    """Load facts for a list of cities into the persistent cache up front.
+    
+    Args:
+        cities: City names to load.
+        max_workers: Concurrent Wikipedia fetches; keep this low to be polite to Wikipedia.
+        refresh: Re-fetch cities that are already cached.
+        
+    Returns:
+        Dict with counts of 'cached', 'fetched', 'not_found' and 'errors'.
+    """
+    city_facts_tool = CityFactsTool()
+    disk_cache = get_city_facts_cache()
+    counts = {"cached": 0, "fetched": 0, "not_found": 0, "errors": 0}
+    counts_lock = threading.Lock()
+    
+    def load(city: str) -> None:
+        if not refresh and disk_cache.get(_cache_key(city)) is not None:
+            outcome = "cached"
+        else:
+            result = city_facts_tool._lookup(city, refresh=refresh)
+            if "error" not in result:
+                outcome = "fetched"
+            elif result["error"].startswith("Could not find"):
+                outcome = "not_found"
+            else:
+                outcome = "errors"
+        with counts_lock:
+            counts[outcome] += 1
+    
+    unique_cities = list(dict.fromkeys(city.strip() for city in cities if city.strip()))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(load, unique_cities))
+    return counts
+
 
+# Alternative implementation using LangChain's built-in WikipediaQueryRun tool
 @tool
 def search_wikipedia(query: str) -> str:
     """Search Wikipedia for information about a topic.
@@ -86,6 +194,23 @@ def search_wikipedia(query: str) -> str:
     Returns:
         String containing search results
     """
+    # langchain_community is slow to import and only this fallback needs it
+    from langchain_community.tools.wikipedia.tool import WikipediaQueryRun
+    from langchain_community.utilities.wikipedia import WikipediaAPIWrapper
+    
     wikipedia = WikipediaAPIWrapper(top_k_results=1)
     tool = WikipediaQueryRun(api_wrapper=wikipedia)
-    return tool.run(query)
\ No newline at end of file
+    return tool.run(query)
+
+
+if __name__ == "__main__":
+    # Pre-warm the persistent cache, e.g.: python -m tools.city_facts_tool cities.txt
+    parser = argparse.ArgumentParser(description="Pre-warm the city facts cache from Wikipedia.")
+    parser.add_argument("file", help="Text file with one city name per line")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent Wikipedia fetches")
+    parser.add_argument("--refresh", action="store_true", help="Re-fetch cities that are already cached")
+    args = parser.parse_args()
+    
+    with open(args.file, encoding="utf-8") as f:
+        result = prewarm_city_facts(f, max_workers=args.workers, refresh=args.refresh)
+    print(f"City facts cache pre-warm complete: {result}")
@@ -0,0 +1,102 @@
+import pytest
+
+from tools import city_facts_tool
+from tools.city_facts_tool import CityFactsTool, prewarm_city_facts
+from utils.metrics import CACHE_REQUESTS
+from utils.sqlite_cache import SQLiteCache
+from utils.ttl_cache import TTLCache
+
+
+class StubPage:
+    def __init__(self, title, exists=True):
+        self.title = title
+        self._exists = exists
+        self.summary = f"{title} is a city."
+        self.fullurl = f"https://en.wikipedia.org/wiki/{title}"
+        self.categories = {"Category:Cities": None}
+
+    def exists(self):
+        return self._exists
+
+
+class StubWiki:
+    """Knows a few cities and records every page it was asked for."""
+
+    def __init__(self, known=("Paris", "Lyon"), fail=False):
+        self.known = set(known)
+        self.fail = fail
+        self.requests = []
+
+    def page(self, title):
+        self.requests.append(title)
+        if self.fail:
+            raise ConnectionError("Wikipedia unavailable")
+        return StubPage(title, exists=title in self.known)
+
+
+@pytest.fixture
+def wiki(monkeypatch, tmp_path):
+    stub = StubWiki()
+    monkeypatch.setattr(city_facts_tool, "_disk_cache", SQLiteCache(str(tmp_path / "city_facts.db"), namespace="city_facts"))
+    monkeypatch.setattr(city_facts_tool, "_memory_cache", TTLCache(cache_if=lambda result: "error" not in result))
+    monkeypatch.setattr(city_facts_tool, "get_shared_wiki", lambda: stub)
+    return stub
+
+
+def test_found_city_is_fetched_once(wiki):
+    tool = CityFactsTool()
+
+    first = tool._run("Paris")
+    second = tool._run("  paris ")
+
+    assert first == second and first["title"] == "Paris"
+    assert wiki.requests == ["Paris"]
+
+
+def test_disk_cache_survives_the_memory_cache(wiki, monkeypatch):
+    CityFactsTool()._run("Paris")
+    monkeypatch.setattr(city_facts_tool, "_memory_cache", TTLCache())
+
+    assert CityFactsTool()._run("PARIS")["title"] == "Paris"
+    assert wiki.requests == ["Paris"]
+
+
+def test_missing_city_is_cached_as_not_found(wiki):
+    tool = CityFactsTool()
+
+    result = tool._run("Atlantis")
+    tool._lookup("Atlantis")
+
+    assert result["error"].startswith("Could not find") and "not_found" not in result
+    assert wiki.requests == ["Atlantis", "Atlantis city"]
+
+
+def test_fetch_errors_are_not_cached(wiki):
+    wiki.fail = True
+    assert "error" in CityFactsTool()._run("Paris")
+
+    wiki.fail = False
+    assert CityFactsTool()._run("Paris")["title"] == "Paris"
+
+
+def test_prewarm_counts_outcomes(wiki):
+    CityFactsTool()._run("Paris")
+
+    counts = prewarm_city_facts(["Paris", "Lyon", "Atlantis", "Lyon", " "], max_workers=2)
+
+    assert counts == {"cached": 1, "fetched": 1, "not_found": 1, "errors": 0}
+
+
+def test_lookups_are_counted_by_layer(wiki, monkeypatch):
+    monkeypatch.setattr(city_facts_tool, "_memory_cache", TTLCache(name="city_facts"))
+    counts = {result: CACHE_REQUESTS.labels(cache="city_facts", result=result)
+              for result in ("hit", "miss", "disk_hit", "disk_miss")}
+    before = {result: child.value for result, child in counts.items()}
+
+    CityFactsTool()._run("Paris")
+    CityFactsTool()._run("Paris")
+    monkeypatch.setattr(city_facts_tool, "_memory_cache", TTLCache(name="city_facts"))
+    CityFactsTool()._run("Paris")
+
+    assert {result: child.value - before[result] for result, child in counts.items()} == \
+        {"hit": 1, "miss": 2, "disk_hit": 1, "disk_miss": 1}
@@ -0,0 +1,77 @@
+import pytest
+
+from tools.time_tool import TimeTool
+from tools.timezone_index import (RANK_ALIAS, RANK_GAZETTEER_BASE, TimezoneIndex, build_index_file,
+                                  get_timezone_index, normalize_city)
+
+
+@pytest.fixture(scope="module")
+def index():
+    return get_timezone_index()
+
+
+@pytest.mark.parametrize("city, zone", [
+    ("Paris", "Europe/Paris"),
+    ("new york", "America/New_York"),
+    ("Paris, France", "Europe/Paris"),
+    ("Mexico City", "America/Mexico_City"),
+    ("São Paulo", "America/Sao_Paulo"),
+    ("Zürich", "Europe/Zurich"),
+    ("Kathmandu", "Asia/Kathmandu"),
+    ("Japan", "Asia/Tokyo"),
+])
+def test_exact_and_alias_lookups(index, city, zone):
+    assert index.lookup(city)[1] == zone
+
+
+def test_alias_beats_zone_name(index):
+    # Asia/Calcutta and Asia/Kolkata both exist; the alias table decides Mumbai
+    assert index.lookup("Mumbai") == ("mumbai", "Asia/Kolkata")
+
+
+def test_prefix_and_fuzzy_lookups(index):
+    assert index.lookup("Amsterd")[1] == "Europe/Amsterdam"
+    assert index.lookup("Barcelonna")[1] == "Europe/Madrid"
+    assert index.lookup("Barcelonna", fuzzy=False) is None
+
+
+def test_unknown_and_empty_names(index):
+    assert index.lookup("Xqzvw") is None
+    assert index.lookup("  ,  ") is None
+
+
+def test_best_rank_wins_for_duplicate_names():
+    index = TimezoneIndex([
+        ("springfield", "America/Chicago", RANK_GAZETTEER_BASE + 5),
+        ("springfield", "America/New_York", RANK_GAZETTEER_BASE),
+        ("spring hill", "America/Denver", RANK_ALIAS),
+    ])
+
+    assert index.lookup("Springfield") == ("springfield", "America/New_York")
+    assert index.lookup("Spring")[0] == "spring hill"
+    assert len(index) == 2
+
+
+def test_normalize_city():
+    assert normalize_city("  Saint-Étienne ") == "saint etienne"
+    assert normalize_city("Los_Angeles") == "los angeles"
+
+
+def test_build_index_file_orders_by_population(tmp_path):
+    def row(name, population, zone):
+        cols = [""] * 19
+        cols[1], cols[2], cols[14], cols[17] = name, name, str(population), zone
+        return "\t".join(cols) + "\n"
+
+    geonames = tmp_path / "cities.txt"
+    geonames.write_text(row("Springfield", 100, "America/Chicago") + row("Springfield", 5000, "America/New_York"),
+                        encoding="utf-8")
+    output = tmp_path / "index.tsv"
+
+    assert build_index_file(str(geonames), str(output)) == 2
+    assert output.read_text(encoding="utf-8").splitlines() == ["springfield\tAmerica/New_York", "springfield\tAmerica/Chicago"]
+
+
+def test_time_tool_falls_back_to_utc():
+    assert TimeTool()._run("Tokyo")["timezone"] == "Asia/Tokyo"
+    assert TimeTool()._run("Xqzvw")["timezone"] == "UTC"
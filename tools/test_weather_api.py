@@ -4,8 +4,12 @@ This script demonstrates how to use the weather tool with a valid WeatherAPI.com
 """
 
 import os
+import sys
 from dotenv import load_dotenv
-from weather_tool import get_weather, WeatherTool
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.weather_tool import get_weather, WeatherTool
 
 # Load environment variables
 load_dotenv()
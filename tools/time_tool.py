@@ -3,36 +3,14 @@
 This module provides a tool to get current time information for different cities.
 """
 
-import requests
 import datetime
 import pytz
 from typing import Dict, Any, Optional, Type, List
 from pydantic import BaseModel, Field
 from langchain.tools import BaseTool, tool
-
-# City to timezone mapping
-CITY_TIMEZONES = {
-    "new york": "America/New_York",
-    "london": "Europe/London",
-    "paris": "Europe/Paris",
-    "tokyo": "Asia/Tokyo",
-    "sydney": "Australia/Sydney",
-    "los angeles": "America/Los_Angeles",
-    "chicago": "America/Chicago",
-    "berlin": "Europe/Berlin",
-    "beijing": "Asia/Shanghai",
-    "moscow": "Europe/Moscow",
-    "dubai": "Asia/Dubai",
-    "singapore": "Asia/Singapore",
-    "hong kong": "Asia/Hong_Kong",
-    "toronto": "America/Toronto",
-    "sao paulo": "America/Sao_Paulo",
-    "mumbai": "Asia/Kolkata",
-    "istanbul": "Europe/Istanbul",
-    "rome": "Europe/Rome",
-    "madrid": "Europe/Madrid",
-    "amsterdam": "Europe/Amsterdam",
-}
+from utils.metrics import TOOL_CALL_SECONDS, instrument
+# CITY_TIMEZONES is re-exported for callers that used the old hard-coded mapping
+from tools.timezone_index import CITY_TIMEZONES, get_timezone_index
 
 class TimeInput(BaseModel):
     """Input for the time tool."""
@@ -45,35 +23,25 @@ class TimeTool(BaseTool):
     args_schema: Type[BaseModel] = TimeInput
     
     def _get_timezone(self, city: str) -> Optional[str]:
-        """Get timezone for a city."""
-        city_lower = city.lower()
-        return CITY_TIMEZONES.get(city_lower)
+        """Get timezone for a city from the offline index (exact, prefix or fuzzy match)."""
+        match = get_timezone_index().lookup(city)
+        return match[1] if match else None
     
-    def _run(self, city: str) -> Dict[str, Any]:
-        """Run the time tool."""
-        # Try to get timezone from our mapping
-        timezone_str = self._get_timezone(city)
+    @staticmethod
+    def _format_utc_fallback(city: str) -> Dict[str, Any]:
+        """Report UTC time for a city whose timezone could not be resolved."""
+        utc_datetime = datetime.datetime.now(pytz.UTC)
         
-        if not timezone_str:
-            # If not in our mapping, try to get from WorldTimeAPI
-            try:
-                response = requests.get(f"http://worldtimeapi.org/api/timezone/Etc/UTC")
-                response.raise_for_status()
-                utc_data = response.json()
-                
-                # Return UTC time with a note that city timezone is not available
-                utc_datetime = datetime.datetime.fromisoformat(utc_data["datetime"].replace("Z", "+00:00"))
-                
-                return {
-                    "city": city,
-                    "timezone": "UTC",
-                    "datetime": utc_datetime.strftime("%Y-%m-%d %H:%M:%S"),
-                    "note": f"Timezone for {city} not found. Showing UTC time instead."
-                }
-            except requests.exceptions.RequestException as e:
-                return {"error": f"Error fetching time data: {str(e)}"}
-        
-        # Get time for the timezone
+        return {
+            "city": city,
+            "timezone": "UTC",
+            "datetime": utc_datetime.strftime("%Y-%m-%d %H:%M:%S"),
+            "note": f"Timezone for {city} not found. Showing UTC time instead."
+        }
+    
+    @staticmethod
+    def _format_local_time(city: str, timezone_str: str) -> Dict[str, Any]:
+        """Compute current time details for a city in the given timezone."""
         try:
             timezone = pytz.timezone(timezone_str)
             now = datetime.datetime.now(timezone)
@@ -93,9 +61,21 @@ class TimeTool(BaseTool):
         except Exception as e:
             return {"error": f"Error processing time data: {str(e)}"}
     
+    # _arun calls _run, so this covers both paths
+    @instrument(TOOL_CALL_SECONDS, tool="time")
+    def _run(self, city: str) -> Dict[str, Any]:
+        """Run the time tool. Resolution is a local lookup; no network call is made."""
+        timezone_str = self._get_timezone(city)
+        
+        if not timezone_str:
+            return self._format_utc_fallback(city)
+        
+        # Get time for the timezone
+        return self._format_local_time(city, timezone_str)
+    
     async def _arun(self, city: str) -> Dict[str, Any]:
         """Run the time tool asynchronously."""
-        # For simplicity, we're using the synchronous version
+        # Sub-millisecond local computation with no I/O, so running it inline is fine
         return self._run(city)
 
 
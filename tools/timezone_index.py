@@ -0,0 +1,323 @@
+"""Offline city-to-timezone index for the time tool.
+
+Resolves city names (and common aliases) to IANA timezones without any network call.
+The built-in index is derived from the tz database names shipped with pytz (e.g.
+``Europe/Paris`` -> "paris", ``Asia/Calcutta`` -> "calcutta"), countries with a single
+timezone, and a curated alias table for major cities whose zone is named after another
+city. A larger gazetteer can be built from a GeoNames dump:
+
+    python -m tools.timezone_index build cities15000.txt tools/data/city_timezones.tsv
+
+and is picked up automatically from ``TIMEZONE_INDEX_PATH`` (or the default path above).
+
+The index is loaded lazily on first lookup into sorted parallel arrays, so exact lookups
+and prefix matches are binary searches and fuzzy matching only scans a small slice.
+"""
+
+import argparse
+import bisect
+import difflib
+import os
+import re
+import threading
+import unicodedata
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pytz
+
+# Major cities whose timezone is not named after them (or is ambiguous)
+CITY_TIMEZONES = {
+    "new york": "America/New_York",
+    "london": "Europe/London",
+    "paris": "Europe/Paris",
+    "tokyo": "Asia/Tokyo",
+    "sydney": "Australia/Sydney",
+    "los angeles": "America/Los_Angeles",
+    "chicago": "America/Chicago",
+    "berlin": "Europe/Berlin",
+    "beijing": "Asia/Shanghai",
+    "moscow": "Europe/Moscow",
+    "dubai": "Asia/Dubai",
+    "singapore": "Asia/Singapore",
+    "hong kong": "Asia/Hong_Kong",
+    "toronto": "America/Toronto",
+    "sao paulo": "America/Sao_Paulo",
+    "mumbai": "Asia/Kolkata",
+    "istanbul": "Europe/Istanbul",
+    "rome": "Europe/Rome",
+    "madrid": "Europe/Madrid",
+    "amsterdam": "Europe/Amsterdam",
+    "nyc": "America/New_York",
+    "la": "America/Los_Angeles",
+    "san francisco": "America/Los_Angeles",
+    "seattle": "America/Los_Angeles",
+    "las vegas": "America/Los_Angeles",
+    "san diego": "America/Los_Angeles",
+    "portland": "America/Los_Angeles",
+    "vancouver": "America/Vancouver",
+    "washington": "America/New_York",
+    "washington dc": "America/New_York",
+    "boston": "America/New_York",
+    "philadelphia": "America/New_York",
+    "miami": "America/New_York",
+    "atlanta": "America/New_York",
+    "orlando": "America/New_York",
+    "montreal": "America/Toronto",
+    "ottawa": "America/Toronto",
+    "dallas": "America/Chicago",
+    "houston": "America/Chicago",
+    "austin": "America/Chicago",
+    "new orleans": "America/Chicago",
+    "minneapolis": "America/Chicago",
+    "phoenix": "America/Phoenix",
+    "salt lake city": "America/Denver",
+    "calgary": "America/Edmonton",
+    "honolulu": "Pacific/Honolulu",
+    "rio de janeiro": "America/Sao_Paulo",
+    "brasilia": "America/Sao_Paulo",
+    "barcelona": "Europe/Madrid",
+    "seville": "Europe/Madrid",
+    "milan": "Europe/Rome",
+    "venice": "Europe/Rome",
+    "florence": "Europe/Rome",
+    "naples": "Europe/Rome",
+    "munich": "Europe/Berlin",
+    "frankfurt": "Europe/Berlin",
+    "hamburg": "Europe/Berlin",
+    "cologne": "Europe/Berlin",
+    "geneva": "Europe/Zurich",
+    "edinburgh": "Europe/London",
+    "manchester": "Europe/London",
+    "st petersburg": "Europe/Moscow",
+    "saint petersburg": "Europe/Moscow",
+    "krakow": "Europe/Warsaw",
+    "nice": "Europe/Paris",
+    "lyon": "Europe/Paris",
+    "marseille": "Europe/Paris",
+    "porto": "Europe/Lisbon",
+    "antalya": "Europe/Istanbul",
+    "abu dhabi": "Asia/Dubai",
+    "doha": "Asia/Qatar",
+    "delhi": "Asia/Kolkata",
+    "new delhi": "Asia/Kolkata",
+    "bangalore": "Asia/Kolkata",
+    "bengaluru": "Asia/Kolkata",
+    "chennai": "Asia/Kolkata",
+    "hyderabad": "Asia/Kolkata",
+    "goa": "Asia/Kolkata",
+    "osaka": "Asia/Tokyo",
+    "kyoto": "Asia/Tokyo",
+    "sapporo": "Asia/Tokyo",
+    "busan": "Asia/Seoul",
+    "guangzhou": "Asia/Shanghai",
+    "shenzhen": "Asia/Shanghai",
+    "chengdu": "Asia/Shanghai",
+    "xian": "Asia/Shanghai",
+    "hanoi": "Asia/Bangkok",
+    "ho chi minh city": "Asia/Ho_Chi_Minh",
+    "phuket": "Asia/Bangkok",
+    "bali": "Asia/Makassar",
+    "denpasar": "Asia/Makassar",
+    "cebu": "Asia/Manila",
+    "melbourne": "Australia/Melbourne",
+    "canberra": "Australia/Sydney",
+    "gold coast": "Australia/Brisbane",
+    "wellington": "Pacific/Auckland",
+    "queenstown": "Pacific/Auckland",
+    "cape town": "Africa/Johannesburg",
+    "marrakech": "Africa/Casablanca",
+    "marrakesh": "Africa/Casablanca",
+    "zanzibar": "Africa/Dar_es_Salaam",
+}
+
+# Default location of a prebuilt gazetteer (see ``build_index_file``)
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "city_timezones.tsv")
+
+# Ranks: lower wins when several entries share a name or match a prefix
+RANK_ALIAS = 0
+RANK_GAZETTEER_BASE = 1
+RANK_ZONE_NAME = 1 << 40
+RANK_COUNTRY = RANK_ZONE_NAME + 1
+
+# Top-level tz regions whose zone names are not cities (e.g. US/Eastern)
+_NON_CITY_REGIONS = {"Etc", "US", "Canada", "Mexico", "Brazil", "Chile", "SystemV"}
+
+
+def normalize_city(name: str) -> str:
+    """Normalize a city name: strip accents and punctuation, lowercase, collapse spaces."""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(ch for ch in name if not unicodedata.combining(ch))
+    name = re.sub(r"[^\w\s]", " ", name.replace("_", " ").lower())
+    return " ".join(name.split())
+
+
+def _builtin_entries() -> Iterable[Tuple[str, str, int]]:
+    """Yield (name, zone, rank) entries derived from aliases, tz names and countries."""
+    for name, zone in CITY_TIMEZONES.items():
+        yield normalize_city(name), zone, RANK_ALIAS
+
+    for zone in pytz.all_timezones:
+        parts = zone.split("/")
+        if len(parts) < 2 or parts[0] in _NON_CITY_REGIONS:
+            continue
+        yield normalize_city(parts[-1]), zone, RANK_ZONE_NAME
+
+    for code, zones in pytz.country_timezones.items():
+        if len(zones) == 1 and code in pytz.country_names:
+            yield normalize_city(pytz.country_names[code]), zones[0], RANK_COUNTRY
+
+
+def _file_entries(path: str) -> Iterable[Tuple[str, str, int]]:
+    """Yield (name, zone, rank) entries from a gazetteer TSV built by ``build_index_file``."""
+    with open(path, encoding="utf-8") as f:
+        for rank, line in enumerate(f, start=RANK_GAZETTEER_BASE):
+            name, zone = line.rstrip("\n").split("\t")[:2]
+            yield name, zone, rank
+
+
+class TimezoneIndex:
+    """Sorted, compact name -> IANA zone index with exact, prefix and fuzzy lookup."""
+
+    def __init__(self, entries: Iterable[Tuple[str, str, int]]):
+        """Build the index, keeping the best-ranked zone for each name.
+
+        Args:
+            entries: (normalized name, zone, rank) tuples; lower rank wins.
+        """
+        best: Dict[str, Tuple[int, str]] = {}
+        for name, zone, rank in entries:
+            if name and (name not in best or rank < best[name][0]):
+                best[name] = (rank, zone)
+
+        self.zones: List[str] = sorted({zone for _, zone in best.values()})
+        zone_ids = {zone: i for i, zone in enumerate(self.zones)}
+        self.names: List[str] = sorted(best)
+        self.zone_ids = array("H", (zone_ids[best[name][1]] for name in self.names))
+        self.ranks = array("q", (best[name][0] for name in self.names))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _exact(self, name: str) -> Optional[int]:
+        pos = bisect.bisect_left(self.names, name)
+        if pos < len(self.names) and self.names[pos] == name:
+            return pos
+        return None
+
+    def _prefix_range(self, prefix: str) -> Tuple[int, int]:
+        start = bisect.bisect_left(self.names, prefix)
+        end = bisect.bisect_left(self.names, prefix + "\uffff")
+        return start, end
+
+    def lookup(self, city: str, fuzzy: bool = True) -> Optional[Tuple[str, str]]:
+        """Resolve a city to (matched name, IANA zone).
+
+        Tries an exact match, then the part before a comma ("Paris, France") or without a
+        trailing "city", then the best-ranked name starting with the query, then a close
+        spelling match.
+
+        Returns:
+            Tuple of (matched name, zone), or None if nothing matches.
+        """
+        name = normalize_city(city)
+        if not name:
+            return None
+
+        candidates = [name]
+        if "," in city:
+            candidates.append(normalize_city(city.split(",")[0]))
+        if candidates[-1].endswith(" city"):
+            candidates.append(candidates[-1][:-len(" city")])
+        for candidate in candidates:
+            pos = self._exact(candidate)
+            if pos is not None:
+                return self.names[pos], self.zones[self.zone_ids[pos]]
+
+        if len(name) >= 4:
+            start, end = self._prefix_range(name)
+            if start < end:
+                pos = min(range(start, end), key=lambda i: self.ranks[i])
+                return self.names[pos], self.zones[self.zone_ids[pos]]
+
+        if fuzzy and len(name) >= 3:
+            # Only compare against names sharing the first two letters to stay sub-millisecond
+            start, end = self._prefix_range(name[:2])
+            matches = difflib.get_close_matches(name, self.names[start:end], n=1, cutoff=0.85)
+            if matches:
+                pos = self._exact(matches[0])
+                return self.names[pos], self.zones[self.zone_ids[pos]]
+
+        return None
+
+
+_index: Optional[TimezoneIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_timezone_index() -> TimezoneIndex:
+    """Return the process-wide index, building it on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                entries = list(_builtin_entries())
+                path = os.getenv("TIMEZONE_INDEX_PATH", DEFAULT_INDEX_PATH)
+                if os.path.exists(path):
+                    entries.extend(_file_entries(path))
+                _index = TimezoneIndex(entries)
+    return _index
+
+
+def build_index_file(geonames_path: str, output_path: str, include_alternate_names: bool = False) -> int:
+    """Build a gazetteer TSV from a GeoNames ``citiesNNNN.txt`` dump.
+
+    Rows are written most populous first, so a row's line number is its rank.
+
+    Args:
+        geonames_path: Path to a GeoNames cities file (tab-separated, 19 columns).
+        output_path: Where to write the ``name<TAB>zone`` index.
+        include_alternate_names: Also index GeoNames alternate names (larger index).
+
+    Returns:
+        Number of rows written.
+    """
+    rows = []
+    with open(geonames_path, encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) < 18 or not cols[17]:
+                continue
+            population = int(cols[14] or 0)
+            names = {cols[1], cols[2]}
+            if include_alternate_names and cols[3]:
+                names.update(cols[3].split(","))
+            for name in names:
+                normalized = normalize_city(name)
+                if normalized:
+                    rows.append((population, normalized, cols[17]))
+
+    rows.sort(key=lambda row: -row[0])
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        for _, name, zone in rows:
+            f.write(f"{name}\t{zone}\n")
+    return len(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the offline city timezone index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="Build the index from a GeoNames cities file")
+    build_parser.add_argument("geonames_path")
+    build_parser.add_argument("output_path", nargs="?", default=DEFAULT_INDEX_PATH)
+    build_parser.add_argument("--alternate-names", action="store_true", help="Also index alternate names")
+    lookup_parser = subparsers.add_parser("lookup", help="Resolve a city name")
+    lookup_parser.add_argument("city")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        count = build_index_file(args.geonames_path, args.output_path, args.alternate_names)
+        print(f"Wrote {count} entries to {args.output_path}")
+    else:
+        print(get_timezone_index().lookup(args.city))
@@ -4,15 +4,44 @@ This module provides a tool to get weather information using the WeatherAPI.com
 """
 
 import os
+import httpx
 import requests
-from typing import Dict, Any, Optional, Type
+from typing import Dict, Any, Optional, Type, Union
 from pydantic import BaseModel, Field
 from langchain.tools import BaseTool, tool
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from tools.async_http import get_async_client
+from utils.metrics import TOOL_CALL_SECONDS, instrument
+from utils.ttl_cache import TTLCache
 
 # Load environment variables
 load_dotenv()
 
+# (connect, read) timeouts for WeatherAPI.com calls, in seconds
+WEATHER_REQUEST_TIMEOUT = (3.05, 10)
+
+# Pooled keep-alive session shared by every WeatherTool call
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+
+# Shared cache of successful lookups; error results are never cached
+weather_cache = TTLCache(
+    ttl=float(os.getenv("WEATHER_CACHE_TTL", "600")),
+    max_size=int(os.getenv("WEATHER_CACHE_MAX_SIZE", "2048")),
+    cache_if=lambda result: "error" not in result,
+    name="weather"
+)
+
+def _cache_key(city: str, country: Optional[str] = None) -> tuple:
+    """Normalize (city, country) so 'paris', ' Paris ' and 'PARIS' share one entry."""
+    return (" ".join(city.split()).lower(), (country or "").strip().upper())
+
+def get_weather_cache_stats() -> Dict[str, Any]:
+    """Return hit-rate and coalescing metrics for the weather cache."""
+    return weather_cache.stats()
+
 class WeatherInput(BaseModel):
     """Input for the weather tool."""
     city: str = Field(..., description="The city to get weather for")
@@ -24,8 +53,8 @@ class WeatherTool(BaseTool):
     description: str = "Useful for getting current weather information for a specific city. Input should be a city name."
     args_schema: Type[BaseModel] = WeatherInput
     
-    def _run(self, city: str, country: Optional[str] = None) -> Dict[str, Any]:
-        """Run the weather tool."""
+    def _build_url(self, city: str, country: Optional[str] = None) -> Union[str, Dict[str, Any]]:
+        """Build the WeatherAPI.com request URL, or return an error dict if the key is missing."""
         api_key = os.getenv("WEATHERAPI_KEY")
         if not api_key:
             return {"error": "WeatherAPI.com API key not found. Please set the WEATHERAPI_KEY environment variable."}
@@ -35,41 +64,72 @@ class WeatherTool(BaseTool):
             return {"error": "Please set a valid WeatherAPI.com API key in your .env file. Sign up at https://www.weatherapi.com/my/ to get a free API key."}
         
         location = f"{city},{country}" if country else city
-        url = f"http://api.weatherapi.com/v1/current.json?key={api_key}&q={location}"
-        
+        return f"http://api.weatherapi.com/v1/current.json?key={api_key}&q={location}"
+    
+    @staticmethod
+    def _format_weather(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Format a WeatherAPI.com response into the tool's output shape."""
+        return {
+            "city": data["location"]["name"],
+            "country": data["location"]["country"],
+            "temperature": f"{data['current']['temp_c']:.1f}°C",
+            "feels_like": f"{data['current']['feelslike_c']:.1f}°C",
+            "humidity": f"{data['current']['humidity']}%",
+            "pressure": f"{data['current']['pressure_mb']} hPa",
+            "weather": data["current"]["condition"]["text"],
+            "description": data["current"]["condition"]["text"],
+            "wind_speed": f"{data['current']['wind_kph']} km/h"
+        }
+    
+    @staticmethod
+    def _format_http_error(status_code: int, error: Exception) -> Dict[str, Any]:
+        """Map an HTTP error status from WeatherAPI.com to an error dict."""
+        if status_code == 401:
+            return {"error": "Invalid WeatherAPI.com API key. Please check your API key and try again."}
+        elif status_code == 403:
+            return {"error": "Access to WeatherAPI.com is forbidden. Your API key may have exceeded its quota."}
+        else:
+            return {"error": f"HTTP error from WeatherAPI.com: {str(error)}"}
+    
+    def _fetch(self, url: str) -> Dict[str, Any]:
+        """Call WeatherAPI.com on the pooled session."""
         try:
-            response = requests.get(url)
+            response = _session.get(url, timeout=WEATHER_REQUEST_TIMEOUT)
             response.raise_for_status()
-            data = response.json()
-            
-            # Format the weather data
-            weather_data = {
-                "city": data["location"]["name"],
-                "country": data["location"]["country"],
-                "temperature": f"{data['current']['temp_c']:.1f}°C",
-                "feels_like": f"{data['current']['feelslike_c']:.1f}°C",
-                "humidity": f"{data['current']['humidity']}%",
-                "pressure": f"{data['current']['pressure_mb']} hPa",
-                "weather": data["current"]["condition"]["text"],
-                "description": data["current"]["condition"]["text"],
-                "wind_speed": f"{data['current']['wind_kph']} km/h"
-            }
-            
-            return weather_data
+            return self._format_weather(response.json())
         except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 401:
-                return {"error": "Invalid WeatherAPI.com API key. Please check your API key and try again."}
-            elif e.response.status_code == 403:
-                return {"error": "Access to WeatherAPI.com is forbidden. Your API key may have exceeded its quota."}
-            else:
-                return {"error": f"HTTP error from WeatherAPI.com: {str(e)}"}
+            return self._format_http_error(e.response.status_code, e)
         except requests.exceptions.RequestException as e:
             return {"error": f"Error fetching weather data: {str(e)}"}
     
+    async def _afetch(self, url: str) -> Dict[str, Any]:
+        """Call WeatherAPI.com on the pooled async client."""
+        try:
+            response = await get_async_client().get(url)
+            response.raise_for_status()
+            return self._format_weather(response.json())
+        except httpx.HTTPStatusError as e:
+            return self._format_http_error(e.response.status_code, e)
+        except httpx.HTTPError as e:
+            return {"error": f"Error fetching weather data: {str(e)}"}
+    
+    @instrument(TOOL_CALL_SECONDS, tool="weather")
+    def _run(self, city: str, country: Optional[str] = None) -> Dict[str, Any]:
+        """Run the weather tool, serving repeat lookups from the shared cache."""
+        url = self._build_url(city, country)
+        if isinstance(url, dict):
+            return url
+        
+        return weather_cache.get_or_compute(_cache_key(city, country), lambda: self._fetch(url))
+    
+    @instrument(TOOL_CALL_SECONDS, tool="weather")
     async def _arun(self, city: str, country: Optional[str] = None) -> Dict[str, Any]:
-        """Run the weather tool asynchronously."""
-        # For simplicity, we're using the synchronous version
-        return self._run(city, country)
+        """Run the weather tool asynchronously without blocking the event loop."""
+        url = self._build_url(city, country)
+        if isinstance(url, dict):
+            return url
+        
+        return await weather_cache.aget_or_compute(_cache_key(city, country), lambda: self._afetch(url))
 
 
 @tool
@@ -0,0 +1,57 @@
+"""Bridge between synchronous callers (Flask) and the async agent code.
+
+A single background event loop runs in a daemon thread for the whole process.
+Sync code submits coroutines or async generators to it instead of creating a new
+event loop per request, so loop-bound resources such as pooled async HTTP clients
+are shared by every request.
+"""
+
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Coroutine, Iterator, Optional
+
+
+class BackgroundEventLoop:
+    """An asyncio event loop running forever in a daemon thread."""
+    
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+    
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        """Return the background loop, starting its thread on first use."""
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    thread = threading.Thread(target=loop.run_forever, name="async-bridge", daemon=True)
+                    thread.start()
+                    self._thread = thread
+                    self._loop = loop
+        return self._loop
+    
+    def run(self, coro: Coroutine) -> Any:
+        """Run a coroutine on the background loop and block until it finishes."""
+        return asyncio.run_coroutine_threadsafe(coro, self.get_loop()).result()
+    
+    def iterate(self, agen: AsyncIterator) -> Iterator:
+        """Iterate an async generator from synchronous code.
+        
+        Each item is produced on the background loop and handed back as soon as it is
+        ready. If the caller stops early (e.g. the HTTP client disconnects), the async
+        generator is closed on the loop so its cleanup still runs.
+        """
+        loop = self.get_loop()
+        try:
+            while True:
+                try:
+                    yield asyncio.run_coroutine_threadsafe(agen.__anext__(), loop).result()
+                except StopAsyncIteration:
+                    break
+        finally:
+            asyncio.run_coroutine_threadsafe(agen.aclose(), loop).result()
+
+
+# Loop shared by every sync caller in the process
+background_loop = BackgroundEventLoop()
@@ -0,0 +1,129 @@
+"""Micro-batching for single-text embedding calls.
+
+Concurrent searches each embed one query string. ``BatchingEmbeddings`` queues those
+calls for up to ``max_wait_ms`` (or until ``max_batch_size`` texts are waiting), sends
+them to the provider as one batched request, and hands each caller its own vector.
+Multi-text calls (ingestion) are already batched and go straight to the model.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from utils.metrics import (EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_SIZE_BUCKETS, EMBEDDING_QUEUE_WAIT_SECONDS,
+                           Histogram, observe)
+
+BATCH_SIZE_BUCKETS = EMBEDDING_BATCH_SIZE_BUCKETS
+# EMBEDDING_QUEUE_WAIT_BUCKETS in milliseconds, for the per-batcher stats
+QUEUE_WAIT_MS_BUCKETS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250)
+
+
+class BatchingEmbeddings(Embeddings):
+    """Wraps an embedding model so concurrent ``embed_query`` calls share provider requests."""
+
+    def __init__(self, embeddings: Embeddings, max_batch_size: int = 32, max_wait_ms: float = 5.0,
+                 workers: int = 2, batch_fn: Optional[Callable[[List[str]], List[List[float]]]] = None):
+        """Initialize the batcher.
+
+        Args:
+            embeddings: The embedding model to wrap.
+            max_batch_size: Most texts sent in one provider request.
+            max_wait_ms: How long the first queued text waits for others to join its batch.
+            workers: Batches that may be in flight at once.
+            batch_fn: Function embedding a list of query texts. Defaults to
+                ``embeddings.embed_documents``; override it for providers that embed
+                queries differently from documents.
+        """
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.workers = workers
+        self.batch_fn = batch_fn or embeddings.embed_documents
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_MS_BUCKETS)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+        self._errors = 0
+
+    def _ensure_started(self) -> None:
+        if self._threads:
+            return
+        with self._start_lock:
+            if not self._threads:
+                for index in range(self.workers):
+                    thread = threading.Thread(target=self._run, name=f"embedding-batcher-{index}", daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+
+    def submit(self, text: str) -> Future:
+        """Queue one text and return a future for its vector."""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def _collect(self) -> list:
+        """Block for the first request, then gather more until the batch is full or the wait ends."""
+        first = self._queue.get()
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            dispatched = time.perf_counter()
+            for _, _, enqueued in batch:
+                self.queue_wait_ms.observe((dispatched - enqueued) * 1000)
+                observe(EMBEDDING_QUEUE_WAIT_SECONDS, dispatched - enqueued)
+            # Identical concurrent queries are embedded once
+            texts = list(dict.fromkeys(text for text, _, _ in batch))
+            self.batch_sizes.observe(len(texts))
+            observe(EMBEDDING_BATCH_SIZE, len(texts))
+            try:
+                vectors = self.batch_fn(texts)
+                if len(vectors) != len(texts):
+                    raise ValueError(f"Embedding batch returned {len(vectors)} vectors for {len(texts)} texts")
+                by_text = dict(zip(texts, vectors))
+                for text, future, _ in batch:
+                    future.set_result(list(by_text[text]))
+            except Exception as e:
+                self._errors += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.submit(text).result()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.wrap_future(self.submit(text))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return batch-size and queue-wait histograms plus the current queue depth."""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queue_depth": self._queue.qsize(),
+            "errors": self._errors,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
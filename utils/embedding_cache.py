@@ -0,0 +1,215 @@
+"""Content-addressed embedding cache.
+
+Vectors are keyed by (provider, model, kind, sha256(text)) and stored as float32 blobs
+in SQLite, so re-ingesting a corpus or repeating a query never re-embeds identical text.
+The kind ('query' or 'document') keeps the two apart, since some providers embed queries
+and documents differently (e.g. Gemini's retrieval task types).
+The cache is capped at ``max_entries``; the least recently used vectors are evicted.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+from langchain_core.embeddings import Embeddings
+
+from utils.metrics import CACHE_REQUESTS, inc
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH = 500
+
+
+def _pack(vector: Sequence[float]) -> bytes:
+    return array('f', vector).tobytes()
+
+
+def _unpack(blob: bytes) -> List[float]:
+    values = array('f')
+    values.frombytes(blob)
+    return values.tolist()
+
+
+class EmbeddingCacheStore:
+    """SQLite store of float32 vectors with an LRU size cap."""
+
+    def __init__(self, db_path: str, max_entries: int = 200000):
+        """Initialize the store.
+
+        Args:
+            db_path: Path of the SQLite database file (created if missing).
+            max_entries: Maximum number of vectors kept across all models.
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)")
+        self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Return the cached vectors for ``keys`` (missing keys are left out)."""
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(keys))
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(unique), _SQL_BATCH):
+                chunk = unique[start:start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk).fetchall()
+                for key, blob in rows:
+                    found[key] = _unpack(blob)
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_access = ? WHERE key IN ({','.join('?' * len(rows))})",
+                        [now] + [key for key, _ in rows])
+            self._hits += len(found)
+            self._misses += len(unique) - len(found)
+        inc(CACHE_REQUESTS, len(found), cache="embedding", result="hit")
+        inc(CACHE_REQUESTS, len(unique) - len(found), cache="embedding", result="miss")
+        return found
+
+    def set_many(self, items: Dict[str, Sequence[float]]) -> None:
+        """Store vectors, evicting the least recently used entries past the size cap."""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                    [(key, _pack(vector), now) for key, vector in items.items()])
+                self._size += self._conn.total_changes - before
+                if self._size > self.max_entries:
+                    # Evict down to 90% of the cap so eviction doesn't run on every insert
+                    excess = self._size - int(self.max_entries * 0.9)
+                    self._conn.execute(
+                        "DELETE FROM embeddings WHERE key IN "
+                        "(SELECT key FROM embeddings ORDER BY last_access LIMIT ?)", (excess,))
+                    self._size -= excess
+                    self._evictions += excess
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def clear(self) -> None:
+        """Remove every cached vector."""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._size = 0
+
+    def stats(self) -> Dict[str, object]:
+        """Return size, hit/miss and eviction counters."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "path": self.db_path,
+                "size": self._size,
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps any LangChain embedding model with a content-hash vector cache.
+
+    Only texts missing from the cache are sent to the underlying model, in one call.
+    """
+
+    def __init__(self, embeddings: Embeddings, store: EmbeddingCacheStore, provider: str, model: str):
+        """Initialize the wrapper.
+
+        Args:
+            embeddings: The embedding model to wrap.
+            store: Vector store shared by all wrapped models.
+            provider: Provider name, part of the cache key.
+            model: Model name, part of the cache key.
+        """
+        self.embeddings = embeddings
+        self.store = store
+        self.prefix = f"{provider}:{model}:"
+
+    def _key(self, text: str, kind: str = "document") -> str:
+        return f"{self.prefix}{kind}:" + hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _lookup(self, texts: List[str]):
+        keys = [self._key(text) for text in texts]
+        cached = self.store.get_many(keys)
+        # Embed each distinct missing text once
+        missing = list(dict.fromkeys(text for text, key in zip(texts, keys) if key not in cached))
+        return keys, cached, missing
+
+    def _merge(self, texts: List[str], keys: List[str], cached: Dict[str, List[float]],
+               missing: List[str], vectors: List[List[float]]) -> List[List[float]]:
+        new = {self._key(text): list(vector) for text, vector in zip(missing, vectors)}
+        self.store.set_many(new)
+        cached.update(new)
+        return [cached[key] for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, cached, missing = self._lookup(texts)
+        vectors = self.embeddings.embed_documents(missing) if missing else []
+        return self._merge(texts, keys, cached, missing, vectors)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text, "query")
+        cached = self.store.get_many([key])
+        if key in cached:
+            return cached[key]
+        vector = list(self.embeddings.embed_query(text))
+        self.store.set_many({key: vector})
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, cached, missing = await asyncio.to_thread(self._lookup, texts)
+        vectors = await self.embeddings.aembed_documents(missing) if missing else []
+        return await asyncio.to_thread(self._merge, texts, keys, cached, missing, vectors)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = self._key(text, "query")
+        cached = await asyncio.to_thread(self.store.get_many, [key])
+        if key in cached:
+            return cached[key]
+        vector = list(await self.embeddings.aembed_query(text))
+        await asyncio.to_thread(self.store.set_many, {key: vector})
+        return vector
+
+
+# Process-wide store, opened on first use so importing the module creates no files
+_store: Optional[EmbeddingCacheStore] = None
+_store_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCacheStore]:
+    """Return the shared embedding cache, or None when EMBEDDING_CACHE_ENABLED is false."""
+    global _store
+    if os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = EmbeddingCacheStore(
+                    os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.db"),
+                    max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+                )
+    return _store
@@ -0,0 +1,72 @@
+"""Measure a module's import time and check it against a budget.
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter, so nothing
+is already cached in ``sys.modules``, and reports the slowest imports:
+
+    python -m utils.import_budget app --budget-ms 1000
+    python -m utils.import_budget asgi_app --top 20
+
+Exits with status 1 when the total exceeds the budget, so it can gate CI or a
+container build.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+# (cumulative microseconds, nesting depth, module name)
+ImportTiming = Tuple[int, int, str]
+
+
+def measure_imports(module: str, cwd: str = ".") -> List[ImportTiming]:
+    """Import ``module`` in a subprocess and return one timing per imported module.
+
+    Raises:
+        RuntimeError: If the import fails.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr.strip()[-2000:]}")
+
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        timings.append((int(cumulative), depth, name.strip()))
+    return timings
+
+
+def total_ms(timings: List[ImportTiming]) -> float:
+    """Wall time of the whole import: the sum of the top-level modules' cumulative times."""
+    return sum(cumulative for cumulative, depth, _ in timings if depth == 0) / 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check a module's import time against a budget.")
+    parser.add_argument("module", nargs="?", default="app", help="Module to import (default: app)")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_MS", "1000")),
+                        help="Maximum total import time in milliseconds")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to list")
+    args = parser.parse_args()
+
+    timings = measure_imports(args.module)
+    total = total_ms(timings)
+    print(f"Slowest imports for {args.module} (cumulative ms):")
+    for cumulative, depth, name in sorted(timings, reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:9.1f}  {'  ' * depth}{name}")
+    print(f"Total import time: {total:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    if total > args.budget_ms:
+        print("Import time budget exceeded")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""Lightweight in-process metrics.
+
+``Histogram`` and ``Counter`` are plain thread-safe accumulators. ``MetricsRegistry``
+groups them into labelled families and renders them in the Prometheus text format for
+the ``/metrics`` endpoint. Set METRICS_ENABLED=false to turn every ``timed`` block,
+``instrument`` decorator and ``inc`` call into a no-op.
+"""
+
+import asyncio
+import bisect
+import contextlib
+import functools
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Seconds; covers sub-millisecond cache hits up to slow multi-step agent runs
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Texts per batched embedding request, and seconds a query waited to join its batch
+EMBEDDING_BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+EMBEDDING_QUEUE_WAIT_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+
+class Histogram:
+    """Thread-safe fixed-bucket histogram (Prometheus-style cumulative ``le`` buckets)."""
+
+    def __init__(self, buckets: Sequence[float]):
+        """Initialize the histogram.
+
+        Args:
+            buckets: Increasing upper bounds; values above the last bound fall in ``+Inf``.
+        """
+        self.buckets = list(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Record one value."""
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the ``q`` quantile as the upper bound of the bucket that contains it."""
+        with self._lock:
+            if not self._count:
+                return None
+            target = q * self._count
+            seen = 0
+            for bound, count in zip(self.buckets + [float("inf")], self._counts):
+                seen += count
+                if seen >= target:
+                    return bound
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return count, sum, mean and cumulative bucket counts."""
+        with self._lock:
+            cumulative = {}
+            seen = 0
+            for bound, count in zip(self.buckets, self._counts):
+                seen += count
+                cumulative[str(bound)] = seen
+            cumulative["+Inf"] = self._count
+            return {
+                "count": self._count,
+                "sum": self._sum,
+                "mean": self._sum / self._count if self._count else 0.0,
+                "buckets": cumulative,
+            }
+
+
+class Counter:
+    """Thread-safe monotonically increasing counter."""
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class MetricFamily:
+    """A named metric with one child Histogram or Counter per label combination."""
+
+    def __init__(self, name: str, documentation: str, kind: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels: Any):
+        """Return the child for these label values, creating it on first use."""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = Histogram(self.buckets) if self.kind == "histogram" else Counter()
+                    self._children[key] = child
+        return child
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for key, child in sorted(list(self._children.items())):
+            pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+            if self.kind == "counter":
+                yield f"{self.name}{_label_text(pairs)} {child.value}"
+                continue
+            snapshot = child.snapshot()
+            for bound, count in snapshot["buckets"].items():
+                le = 'le="%s"' % bound
+                yield f"{self.name}_bucket{_label_text(pairs + [le])} {count}"
+            yield f"{self.name}_sum{_label_text(pairs)} {snapshot['sum']}"
+            yield f"{self.name}_count{_label_text(pairs)} {snapshot['count']}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(pairs: Sequence[str]) -> str:
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class MetricsRegistry:
+    """Collection of metric families rendered together at ``/metrics``."""
+
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, family: MetricFamily) -> MetricFamily:
+        with self._lock:
+            return self._families.setdefault(family.name, family)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> MetricFamily:
+        return self._register(MetricFamily(name, documentation, "histogram", labelnames, buckets))
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._register(MetricFamily(name, documentation, "counter", labelnames))
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        with self._lock:
+            families = list(self._families.values())
+        lines = [line for family in families for line in family.render()]
+        return "\n".join(lines) + "\n"
+
+
+@contextlib.contextmanager
+def timed(family: MetricFamily, **labels: Any) -> Iterator[None]:
+    """Observe the duration of the ``with`` block, in seconds, on a histogram family."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        family.labels(**labels).observe(time.perf_counter() - start)
+
+
+def instrument(family: MetricFamily, **labels: Any) -> Callable:
+    """Decorator form of ``timed`` for sync and async functions.
+
+    When metrics are disabled the function is returned unwrapped, so it costs nothing.
+    """
+    def decorator(func: Callable) -> Callable:
+        if not METRICS_ENABLED:
+            return func
+        child = family.labels(**labels)
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    child.observe(time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def observe(family: MetricFamily, value: float, **labels: Any) -> None:
+    """Record one value on a histogram family."""
+    if METRICS_ENABLED:
+        family.labels(**labels).observe(value)
+
+
+def inc(family: MetricFamily, amount: float = 1.0, **labels: Any) -> None:
+    """Increase a counter family."""
+    if METRICS_ENABLED and amount:
+        family.labels(**labels).inc(amount)
+
+
+# Process-wide registry exported at /metrics
+registry = MetricsRegistry()
+
+REQUEST_SECONDS = registry.histogram(
+    "orchestra_request_seconds", "HTTP request handling time", ("endpoint", "method"))
+AGENT_QUERY_SECONDS = registry.histogram(
+    "orchestra_agent_query_seconds", "Time to answer one agent query, streaming included",
+    ("provider", "mode", "streaming"))
+LLM_CALL_SECONDS = registry.histogram(
+    "orchestra_llm_call_seconds", "Duration of one LLM call", ("provider", "status"))
+TIME_TO_FIRST_TOKEN_SECONDS = registry.histogram(
+    "orchestra_llm_time_to_first_token_seconds", "Time from a streaming LLM call to its first token", ("provider",))
+TOOL_CALL_SECONDS = registry.histogram(
+    "orchestra_tool_call_seconds", "Duration of one tool call", ("tool",))
+EMBEDDING_SECONDS = registry.histogram(
+    "orchestra_embedding_seconds", "Duration of one embedding provider request", ("provider", "kind"))
+VECTOR_QUERY_SECONDS = registry.histogram(
+    "orchestra_vector_query_seconds", "Duration of one vector database search", ("backend", "mode"))
+EMBEDDING_BATCH_SIZE = registry.histogram(
+    "orchestra_embedding_batch_size", "Query texts sent in one batched embedding request",
+    buckets=EMBEDDING_BATCH_SIZE_BUCKETS)
+EMBEDDING_QUEUE_WAIT_SECONDS = registry.histogram(
+    "orchestra_embedding_queue_wait_seconds", "Time a query embedding waited to join a batch",
+    buckets=EMBEDDING_QUEUE_WAIT_BUCKETS)
+LLM_TOKENS = registry.counter(
+    "orchestra_llm_tokens_total", "Tokens sent to and received from LLM providers", ("provider", "direction"))
+CACHE_REQUESTS = registry.counter(
+    "orchestra_cache_requests_total", "Cache lookups by cache and result", ("cache", "result"))
+PIPELINE_ERRORS = registry.counter(
+    "orchestra_pipeline_errors_total", "Document pipeline steps that failed and were skipped or retried",
+    ("pipeline", "stage", "outcome"))
+LLM_FAILOVERS = registry.counter(
+    "orchestra_llm_failovers_total", "LLM router calls that failed over to another provider", ("provider", "reason"))
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from utils.embedding_batcher import BatchingEmbeddings
+from utils.metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_QUEUE_WAIT_SECONDS
+
+
+class StubEmbeddings(Embeddings):
+    """Records the batches it was sent; each vector encodes its text's length."""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+        if self.fail:
+            raise ConnectionError("embedding service unavailable")
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def _embed_concurrently(batcher, texts):
+    with ThreadPoolExecutor(max_workers=len(texts)) as pool:
+        return list(pool.map(batcher.embed_query, texts))
+
+
+def test_concurrent_queries_share_provider_requests():
+    model = StubEmbeddings()
+    batcher = BatchingEmbeddings(model, max_batch_size=32, max_wait_ms=50, workers=1)
+    texts = [f"query {i}" * (i + 1) for i in range(16)]
+
+    vectors = _embed_concurrently(batcher, texts)
+
+    assert vectors == [[float(len(text)), 1.0] for text in texts]
+    assert len(model.batches) < len(texts)
+    assert sorted(text for batch in model.batches for text in batch) == sorted(texts)
+
+
+def test_identical_queries_are_embedded_once():
+    model = StubEmbeddings()
+    batcher = BatchingEmbeddings(model, max_wait_ms=50, workers=1)
+
+    vectors = _embed_concurrently(batcher, ["paris"] * 8)
+
+    assert vectors == [[5.0, 1.0]] * 8
+    assert sum(batch.count("paris") for batch in model.batches) < 8
+
+
+def test_batches_respect_max_batch_size():
+    model = StubEmbeddings()
+    batcher = BatchingEmbeddings(model, max_batch_size=4, max_wait_ms=50, workers=1)
+
+    _embed_concurrently(batcher, [f"query {i}" for i in range(12)])
+
+    assert max(len(batch) for batch in model.batches) <= 4
+    assert batcher.stats()["batch_size"]["count"] == len(model.batches)
+
+
+def test_errors_reach_every_caller():
+    batcher = BatchingEmbeddings(StubEmbeddings(fail=True), max_wait_ms=20, workers=1)
+
+    futures = [batcher.submit(f"query {i}") for i in range(3)]
+
+    for future in futures:
+        with pytest.raises(ConnectionError):
+            future.result(timeout=5)
+    assert batcher.stats()["errors"] >= 1
+
+
+def test_wrong_vector_count_is_an_error():
+    batcher = BatchingEmbeddings(StubEmbeddings(), max_wait_ms=1, batch_fn=lambda texts: [])
+
+    with pytest.raises(ValueError):
+        batcher.embed_query("paris")
+
+
+def test_async_queries_are_batched():
+    model = StubEmbeddings()
+    batcher = BatchingEmbeddings(model, max_wait_ms=50, workers=1)
+
+    async def main():
+        return await asyncio.gather(*(batcher.aembed_query(f"q{i}") for i in range(6)))
+
+    assert asyncio.run(main()) == [[2.0, 1.0]] * 6
+    assert len(model.batches) < 6
+
+
+def test_document_batches_bypass_the_queue():
+    model = StubEmbeddings()
+    batcher = BatchingEmbeddings(model)
+
+    assert batcher.embed_documents(["a", "bb"]) == [[1.0, 1.0], [2.0, 1.0]]
+    assert model.batches == [["a", "bb"]]
+    assert batcher.stats()["batch_size"]["count"] == 0
+
+
+def test_batches_are_exported_as_metrics():
+    before = EMBEDDING_BATCH_SIZE.labels().snapshot()["count"], EMBEDDING_QUEUE_WAIT_SECONDS.labels().snapshot()["count"]
+    batcher = BatchingEmbeddings(StubEmbeddings(), max_wait_ms=20, workers=1)
+
+    _embed_concurrently(batcher, ["paris", "lyon", "tokyo"])
+
+    assert EMBEDDING_BATCH_SIZE.labels().snapshot()["count"] - before[0] == batcher.stats()["batch_size"]["count"]
+    assert EMBEDDING_QUEUE_WAIT_SECONDS.labels().snapshot()["count"] - before[1] == 3
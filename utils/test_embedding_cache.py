@@ -0,0 +1,78 @@
+import asyncio
+
+from langchain_core.embeddings import Embeddings
+
+from utils.embedding_cache import CachedEmbeddings, EmbeddingCacheStore
+
+
+class StubEmbeddings(Embeddings):
+    """Returns distinct vectors for queries and documents and records what it embedded."""
+
+    def __init__(self):
+        self.documents = []
+        self.queries = []
+
+    def embed_documents(self, texts):
+        self.documents.extend(texts)
+        return [[1.0, float(len(text))] for text in texts]
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return [2.0, float(len(text))]
+
+
+def _cached(tmp_path, max_entries=100):
+    model = StubEmbeddings()
+    store = EmbeddingCacheStore(str(tmp_path / "embeddings.db"), max_entries=max_entries)
+    return model, store, CachedEmbeddings(model, store, "stub", "model-1")
+
+
+def test_only_missing_texts_are_embedded(tmp_path):
+    model, _, cached = _cached(tmp_path)
+
+    first = cached.embed_documents(["a", "bb"])
+    second = cached.embed_documents(["bb", "ccc", "ccc"])
+
+    assert first == [[1.0, 1.0], [1.0, 2.0]]
+    assert second == [[1.0, 2.0], [1.0, 3.0], [1.0, 3.0]]
+    assert model.documents == ["a", "bb", "ccc"]
+
+
+def test_queries_and_documents_are_cached_separately(tmp_path):
+    model, _, cached = _cached(tmp_path)
+
+    assert cached.embed_documents(["paris"]) == [[1.0, 5.0]]
+    assert cached.embed_query("paris") == [2.0, 5.0]
+    assert cached.embed_query("paris") == [2.0, 5.0]
+    assert cached.embed_documents(["paris"]) == [[1.0, 5.0]]
+    assert model.queries == ["paris"] and model.documents == ["paris"]
+
+
+def test_models_do_not_share_vectors(tmp_path):
+    model, store, cached = _cached(tmp_path)
+    cached.embed_documents(["text"])
+
+    other_model = StubEmbeddings()
+    CachedEmbeddings(other_model, store, "stub", "model-2").embed_documents(["text"])
+
+    assert other_model.documents == ["text"]
+
+
+def test_async_methods_share_the_cache(tmp_path):
+    model, _, cached = _cached(tmp_path)
+    cached.embed_query("query")
+
+    async def main():
+        return await cached.aembed_query("query"), await cached.aembed_documents(["doc"])
+
+    assert asyncio.run(main()) == ([2.0, 5.0], [[1.0, 3.0]])
+    assert model.queries == ["query"]
+
+
+def test_store_evicts_least_recently_used(tmp_path):
+    _, store, cached = _cached(tmp_path, max_entries=10)
+    cached.embed_documents([f"text {i}" for i in range(12)])
+
+    stats = store.stats()
+    assert stats["size"] <= 10
+    assert stats["evictions"] >= 2
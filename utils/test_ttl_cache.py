@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils.metrics import CACHE_REQUESTS
+from utils.ttl_cache import TTLCache
+
+
+def test_get_or_compute_caches_the_value():
+    cache = TTLCache(ttl=60)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return "value"
+
+    assert cache.get_or_compute("key", compute) == "value"
+    assert cache.get_or_compute("key", compute) == "value"
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache(ttl=0.05)
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+    time.sleep(0.1)
+    assert cache.get("key") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1 and cache.get("b") is None and cache.get("c") == 3
+
+
+def test_cache_if_skips_values():
+    cache = TTLCache(cache_if=lambda value: "error" not in value)
+    assert cache.get_or_compute("key", lambda: {"error": "down"}) == {"error": "down"}
+    assert cache.get("key") is None
+
+
+def test_concurrent_misses_share_one_computation():
+    cache = TTLCache()
+    calls = []
+    started = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("key", compute))) for _ in range(5)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    cache = TTLCache()
+
+    def compute():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("key", compute)
+    assert cache.get_or_compute("key", lambda: "recovered") == "recovered"
+
+
+def test_async_callers_coalesce():
+    cache = TTLCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_compute("key", compute) for _ in range(4)))
+
+    assert asyncio.run(main()) == ["value"] * 4
+    assert len(calls) == 1
+
+
+def test_named_cache_counts_lookups_in_metrics():
+    cache = TTLCache(ttl=60, name="test_ttl")
+    results = CACHE_REQUESTS.labels(cache="test_ttl", result="hit"), CACHE_REQUESTS.labels(cache="test_ttl", result="miss")
+    before = [child.value for child in results]
+
+    cache.get_or_compute("key", lambda: "value")
+    cache.get_or_compute("key", lambda: "value")
+
+    assert [child.value - start for child, start in zip(results, before)] == [1, 1]
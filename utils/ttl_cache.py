@@ -0,0 +1,164 @@
+"""In-process TTL cache with request coalescing.
+
+Used by tools that call rate-limited external APIs. Concurrent misses for the same key
+share one upstream call: the first caller computes the value and every other caller,
+sync or async, waits on the same future.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from utils.metrics import CACHE_REQUESTS, inc
+
+
+class TTLCache:
+    """A thread-safe LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, ttl: float = 600.0, max_size: int = 1024, cache_if: Optional[Callable[[Any], bool]] = None,
+                 name: Optional[str] = None):
+        """Initialize the cache.
+
+        Args:
+            ttl: Seconds an entry stays fresh.
+            max_size: Maximum number of entries; least recently used are evicted first.
+            cache_if: Optional predicate; values for which it returns False (e.g. error
+                results) are returned to callers but not stored.
+            name: Optional ``cache`` label; when set, lookups are counted in
+                ``orchestra_cache_requests_total`` as hit, coalesced or miss.
+        """
+        self.ttl = ttl
+        self.name = name
+        self.max_size = max_size
+        self.cache_if = cache_if
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._inflight: Dict[Hashable, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+
+    def _lookup_locked(self, key: Hashable):
+        """Return (found, value) for a fresh entry. Caller holds the lock."""
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self._evictions += 1
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a fresh cached value or None, without computing anything."""
+        with self._lock:
+            found, value = self._lookup_locked(key)
+            if found:
+                self._hits += 1
+        if found:
+            self._count("hit")
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value (subject to ``cache_if``)."""
+        if self.cache_if is not None and not self.cache_if(value):
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def _count(self, result: str) -> None:
+        if self.name is not None:
+            inc(CACHE_REQUESTS, cache=self.name, result=result)
+
+    def _claim(self, key: Hashable):
+        """Return (cached value, in-flight future, is_leader) for a key."""
+        with self._lock:
+            found, value = self._lookup_locked(key)
+            if found:
+                self._hits += 1
+                claim, result = (value, None, False), "hit"
+            elif key in self._inflight:
+                self._coalesced += 1
+                claim, result = (None, self._inflight[key], False), "coalesced"
+            else:
+                self._misses += 1
+                future = concurrent.futures.Future()
+                self._inflight[key] = future
+                claim, result = (None, future, True), "miss"
+        self._count(result)
+        return claim
+
+    def _resolve(self, key: Hashable, future: concurrent.futures.Future, value: Any = None, error: Optional[BaseException] = None) -> None:
+        if error is None:
+            self.set(key, value)
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is None:
+            future.set_result(value)
+        else:
+            future.set_exception(error)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for ``key``, computing it once on a miss.
+
+        Args:
+            key: Cache key.
+            compute: Zero-argument function producing the value.
+        """
+        value, future, is_leader = self._claim(key)
+        if future is None:
+            return value
+        if not is_leader:
+            return future.result()
+        try:
+            value = compute()
+        except BaseException as e:
+            self._resolve(key, future, error=e)
+            raise
+        self._resolve(key, future, value)
+        return value
+
+    async def aget_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Async version of ``get_or_compute``; ``compute`` returns an awaitable."""
+        value, future, is_leader = self._claim(key)
+        if future is None:
+            return value
+        if not is_leader:
+            return await asyncio.wrap_future(future)
+        try:
+            value = await compute()
+        except BaseException as e:
+            self._resolve(key, future, error=e)
+            raise
+        self._resolve(key, future, value)
+        return value
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size, hit/miss, coalescing and eviction counters."""
+        with self._lock:
+            lookups = self._hits + self._misses + self._coalesced
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "coalesced": self._coalesced,
+                "hit_rate": (self._hits + self._coalesced) / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+            }